@@ -1,7 +1,8 @@
 from ..tb_utils.nlp import WordTokenizer
+from ..tb_utils.text_arena import arena_map
 from ..data_process.html_text_process import txt_io
 import os, codecs
-import subprocess, concurrent.futures
+import subprocess
 
 LANG = "fra"
 tokenizer = WordTokenizer(LANG)
@@ -17,10 +18,10 @@ def tokenize_texts(texts):
     """
     print("\n\tTokenizing Texts...")
 
-    max_threads = int(0.8 * os.cpu_count())
+    max_threads = max(int(0.8 * os.cpu_count()), 1)
     size = max(int(len(texts) / max_threads), 1)
-    with concurrent.futures.ProcessPoolExecutor(max_workers=max_threads) as executor:
-        tok_texts = list(executor.map(_tokenize_text, texts, chunksize=size))
+    # Texts and results go through shared memory instead of being pickled to and from the workers
+    tok_texts = arena_map(_tokenize_text, texts, nJobs=max_threads, chunkSize=size)
 
     # tok_texts = [" ".join(self.tokenizer.tokenize(text)) for text in texts]
     return tok_texts
@@ -0,0 +1,210 @@
+import os, json, hashlib
+from array import array
+import numpy as np
+
+
+class BM25Statistics:
+    """BM25 (Okapi) statistics of a tokenized corpus in compact NumPy arrays, with the scores of rank_bm25.BM25Okapi.
+        - vocab: word -> id, ids in order of first occurrence
+        - indptr, indices, counts: document x word term counts in CSR form
+        - doc_len: the number of tokens of each document
+        - idf: the IDF of each word, negative values floored to epsilon * average IDF as in rank_bm25
+        - fingerprint: a hash of the tokenized corpus, to check that saved statistics belong to a corpus
+        The statistics are built in one streaming pass over the corpus and can be saved and memory-mapped."""
+
+    ARRAYS = ('indptr', 'indices', 'counts', 'doc_len', 'idf')
+
+    def __init__(self, k1=1.5, b=0.75, epsilon=0.25):
+
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        self.vocab = {}
+        self.indptr = np.zeros(1, dtype='int64')
+        self.indices = np.zeros(0, dtype='int32')
+        self.counts = np.zeros(0, dtype='int32')
+        self.doc_len = np.zeros(0, dtype='int32')
+        self.idf = np.zeros(0, dtype='float64')
+        self.avgdl = 0
+        self.average_idf = 0
+        self.fingerprint = None
+
+        self._words = None
+        self._postings = None
+
+    @classmethod
+    def from_corpus(cls, tokenized_corpus, k1=1.5, b=0.75, epsilon=0.25, batch_size=100000):
+        """Build the statistics in one pass over an iterable of token lists.
+            Tokens are mapped to word ids as they stream, and the term counts of each batch of batch_size documents
+            are computed at once, so that memory holds the CSR arrays and one batch of word ids."""
+
+        stats = cls(k1, b, epsilon)
+        vocab = stats.vocab
+        get_id = vocab.setdefault
+        indices, counts, doc_entries, doc_len = [], [], [], array('q')
+        batch_ids, batch_start = array('i'), 0
+        digest = hashlib.blake2b(digest_size=16)
+
+        for doc in tokenized_corpus:
+            cls._hash_document(digest, doc)
+            batch_ids.extend([get_id(word, len(vocab)) for word in doc])
+            doc_len.append(len(doc))
+            if len(doc_len) - batch_start == batch_size:
+                doc_entries.append(stats._count_batch(batch_ids, doc_len[batch_start:], indices, counts))
+                batch_ids, batch_start = array('i'), len(doc_len)
+        doc_entries.append(stats._count_batch(batch_ids, doc_len[batch_start:], indices, counts))
+
+        stats.doc_len = np.frombuffer(doc_len, dtype='int64').astype('int32')
+        stats.indptr = np.zeros(len(doc_len) + 1, dtype='int64')
+        np.cumsum(np.concatenate(doc_entries), out=stats.indptr[1:])
+        stats.indices = np.concatenate(indices).astype('int32')
+        stats.counts = np.concatenate(counts).astype('int32')
+        stats.fingerprint = digest.hexdigest()
+        stats._calc_idf()
+
+        return stats
+
+    @staticmethod
+    def _hash_document(digest, doc):
+
+        digest.update(('\x00'.join(doc) + '\x01').encode('utf8', 'surrogatepass'))
+
+    @classmethod
+    def corpus_fingerprint(cls, tokenized_corpus):
+        """Hash a tokenized corpus as from_corpus does."""
+
+        digest = hashlib.blake2b(digest_size=16)
+        for doc in tokenized_corpus:
+            cls._hash_document(digest, doc)
+
+        return digest.hexdigest()
+
+    def matches(self, tokenized_corpus):
+        """Check whether the statistics were built from a tokenized corpus (a list of token lists)."""
+
+        return len(tokenized_corpus) == self.corpus_size and self.fingerprint == self.corpus_fingerprint(tokenized_corpus)
+
+    def _count_batch(self, ids, doc_len, indices, counts):
+        """Count the word ids of a batch of documents, appending the CSR entries (in order of first occurrence within
+            each document, as rank_bm25's doc_freqs) to the lists indices and counts.
+            Returns the number of entries of each document."""
+
+        vocab_size = max(len(self.vocab), 1)
+        ids = np.frombuffer(ids, dtype='int32').astype('int64')
+        docs = np.repeat(np.arange(len(doc_len), dtype='int64'), np.frombuffer(doc_len, dtype='int64'))
+
+        # (document, word) keys sort by document, and by first occurrence within the document once reordered
+        keys, first, tfs = np.unique(docs * vocab_size + ids, return_index=True, return_counts=True)
+        order = np.argsort(first, kind='stable')
+        indices.append(keys[order] % vocab_size)
+        counts.append(tfs[order])
+
+        return np.bincount(keys // vocab_size, minlength=len(doc_len))
+
+    def _calc_idf(self):
+        """Calculate the IDF of each word and the average document length as rank_bm25.BM25Okapi does."""
+
+        corpus_size = self.corpus_size
+        self.avgdl = self.doc_len.sum() / corpus_size
+
+        # the number of documents with each word
+        nd = np.bincount(self.indices, minlength=len(self.vocab))
+        self.idf = np.log(corpus_size - nd + 0.5) - np.log(nd + 0.5)
+        self.average_idf = self.idf.sum() / len(self.idf)
+        self.idf[self.idf < 0] = self.epsilon * self.average_idf
+
+    @property
+    def corpus_size(self):
+
+        return len(self.doc_len)
+
+    def term_frequencies(self, i):
+        """Get the term frequencies (word -> count) of document i, as rank_bm25's doc_freqs[i]."""
+
+        words = self.words
+        start, end = self.indptr[i], self.indptr[i + 1]
+
+        return {words[j]: int(tf) for j, tf in zip(self.indices[start:end], self.counts[start:end])}
+
+    @property
+    def words(self):
+        """The words of the vocabulary in id order."""
+
+        if self._words is None or len(self._words) != len(self.vocab):
+            self._words = list(self.vocab)
+
+        return self._words
+
+    def _weigh(self, tf, doc_len, idf):
+        """BM25 weight of terms with frequency tf in documents of length doc_len."""
+
+        return idf * (tf * (self.k1 + 1.0)) / (tf + self.k1 * (1.0 - self.b + self.b * doc_len / self.avgdl))
+
+    def weights(self):
+        """Get the BM25 weight of each CSR entry (document, word), aligned with indices and counts."""
+
+        entry_doc_len = np.repeat(self.doc_len, np.diff(self.indptr))
+
+        return self._weigh(self.counts.astype('float64'), entry_doc_len, self.idf[self.indices])
+
+    def postings(self, word_id):
+        """Get the documents containing a word and the term frequencies, from a word-major copy of the CSR entries
+            built at the first call."""
+
+        if self._postings is None:
+            order = np.argsort(self.indices, kind='stable')
+            entry_docs = np.repeat(np.arange(self.corpus_size, dtype='int64'), np.diff(self.indptr))
+            word_ptr = np.zeros(len(self.vocab) + 1, dtype='int64')
+            np.cumsum(np.bincount(self.indices, minlength=len(self.vocab)), out=word_ptr[1:])
+            self._postings = (word_ptr, entry_docs[order], self.counts[order])
+
+        word_ptr, docs, counts = self._postings
+        start, end = word_ptr[word_id], word_ptr[word_id + 1]
+
+        return docs[start:end], counts[start:end]
+
+    def get_scores(self, query):
+        """Score all documents for a tokenized query, as rank_bm25.BM25Okapi.get_scores."""
+
+        score = np.zeros(self.corpus_size)
+        for q in query:
+            word_id = self.vocab.get(q)
+            if word_id is not None:
+                docs, tfs = self.postings(word_id)
+                score[docs] += self._weigh(tfs, self.doc_len[docs], self.idf[word_id])
+
+        return score
+
+    def get_batch_scores(self, query, doc_ids):
+        """Score some documents for a tokenized query, as rank_bm25.BM25Okapi.get_batch_scores."""
+
+        return self.get_scores(query)[doc_ids].tolist()
+
+    def save(self, path):
+        """Save the statistics in a directory: one .npy file per array and meta.json with the vocabulary."""
+
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf8') as f:
+            json.dump({'k1': self.k1, 'b': self.b, 'epsilon': self.epsilon, 'avgdl': self.avgdl,
+                       'average_idf': self.average_idf, 'fingerprint': self.fingerprint, 'words': self.words}, f,
+                      ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load statistics saved in a directory, memory-mapping the arrays unless mmap_mode is None."""
+
+        with open(os.path.join(path, 'meta.json'), encoding='utf8') as f:
+            meta = json.load(f)
+
+        stats = cls(meta['k1'], meta['b'], meta['epsilon'])
+        stats.avgdl, stats.average_idf = meta['avgdl'], meta['average_idf']
+        stats.fingerprint = meta.get('fingerprint')
+        stats.vocab = {word: i for i, word in enumerate(meta['words'])}
+        for name in cls.ARRAYS:
+            setattr(stats, name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode))
+
+        return stats
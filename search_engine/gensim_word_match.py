@@ -2,9 +2,13 @@ from gensim import corpora, models, similarities
 from gensim.matutils import cossim
 from gensim.utils import simple_preprocess, SaveLoad
 import numpy as np, pandas as pd, os, time, codecs, json, pickle
-import itertools
+import itertools, sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from tb_utils.edit_distance import rescore
+from tb_utils.file_io import LineIndexedFile
+
 class GensimWordMatch(object):
     """Build the class to match most similar TM from Sedar corpus.
         Steps to build:
@@ -31,10 +35,10 @@ class GensimWordMatch(object):
 
         # if (serialize_dict is not None) and (serialize_vector is not None):
         print("Reading Corpus Data...")
-        with codecs.open(bitext_corpus[0], 'r', encoding='utf8') as f:
-            self.eng_corpus = f.readlines()  # Not applicable to numpy array for Sedar 37M data.
-        with codecs.open(bitext_corpus[1], 'r', encoding='utf8') as f:
-            self.fra_corpus = f.readlines()  # , dtype='<U5'
+        # Lines are read on demand through cached line offsets, the corpus (37M lines for Sedar) is not loaded.
+        # They are split as codecs readlines() does, on which the line numbers of the serialized indexes are based.
+        self.eng_corpus = LineIndexedFile(bitext_corpus[0], encoding='utf8', unicodeLines=True)
+        self.fra_corpus = LineIndexedFile(bitext_corpus[1], encoding='utf8', unicodeLines=True)
         self.corpus_len = len(self.eng_corpus)
 
         if preload:
@@ -92,8 +96,12 @@ class GensimWordMatch(object):
 
         return input_vectors
 
-    def match(self, input_vectors):
-        """Get the index of best candidate TM for each input source text."""
+    def match(self, input_vectors, input_texts=None, top_k=None, threshold=None):
+        """Get the index of best candidate TM for each input source text and its cosine similarity.
+            If input_texts and top_k are given, the top_k candidates by cosine similarity are rescored by the
+            word-level fuzzy match score (bit-parallel edit distance), and candidates below threshold score 0.
+            The best candidate is the one with the highest fuzzy match score, ties (including no candidate reaching
+            threshold) going to the highest cosine similarity; the returned scores stay cosine similarities."""
 
         start = time.time()
         total_number_vectors = len(input_vectors)
@@ -107,13 +115,23 @@ class GensimWordMatch(object):
         #     best_scores[i] = np.max(sims)
         similarities = self.similarities[self.tfidf[input_vectors]]
         for i, sim in enumerate(similarities):
-            best_indexes[i] = np.argmax(sim)
-            best_scores[i] = np.max(sim)
+            if top_k and input_texts is not None:
+                candidates = np.argpartition(-sim, min(top_k, len(sim)) - 1)[:top_k]
+                # Candidates in decreasing cosine similarity, so that argmax breaks ties by cosine similarity
+                candidates = candidates[np.argsort(-sim[candidates], kind='stable')]
+                scores = rescore(simple_preprocess(str(input_texts[i])),
+                                 [simple_preprocess(str(src)) for src in self.eng_corpus.getMany(candidates)],
+                                 threshold=threshold)
+                best_indexes[i] = candidates[np.argmax(scores)]
+                best_scores[i] = sim[best_indexes[i]]
+            else:
+                best_indexes[i] = np.argmax(sim)
+                best_scores[i] = np.max(sim)
 
         print("\tTime cost for finding best match and score:{} sec".format(time.time() - start))
         return best_indexes, best_scores
 
-    def match_input_tm(self, inputFile, outputFile):
+    def match_input_tm(self, inputFile, outputFile, top_k=None, threshold=None):
 
         print("Searching fuzzy match of input segments...")
         start = time.time()
@@ -122,12 +140,12 @@ class GensimWordMatch(object):
         df_source = df_source['source'].to_numpy(dtype=str)
 
         input_vectors = self.transform(df_source)
-        best_indexes, best_scores = self.match(input_vectors)
+        best_indexes, best_scores = self.match(input_vectors, df_source, top_k, threshold)
 
         # best_corpus_src = self.eng_corpus[best_indexes]
         # best_corpus_tgt = self.fra_corpus[best_indexes]
-        best_corpus_src = [self.eng_corpus[i] for i in best_indexes]
-        best_corpus_tgt = [self.fra_corpus[i] for i in best_indexes]
+        best_corpus_src = self.eng_corpus.getMany(best_indexes)
+        best_corpus_tgt = self.fra_corpus.getMany(best_indexes)
         print("Searching done: time cost {} sec".format(time.time() - start))
 
         output_df = pd.DataFrame({"source": df_source,
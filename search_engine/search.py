@@ -1,11 +1,12 @@
 import os, pandas as pd, codecs, tqdm, time
 import pickle
 import numpy as np
+import scipy.sparse
 import nmslib
 from configparser import ConfigParser
-from rank_bm25 import BM25Okapi
 from gensim.models.fasttext import FastText
 from search_psql import SearchPSQL
+from bm25 import BM25Statistics
 import spacy
 
 EN_SPACY_MODEL = 'en_core_web_lg'
@@ -33,11 +34,16 @@ class BuildSearchEngine:
         self.fasttext_model_path = self.cp.get("Serialization", "fasttext_model_path")
         self.corpus_vector_path = self.cp.get("Serialization", "corpus_vector_path")
         self.index_path = self.cp.get("Serialization", "index_path")
+        # Optional directory of the BM25 statistics, reused (memory-mapped) by later builds
+        self.bm25_path = self.cp.get("Serialization", "bm25_path", fallback=None)
 
         self.corpus = []
         self.ft_model = None
         self.bm25 = None
-        self.corpus_vecs = []
+        # (n_docs, embedding_dim) float32 matrix of document vectors, memory-mapped from the .npy file, and mask of
+        # documents with a valid (finite, non-zero) vector
+        self.corpus_vecs = None
+        self.corpus_mask = None
 
         self.index = nmslib.init(method='hnsw', space=self.distance_fun)
         # self.check_pretrained()
@@ -48,7 +54,8 @@ class BuildSearchEngine:
             if os.path.exists(self.fasttext_model_path):
                 self.reload_model(self.fasttext_model_path)
 
-            if os.path.exists(self.corpus_vector_path):
+            if any(os.path.exists(path) for path in (self.corpus_vector_path,
+                                                      *self.corpus_vector_files(self.corpus_vector_path))):
                 self.reload_corpus_vector(self.corpus_vector_path)
         except:
             pass
@@ -63,28 +70,74 @@ class BuildSearchEngine:
         print("Reloading FastText model...")
         self.ft_model = FastText.load(model_dir)
 
-    def save_corpus_vector(self, vector_dir):
-        """save weighted document vector"""
+    @staticmethod
+    def corpus_vector_files(vector_dir):
+        """Get the paths of the document vector matrix (.npy) and of its mask (.mask.npy) for the configured path,
+            the extension of which (e.g., .pkl of the former pickled list of vectors) is replaced."""
+        base = os.path.splitext(vector_dir)[0]
+
+        return base + '.npy', base + '.mask.npy'
+
+    def allocate_corpus_vector(self, n_docs):
+        """Preallocate the float32 document vector matrix in a temporary .npy file, to be filled chunk by chunk and
+            renamed by save_corpus_vector, so that an interrupted build never leaves a partial matrix to reload."""
+        matrix_path, _ = self.corpus_vector_files(self.corpus_vector_path)
+        self.corpus_vecs = np.lib.format.open_memmap(matrix_path + '.tmp', mode='w+', dtype='float32',
+                                                     shape=(n_docs, self.embedding_dim))
+        self.corpus_mask = None
+
+    def save_corpus_vector(self, vector_dir, chunk_size=100000):
+        """save weighted document vector: NaN vectors are zeroed, and the mask of documents with a valid (finite,
+            non-zero) vector is saved next to the matrix."""
         print("\tChecking if each document is correctly converted into vector...")
-        length = len(self.corpus_vecs)
-        for i in range(length):
-            try:
-                if self.corpus_vecs[i].shape[0] != 100:
-                    print("Index {} doesn't have 100D".format(i))
-                    self.corpus_vecs[i] = np.zeros(100, dtype='float32')
-            except:
-                print("Index {} is nan".format(i))
-                self.corpus_vecs[i] = np.zeros(100, dtype='float32')
+        matrix_path, mask_path = self.corpus_vector_files(vector_dir)
+        if self.corpus_vecs.shape[1] != self.embedding_dim:
+            raise ValueError("Document vectors have {}D instead of {}D".format(self.corpus_vecs.shape[1],
+                                                                              self.embedding_dim))
+
+        self.corpus_mask = np.zeros(len(self.corpus_vecs), dtype=bool)
+        for start in range(0, len(self.corpus_vecs), chunk_size):
+            rows = self.corpus_vecs[start:start + chunk_size]
+            finite = np.isfinite(rows).all(axis=1)
+            for i in np.flatnonzero(~finite):
+                print("Index {} is nan".format(start + i))
+                rows[i] = 0
+            self.corpus_mask[start:start + chunk_size] = finite & rows.any(axis=1)
 
         print("\nSaving weighted corpus vector...")
-        with open(vector_dir, "wb") as pickleFile:
-            pickle.dump(self.corpus_vecs, pickleFile)
+        # The matrix is complete once renamed from its temporary file, after the mask is saved
+        tmp_path = matrix_path + '.tmp'
+        if getattr(self.corpus_vecs, 'filename', None) == os.path.abspath(tmp_path):
+            self.corpus_vecs.flush()
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, self.corpus_vecs)
+        np.save(mask_path, self.corpus_mask)
+        os.replace(tmp_path, matrix_path)
+        self.corpus_vecs = np.load(matrix_path, mmap_mode='r')
 
     def reload_corpus_vector(self, vector_dir):
-        """reload weighted document vector from local file"""
+        """reload weighted document vector from local file, memory-mapped.
+            A former pickled list of vectors is converted into the matrix once."""
         print("Reloading coorpus vector...")
-        with open(vector_dir, 'rb') as pickleFile:
-            self.corpus_vecs = pickle.load(pickleFile)
+        matrix_path, mask_path = self.corpus_vector_files(vector_dir)
+
+        if not os.path.exists(matrix_path):
+            with open(vector_dir, 'rb') as pickleFile:
+                vectors = pickle.load(pickleFile)
+            self.allocate_corpus_vector(len(vectors))
+            for i, vector in enumerate(vectors):
+                if np.shape(vector) == (self.embedding_dim,):
+                    self.corpus_vecs[i] = vector
+            del vectors
+            self.save_corpus_vector(vector_dir)
+
+        # Both files are loaded before either is kept, so that a failed reload leaves no vectors to reuse
+        corpus_vecs = np.load(matrix_path, mmap_mode='r')
+        corpus_mask = np.load(mask_path)
+        if corpus_mask.shape != (len(corpus_vecs),):
+            raise ValueError("The mask {} does not match the document vectors {}".format(mask_path, matrix_path))
+        self.corpus_vecs, self.corpus_mask = corpus_vecs, corpus_mask
         print("")
 
     def save_index(self, index_dir):
@@ -146,52 +199,89 @@ class BuildSearchEngine:
     #              (self.bm25.k1 * (1.0 - self.bm25.b + self.bm25.b * (self.bm25.doc_len[i] / self.bm25.avgdl)) + tf)
     #     weighted_vector = vector * weight
 
-    def build_weighted_document_vector(self, tokenized_corpus):
-        """Build BM25 weighted document vector"""
+    def build_weighted_document_vector(self, tokenized_corpus, chunk_size=100000):
+        """Build BM25 weighted document vector: the mean over the document tokens of their FastText vectors weighted by
+            BM25. Tokens are mapped to vocabulary ids once, then the vectors of a chunk of documents are the product of
+            their sparse (CSR) document x vocabulary matrix of BM25 weights divided by document length with the
+            vocabulary embedding matrix."""
 
         print("\tBuilding BM25 weighted document vector")
-        for i, doc in enumerate(tokenized_corpus):
-            doc_vector = []
-            try:
-                for word in doc:
-                    vector = self.ft_model[word]
-                    tf = self.bm25.doc_freqs[i][word]
-                    weight = (self.bm25.idf[word] * ((self.bm25.k1 + 1.0) * tf)) / \
-                             (self.bm25.k1 * (1.0 - self.bm25.b + self.bm25.b * (self.bm25.doc_len[i] / self.bm25.avgdl)) + tf)
-                    weighted_vector = vector * weight
-                    doc_vector.append(weighted_vector)
-
-                doc_vector_mean = np.mean(doc_vector, axis=0)
-            except:
-                print("------Document {} failed to generate weighted vector.".format(i))
-                doc_vector_mean = np.zeros(self.embedding_dim, dtype='float32')
 
-            self.corpus_vecs.append(doc_vector_mean)
+        # Precompute the vocabulary embedding matrix
+        words = self.bm25.words
+        embeddings = np.zeros((len(words), self.embedding_dim), dtype='float32')
+        failed_words = np.zeros(len(words), dtype=bool)
+        for j, word in enumerate(words):
+            try:
+                embeddings[j] = self.ft_model.wv[word]
+            except Exception:
+                failed_words[j] = True
+
+        # BM25 weight of each (document, word) entry, summed over the token occurrences and divided by document length
+        doc_len = self.bm25.doc_len.astype('float64')
+        weights = self.bm25.weights() * self.bm25.counts / np.repeat(doc_len, np.diff(self.bm25.indptr))
+        weight_matrix = scipy.sparse.csr_matrix((weights, self.bm25.indices, self.bm25.indptr),
+                                                shape=(len(doc_len), len(words)))
+
+        # Documents with a token without vector fail, as do empty documents
+        entry_docs = np.repeat(np.arange(len(doc_len)), np.diff(self.bm25.indptr))
+        failed_docs = (np.bincount(entry_docs[failed_words[self.bm25.indices]], minlength=len(doc_len)) > 0) | \
+                      (doc_len == 0)
+        for i in np.flatnonzero(failed_docs & (doc_len > 0)):
+            print("------Document {} failed to generate weighted vector.".format(i))
+
+        # Fill the preallocated matrix chunk by chunk
+        self.allocate_corpus_vector(len(doc_len))
+        for start in range(0, len(doc_len), chunk_size):
+            doc_vectors = weight_matrix[start:start + chunk_size] @ embeddings
+            doc_vectors[failed_docs[start:start + chunk_size]] = 0
+            self.corpus_vecs[start:start + chunk_size] = doc_vectors
 
     def fit(self):
         """Build BM25 weighted document vector for input corpus."""
         tokenized_corpus = self.preprocess_corpus()
-        print("\tCreating BM25 ")
-        self.bm25 = BM25Okapi(tokenized_corpus)
+        self.bm25 = None
+        if self.bm25_path and os.path.exists(self.bm25_path):
+            print("\tReloading BM25 ")
+            self.bm25 = BM25Statistics.load(self.bm25_path)
+            if not self.bm25.matches(tokenized_corpus):
+                print("\tBM25 statistics do not match the corpus")
+                self.bm25 = None
+        # Saved statistics are rebuilt for a new corpus, as are the document vectors then
+        stale = self.bm25 is None and bool(self.bm25_path)
+        if self.bm25 is None:
+            print("\tCreating BM25 ")
+            self.bm25 = BM25Statistics.from_corpus(tokenized_corpus)
+            if self.bm25_path:
+                self.bm25.save(self.bm25_path)
 
         self.check_pretrained()
+        # Document vectors of another corpus are rebuilt
+        if stale or (self.corpus_vecs is not None and len(self.corpus_vecs) != self.bm25.corpus_size):
+            self.corpus_vecs, self.corpus_mask = None, None
 
         if not self.ft_model:
             self.train_model(tokenized_corpus)
             self.save_model(self.fasttext_model_path)
 
-        if not self.corpus_vecs:
+        if self.corpus_vecs is None:
             self.build_weighted_document_vector(tokenized_corpus)
             self.save_corpus_vector(self.corpus_vector_path)
 
     def create_index(self):
         """Create search engine index using nmslib"""
         print("\n\tCreating search engine index")
-        data = np.vstack(self.corpus_vecs)
+        if self.corpus_vecs is None:
+            self.reload_corpus_vector(self.corpus_vector_path)
 
         # initialize a new index, using a HNSW index on Cosine Similarity
-
-        self.index.addDataPointBatch(data)
+        # Documents are added by chunks of the memory-mapped matrix, with their positions as ids, except the documents
+        # without a valid vector
+        chunk_size = 100000
+        for start in range(0, len(self.corpus_vecs), chunk_size):
+            valid = self.corpus_mask[start:start + chunk_size]
+            self.index.addDataPointBatch(np.ascontiguousarray(self.corpus_vecs[start:start + chunk_size][valid]),
+                                         ids=np.flatnonzero(valid) + start)
         self.index.createIndex({'post': 2}, print_progress=True)
 
         self.save_index(self.index_path)
@@ -39,15 +39,12 @@ class SearchPSQL:
         """Get corpus data used to index.
             additional_info: a list for information that a record in DB table needs other than
                              source language, target language"""
-        with codecs.open(self.src_corpus_path, 'r') as f:
-            src_lines = f.readlines()
-        with codecs.open(self.tgt_corpus_path, 'r') as f:
-            tgt_lines = f.readlines()
-
+        # Lines are streamed, so that only the records are held in memory
         data = []
-        for src, tgt in zip(src_lines, tgt_lines):
-            record = (self.srcLang, self.tgtLang, src.strip(), tgt.strip(), *additional_info)
-            data.append(record)
+        with codecs.open(self.src_corpus_path, 'r') as src_lines, codecs.open(self.tgt_corpus_path, 'r') as tgt_lines:
+            for src, tgt in zip(src_lines, tgt_lines):
+                record = (self.srcLang, self.tgtLang, src.strip(), tgt.strip(), *additional_info)
+                data.append(record)
 
         print("{} Records Created, ready to be imported to Segment Table.".format(len(data)))
         return data
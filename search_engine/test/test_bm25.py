@@ -0,0 +1,45 @@
+import unittest, sys, os, tempfile
+from pathlib import Path
+import numpy as np
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from rank_bm25 import BM25Okapi
+from bm25 import BM25Statistics
+
+
+CORPUS = [['the', 'cat', 'sat', 'on', 'the', 'mat'],
+          [],
+          ['the', 'dog', 'sat'],
+          ['a', 'cat', 'and', 'a', 'dog', 'and', 'the', 'cat'],
+          ['the', 'end']]
+
+
+class TestBM25Statistics(unittest.TestCase):
+
+    def test_rank_bm25(self):
+
+        reference = BM25Okapi(CORPUS)
+
+        for batch_size in (2, 100):
+            stats = BM25Statistics.from_corpus(iter(CORPUS), batch_size=batch_size)
+            self.assertEqual(stats.words, list(reference.idf))
+            self.assertEqual([stats.term_frequencies(i) for i in range(len(CORPUS))], reference.doc_freqs)
+            np.testing.assert_allclose(stats.idf, list(reference.idf.values()))
+
+            for query in (['the', 'cat', 'cat'], ['dog', 'unknown']):
+                np.testing.assert_allclose(stats.get_scores(query), reference.get_scores(query))
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            stats.save(tmpDir)
+            loaded = BM25Statistics.load(tmpDir)
+            self.assertIsInstance(loaded.indices, np.memmap)
+            np.testing.assert_allclose(loaded.weights(), stats.weights())
+            np.testing.assert_allclose(loaded.get_batch_scores(['cat'], [0, 3]), reference.get_batch_scores(['cat'], [0, 3]))
+
+            self.assertTrue(loaded.matches(CORPUS))
+            self.assertFalse(loaded.matches(CORPUS[:-1]))
+            self.assertFalse(loaded.matches(CORPUS[:-1] + [['the', 'start']]))
+
+
+if __name__ == '__main__':
+    unittest.main()
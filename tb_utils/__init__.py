@@ -1,4 +1,4 @@
-from utils.file_io import *
-from utils.language_resources import Codes, CommonRegex, Writing
-from utils.nlp import *
+from .file_io import *
+from .language_resources import Codes, CommonRegex, Writing
+from .nlp import *
 from .tm_fileparser import *
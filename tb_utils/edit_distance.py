@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+# utils: edit distance
+#
+# Author: Renxian Zhang
+# --------------------------------------------------
+# This modules provides bit-parallel edit distances for scoring many pairs quickly.
+# Levenshtein follows Myers (1999) / Hyyrö (2001) and the optimal string alignment (restricted Damerau-Levenshtein)
+# follows Hyyrö (2003): one column of the DP matrix is updated per symbol with a few integer operations,
+# using Python ints as arbitrarily long bit vectors.
+# Sequences can be strings (characters) or lists of hashable tokens such as words or word ids.
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def _patternMasks(pattern):
+    """Build the match bit masks of a pattern
+
+       Args:
+          pattern (str or list): the pattern sequence
+
+       Returns:
+          (dict): symbol -> bit mask of the positions where the symbol occurs in the pattern
+    """
+
+    res = {}
+    bit = 1
+    for symbol in pattern:
+        res[symbol] = res.get(symbol, 0) | bit
+        bit <<= 1
+
+    return res
+
+
+def _distanceWithMasks(masks, lenPattern, text, transpositions=False, maxDistance=None):
+    """Compute the edit distance between a pattern (given by its masks) and a text
+
+       Args:
+          masks (dict): the match bit masks of the pattern, see _patternMasks
+          lenPattern (int): the length of the pattern
+          text (str or list): the text sequence
+          transpositions (bool): whether adjacent transpositions count as one edit (optimal string alignment)
+          maxDistance (int or None): stop as soon as the distance is known to exceed it
+
+       Returns:
+          (int): the edit distance, or maxDistance + 1 if it exceeds maxDistance
+    """
+
+    lenText = len(text)
+
+    if lenPattern == 0:
+        res = lenText
+        return res if maxDistance is None or res <= maxDistance else maxDistance + 1
+
+    full = (1 << lenPattern) - 1
+    last = 1 << (lenPattern - 1)
+    vp, vn, d0, pmOld = full, 0, 0, 0
+    res = lenPattern
+
+    for j, symbol in enumerate(text):
+        pm = masks.get(symbol, 0)
+        if transpositions:
+            # Transposition bits come from the previous column
+            tr = ((~d0 & pm) << 1) & pmOld
+            pmOld = pm
+        else:
+            tr = 0
+        d0 = (((pm & vp) + vp) ^ vp) | pm | vn | tr
+        hp = vn | (~(d0 | vp) & full)
+        hn = d0 & vp
+
+        if hp & last:
+            res += 1
+        elif hn & last:
+            res -= 1
+
+        # The distance can drop by at most one per remaining symbol
+        if maxDistance is not None and res - (lenText - j - 1) > maxDistance:
+            return maxDistance + 1
+
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | (~(d0 | hp) & full)
+        vn = hp & d0
+
+    return res if maxDistance is None or res <= maxDistance else maxDistance + 1
+
+
+def _maxDistance(length, threshold):
+    """Get the largest distance whose normalized similarity still reaches a threshold
+
+       Args:
+          length (int): the length of the longer sequence
+          threshold (float): the similarity threshold (0 .. 1)
+
+       Returns:
+          (int): the largest acceptable distance
+    """
+
+    return int((1 - threshold) * length + 1e-9)
+
+
+def distance(seq1, seq2, transpositions=False, maxDistance=None):
+    """Compute the Levenshtein (or optimal string alignment) distance
+
+       Args:
+          seq1 (str or list): the first sequence
+          seq2 (str or list): the second sequence
+          transpositions (bool): whether adjacent transpositions count as one edit
+          maxDistance (int or None): stop as soon as the distance is known to exceed it
+
+       Returns:
+          (int): the edit distance, or maxDistance + 1 if it exceeds maxDistance
+    """
+
+    if len(seq1) > len(seq2):
+        seq1, seq2 = seq2, seq1
+
+    if maxDistance is not None and len(seq2) - len(seq1) > maxDistance:
+        return maxDistance + 1
+
+    return _distanceWithMasks(_patternMasks(seq1), len(seq1), seq2, transpositions, maxDistance)
+
+
+def similarity(seq1, seq2, transpositions=False, threshold=None):
+    """Compute the normalized similarity 1 - distance / max(len(seq1), len(seq2)),
+       the same normalization as textdistance's normalized_similarity
+
+       Args:
+          seq1 (str or list): the first sequence
+          seq2 (str or list): the second sequence
+          transpositions (bool): whether adjacent transpositions count as one edit
+          threshold (float or None): if given, return 0.0 as soon as the similarity is known to be below it
+
+       Returns:
+          (float): the similarity score (0 .. 1); larger means similar
+    """
+
+    length = max(len(seq1), len(seq2))
+
+    if length == 0:
+        return 1.0
+
+    if threshold is None:
+        return 1 - distance(seq1, seq2, transpositions) / length
+
+    maxDistance = _maxDistance(length, threshold)
+    dist = distance(seq1, seq2, transpositions, maxDistance)
+
+    return 1 - dist / length if dist <= maxDistance else 0.0
+
+
+def isSimilar(seq1, seq2, threshold, transpositions=False):
+    """Check whether the normalized similarity reaches a threshold, e.g., a 75% fuzzy match, with early exit
+
+       Args:
+          seq1 (str or list): the first sequence
+          seq2 (str or list): the second sequence
+          threshold (float): the similarity threshold (0 .. 1)
+          transpositions (bool): whether adjacent transpositions count as one edit
+
+       Returns:
+          (bool): whether the similarity is at least the threshold
+    """
+
+    length = max(len(seq1), len(seq2))
+
+    if length == 0:
+        return True
+
+    maxDistance = _maxDistance(length, threshold)
+
+    return distance(seq1, seq2, transpositions, maxDistance) <= maxDistance
+
+
+def rescore(query, candidates, transpositions=False, threshold=None):
+    """Score many candidates against one query, building the query's bit masks only once
+
+       Args:
+          query (str or list): the query sequence
+          candidates (list): candidate sequences
+          transpositions (bool): whether adjacent transpositions count as one edit
+          threshold (float or None): if given, candidates below it are cut off early and scored 0.0
+
+       Returns:
+          (numpy.ndarray): the similarity score of each candidate
+    """
+
+    masks = _patternMasks(query)
+    lenQuery = len(query)
+    res = np.zeros(len(candidates))
+
+    for i, candidate in enumerate(candidates):
+        length = max(lenQuery, len(candidate))
+        if length == 0:
+            res[i] = 1.0
+            continue
+
+        maxDistance = None if threshold is None else _maxDistance(length, threshold)
+        if maxDistance is not None and abs(lenQuery - len(candidate)) > maxDistance:
+            continue
+
+        dist = _distanceWithMasks(masks, lenQuery, candidate, transpositions, maxDistance)
+        if maxDistance is None or dist <= maxDistance:
+            res[i] = 1 - dist / length
+
+    return res
+
+
+def _similarityChunk(args):
+    """Score a chunk of pairs, as a picklable task for pool workers
+
+       Args:
+          args (tuple): (pairs, transpositions, threshold)
+
+       Returns:
+          (list): the similarity score of each pair
+    """
+
+    pairs, transpositions, threshold = args
+
+    return [similarity(seq1, seq2, transpositions, threshold) for seq1, seq2 in pairs]
+
+
+def batchSimilarity(pairs, transpositions=False, threshold=None, nJobs=1, chunkSize=2000):
+    """Score many pairs, optionally with a process pool
+
+       Args:
+          pairs (list): (seq1, seq2) pairs of strings or token lists
+          transpositions (bool): whether adjacent transpositions count as one edit
+          threshold (float or None): if given, pairs below it are cut off early and scored 0.0
+          nJobs (int): the number of worker processes; 1 scores in the current process
+          chunkSize (int): the number of pairs sent to a worker at a time
+
+       Returns:
+          (numpy.ndarray): the similarity score of each pair
+    """
+
+    pairs = list(pairs)
+
+    if nJobs == 1 or len(pairs) <= chunkSize:
+        scores = _similarityChunk((pairs, transpositions, threshold))
+    else:
+        chunks = [(pairs[i:i + chunkSize], transpositions, threshold) for i in range(0, len(pairs), chunkSize)]
+        with ProcessPoolExecutor(max_workers=nJobs) as executor:
+            scores = [score for chunk in executor.map(_similarityChunk, chunks) for score in chunk]
+
+    return np.array(scores, dtype=np.float64)
@@ -5,9 +5,10 @@
 # Author: Renxian Zhang, Owen Lu 
 # --------------------------------------------------
 # This module implements functions to faciliate common file IO tasks.
-# Including: Excel, Word, CSV, XML
+# Including: Excel, Word, CSV, XML, line-indexed txt
 
-import csv, re, os, shutil, time
+import csv, re, os, shutil, time, mmap, itertools, codecs
+import numpy as np
 import xlrd, xlsxwriter
 
 
@@ -187,6 +188,198 @@ class TXTWriter:
         self._writer.close()
 
 
+class LineIndexedFile:
+    """Read lines of a (huge) txt file randomly without loading the file
+       The int64 byte offsets of the line starts are built in one vectorized pass, cached on disk next to the file 
+       and reused while the file is unchanged; lines are read on demand from a memory map of the file.
+       Lines keep their line endings and are split on '\n' only, as with readlines() on a file opened in binary mode,
+       or with unicodeLines on every line boundary of str.splitlines, as with readlines() on codecs.open (UTF-8 only).
+    """
+    
+    INDEX_SUFFIX = '.lineidx.npy'
+    UNICODE_INDEX_SUFFIX = '.ulineidx.npy'
+    # Line boundaries of str.splitlines encoded in one byte ('\r\n' is one boundary)
+    _LINE_BREAK_BYTES = np.array([0x0A, 0x0B, 0x0C, 0x0D, 0x1C, 0x1D, 0x1E], dtype=np.uint8)
+    
+    def __init__(self, inputPath, encoding='utf8', stripText=False, indexPath=None, chunkSize=1 << 26,
+                 unicodeLines=False):
+        """Intialize a LineIndexedFile instance.
+        
+           Args:        
+              inputPath (str): The path of the txt file
+              encoding (str): the encoding method
+              stripText (bool): whether to strip the lines
+              indexPath (str): the path of the cached line offsets; inputPath + INDEX_SUFFIX if None
+              chunkSize (int): the number of bytes scanned at a time when the line offsets are built
+              unicodeLines (bool): whether lines are split on '\r', '\r\n', '\x85', '\u2028', etc. as well, like 
+                                   codecs.open(...).readlines(); the encoding must be UTF-8
+        """        
+        
+        if unicodeLines and codecs.lookup(encoding).name != 'utf-8':
+            raise ValueError('unicodeLines requires UTF-8, got {}'.format(encoding))
+        
+        self.inputPath = inputPath
+        self.indexPath = indexPath or str(inputPath) + (self.UNICODE_INDEX_SUFFIX if unicodeLines else self.INDEX_SUFFIX)
+        self._encoding = encoding
+        self._stripText = stripText
+        self._unicodeLines = unicodeLines
+        
+        self._file = open(inputPath, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # Empty files cannot be memory-mapped
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        
+        self.offsets = self._loadOffsets(size)
+        if self.offsets is None:
+            self.offsets = self._buildOffsets(size, chunkSize)
+            try:
+                np.save(self.indexPath, self.offsets)
+            except OSError:
+                pass
+    
+    def _loadOffsets(self, size):
+        """Load the cached line offsets if they are not older than the file and match its size.
+        
+           Args:
+              size (int): the size of the file
+              
+           Returns: 
+              (numpy.ndarray): the line offsets, None if there is no valid cache
+        """
+        
+        try:
+            if os.path.getmtime(self.indexPath) < os.path.getmtime(self.inputPath):
+                return None
+            offsets = np.load(self.indexPath, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        
+        if offsets.dtype != np.int64 or offsets.ndim != 1 or not len(offsets) or offsets[-1] != size:
+            return None
+        
+        return offsets
+    
+    def _buildOffsets(self, size, chunkSize):
+        """Build the line offsets: the start of each line, followed by the size of the file.
+        
+           Args:
+              size (int): the size of the file
+              chunkSize (int): the number of bytes scanned at a time
+              
+           Returns: 
+              (numpy.ndarray): the line offsets
+        """
+        
+        starts = [np.zeros(1, dtype=np.int64)]
+        for start in range(0, size, chunkSize):
+            if self._unicodeLines:
+                lineEnds = self._unicodeLineEnds(start, min(start + chunkSize, size), size)
+            else:
+                chunk = np.frombuffer(self._mmap, dtype=np.uint8, count=min(chunkSize, size - start), offset=start)
+                lineEnds = chunk == 10
+            starts.append(np.flatnonzero(lineEnds).astype(np.int64) + (start + 1))
+        
+        offsets = np.concatenate(starts)
+        if offsets[-1] != size:
+            offsets = np.append(offsets, size)
+        
+        return offsets
+    
+    def _unicodeLineEnds(self, start, end, size):
+        """Find the last bytes of the UTF-8 line boundaries of str.splitlines in a range of the file.
+        
+           Args:
+              start (int): the offset of the range
+              end (int): the end of the range (excluded)
+              size (int): the size of the file
+              
+           Returns: 
+              (numpy.ndarray): for each byte of the range, whether it ends a line boundary
+        """
+        
+        # The range with the 2 bytes before and the byte after it (zeros out of the file)
+        window = np.zeros(end - start + 3, dtype=np.uint8)
+        lo, hi = max(start - 2, 0), min(end + 1, size)
+        window[lo - start + 2:hi - start + 2] = np.frombuffer(self._mmap, dtype=np.uint8, count=hi - lo, offset=lo)
+        prev2, prev, byte, nextByte = window[:-3], window[1:-2], window[2:-1], window[3:]
+        
+        # '\r' followed by '\n' ends at the '\n'; U+0085 is C2 85, U+2028 and U+2029 are E2 80 A8 and E2 80 A9
+        return (np.isin(byte, self._LINE_BREAK_BYTES) & ~((byte == 0x0D) & (nextByte == 0x0A))) | \
+               ((byte == 0x85) & (prev == 0xC2)) | \
+               (((byte == 0xA8) | (byte == 0xA9)) & (prev == 0x80) & (prev2 == 0xE2))
+    
+    def __len__(self):
+        
+        return len(self.offsets) - 1
+    
+    def _decode(self, start, end):
+        
+        line = self._mmap[start:end].decode(self._encoding)
+        
+        return line.strip() if self._stripText else line
+    
+    def __getitem__(self, idx):
+        """Read a line, or a list of lines for a slice.
+        
+           Args:
+              idx (int or slice): the line index
+              
+           Returns: 
+              (str or list): the line(s)
+        """
+        
+        if isinstance(idx, slice):
+            return self.getMany(range(*idx.indices(len(self))))
+        
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('line index out of range')
+        
+        return self._decode(int(self.offsets[idx]), int(self.offsets[idx + 1]))
+    
+    def getMany(self, ids):
+        """Read lines by indexes, the offsets of which are gathered in one vectorized lookup.
+        
+           Args:
+              ids (iterable): the line indexes, e.g., a numpy array
+              
+           Returns: 
+              (list): the lines
+        """
+        
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        ids = np.where(ids < 0, ids + len(self), ids)
+        if len(ids) and (ids.min() < 0 or ids.max() >= len(self)):
+            raise IndexError('line index out of range')
+        
+        starts = self.offsets[ids].tolist()
+        ends = self.offsets[ids + 1].tolist()
+        
+        return [self._decode(start, end) for start, end in zip(starts, ends)]
+    
+    def __iter__(self):
+        
+        for start in range(0, len(self), 65536):
+            yield from self[start:start + 65536]
+    
+    def close(self):
+        """Close the file
+        """
+        
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+    
+    def __enter__(self):
+        
+        return self
+    
+    def __exit__(self, excType, excValue, traceback):
+        
+        self.close()
+
+
 class CSVReader:    
     """Read a csv file
     """    
@@ -198,39 +391,86 @@ class CSVReader:
                inputPath (str): The path of the csv file
                encoding (str): the encoding method
                cleanEOL (bool): Whether the EOL in the source file needs to be cleaned first
-                                If True, a new cleaned file will be created and saved   
+                                If True, carriage returns are removed while the file is streamed   
                delimiter (str): the delimiter used in the csv file                       
         """
         
         csv.field_size_limit(100000000)
         
         if cleanEOL == True:
-            raw = open(inputPath, 'r', newline='', errors='ignore').read()
-            cleaned = re.sub(r'\r', '', raw)
-            rootPath, filename = os.path.split(inputPath)
-            base, ext = os.path.splitext(filename)
-            cleanedPath = os.path.join(rootPath, base + '_cleaned' + ext)
-            open(cleanedPath, 'w', encoding=encoding).write(cleaned)
-            self._csv = csv.reader(open(cleanedPath, 'r', newline='', encoding=encoding), delimiter=delimiter)
+            self._file = open(inputPath, 'r', newline='', encoding=encoding, errors='ignore')
+            self._csv = csv.reader(self._cleanEOLLines(self._file), delimiter=delimiter)
         else:
-            self._csv = csv.reader(open(inputPath, 'r', newline='', encoding=encoding), delimiter=delimiter)
+            self._file = open(inputPath, 'r', newline='', encoding=encoding)
+            self._csv = csv.reader(self._file, delimiter=delimiter)
+        self._rows = self._streamRows()
+    
+    @staticmethod
+    def _cleanEOLLines(f, chunkSize=1 << 20):
+        """Stream the lines of a text file with carriage returns removed.
+           Carriage returns are removed before lines are split, so that a lone '\r' does not end a line.
+           
+           Args:
+               f (file): The text file, opened with newline=''
+               chunkSize (int): The number of characters read at a time
+           
+           Returns: 
+               (generator): lines ending with '\n', except the last one
+        """
+        
+        rest = ''
+        for chunk in iter(lambda: f.read(chunkSize), ''):
+            lines = (rest + chunk.replace('\r', '')).split('\n')
+            rest = lines.pop()
+            for line in lines:
+                yield line + '\n'
+        if rest:
+            yield rest
+    
+    def _streamRows(self):
+        
+        try:
+            yield from self._csv
+        finally:
+            self._file.close()
+    
+    def iterRows(self):
+        """Stream the rows of the csv file lazily (rows not read yet); the file is closed when all rows are read.
+           
+           Returns: 
+               (generator): rows (lists of text contents)
+        """
+        
+        return self._rows
+    
+    def iterChunks(self, chunkSize=10000):
+        """Stream the rows of the csv file in batches (rows not read yet).
+           
+           Args:
+               chunkSize (int): The maximum number of rows of a batch
+           
+           Returns: 
+               (iterator): batches (lists) of rows
+        """
+        
+        return iter(lambda: list(itertools.islice(self._rows, chunkSize)), [])
                 
-    def read(self, hasHeader=True):        
+    def read(self, hasHeader=True, chunkSize=None):        
         """Read the text content of the csv file.
            
            Args:
                hasHeader (bool): Whether the csv file has a header
+               chunkSize (int): If given, the body is streamed in batches of at most chunkSize rows
            
            Returns: 
-               (tuple): (header (str), body (list) of text contents)
+               (tuple): (header (str), body (list) of text contents, or a generator of batches if chunkSize)
         """        
         
-        content = list(self._csv)
-        
-        if hasHeader:
-            header, body = content[0], content[1:]
+        header = next(self._rows, []) if hasHeader else []
+        if chunkSize:
+            body = self.iterChunks(chunkSize)
         else:
-            header, body = [], content
+            body = list(self._rows)
             
         return header, body
     
@@ -267,6 +507,9 @@ class CSVWriter:
 
 class ExcelReader:
     """Read an Excel file
+       Worksheet names are read from the workbook metadata without loading any cell. 
+       iterRows and readAll* stream the rows of the worksheet (read-only openpyxl for xlsx), 
+       other methods read cells randomly from the xlrd worksheet, which is loaded on first use.
     """
     
     def __init__(self, inputPath, worksheetIndex=None, worksheetName=None):
@@ -277,16 +520,44 @@ class ExcelReader:
                worksheetIndex (int): The index of the worksheet
                worksheetName (str): The name of the worksheet
         """    
-                
-        self.workbook = xlrd.open_workbook(inputPath)
-        self.worksheets = self.workbook.sheet_names()
+        
+        self.inputPath = inputPath
+        self._isXls = os.path.splitext(inputPath)[1].lower() == '.xls'
+        self._worksheet = None
+        
+        if self._isXls:
+            self.workbook = xlrd.open_workbook(inputPath, on_demand=True)
+            self.worksheets = self.workbook.sheet_names()
+        else:
+            import openpyxl
+            self.workbook = None
+            workbook = openpyxl.load_workbook(inputPath, read_only=True)
+            self.worksheets = workbook.sheetnames
+            workbook.close()
         
         if not (worksheetIndex or worksheetName):
-            self.worksheet = self.workbook.sheet_by_index(0)
+            self.worksheetIndex = 0
         elif worksheetIndex:
-            self.worksheet = self.workbook.sheet_by_index(worksheetIndex)
+            self.worksheetIndex = worksheetIndex
+        elif worksheetName in self.worksheets:
+            self.worksheetIndex = self.worksheets.index(worksheetName)
         else:
-            self.worksheet = self.workbook.sheet_by_name(worksheetName)
+            raise ValueError('No sheet named <%r>' % worksheetName)
+        
+        if not 0 <= self.worksheetIndex < len(self.worksheets):
+            raise IndexError('list index out of range')
+    
+    @property
+    def worksheet(self):
+        """The xlrd worksheet, loaded on first use
+        """
+        
+        if self._worksheet is None:
+            if self.workbook is None:
+                self.workbook = xlrd.open_workbook(self.inputPath, on_demand=True)
+            self._worksheet = self.workbook.sheet_by_index(self.worksheetIndex)
+        
+        return self._worksheet
 
     def _convertToString(self, cells):
         """Convert raw cell values (numbers) to strings.
@@ -301,6 +572,55 @@ class ExcelReader:
         res = list(map(lambda x: x.ctype==2 and str(int(x.value)) or str(x.value), cells))
         
         return res
+    
+    @staticmethod
+    def _valueToString(value):
+        """Convert a cell value read by openpyxl to a string, as _convertToString does for xlrd cells.
+        
+           Args:
+               value: The cell value
+               
+           Returns:
+               (str): The cell value as a string
+        """
+        
+        if value is None:
+            return ''
+        if isinstance(value, (int, float)):
+            return str(int(value))
+        
+        return str(value)
+    
+    def iterRows(self, asString=False):
+        """Stream the rows of the Excel worksheet, the cells of which are read in bulk.
+           Rows of xlsx files are read with read-only openpyxl, so that memory stays flat for large files
+        
+           Args:
+               asString (bool): Whether the cell values are converted to strings
+               
+           Returns:
+               (generator): lists of cell values in the rows
+        """
+        
+        if self._isXls:
+            worksheet = self.worksheet
+            for idx in range(worksheet.nrows):
+                if asString:
+                    yield [t==xlrd.XL_CELL_NUMBER and str(int(v)) or str(v) for v, t in zip(worksheet.row_values(idx), worksheet.row_types(idx))]
+                else:
+                    yield worksheet.row_values(idx)
+            return
+        
+        import openpyxl
+        workbook = openpyxl.load_workbook(self.inputPath, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[self.worksheetIndex].iter_rows(values_only=True):
+                if asString:
+                    yield [self._valueToString(v) for v in row]
+                else:
+                    yield ['' if v is None else v for v in row]
+        finally:
+            workbook.close()
 
     def readCell(self, row, col):
         """Read a cell, the value type of which is automatically decided.
@@ -470,11 +790,7 @@ class ExcelReader:
                (list): a list of lists (rows) of all items in a sheet, with the value types automatically decided
         """
         
-        res = []
-                
-        numRows = self.worksheet.nrows
-        for idx in range(numRows):
-            res.append(self.readRow(idx, 0))
+        res = list(self.iterRows())
         
         return res    
     
@@ -485,11 +801,7 @@ class ExcelReader:
                (list): a list of lists (rows) of all items in a sheet as strings
         """
         
-        res = []
-                
-        numRows = self.worksheet.nrows
-        for idx in range(numRows):
-            res.append(self.readRowAsString(idx, 0))
+        res = list(self.iterRows(asString=True))
         
         return res   
     
@@ -502,11 +814,7 @@ class ExcelReader:
                (list): a list of lists (columns) of all items in a sheet, with the value types automatically decided
         """
         
-        res = []
-                
-        numCols = self.worksheet.ncols
-        for idx in range(numCols):
-            res.append(self.readCol(idx, 0))
+        res = [list(col) for col in itertools.zip_longest(*self.iterRows(), fillvalue='')]
         
         return res    
     
@@ -517,11 +825,7 @@ class ExcelReader:
                (list): a list of lists (columns) of all items in a sheet as strings
         """
         
-        res = []
-                
-        numCols = self.worksheet.ncols
-        for idx in range(numCols):
-            res.append(self.readColAsString(idx, 0))
+        res = [list(col) for col in itertools.zip_longest(*self.iterRows(asString=True), fillvalue='')]
         
         return res    
     
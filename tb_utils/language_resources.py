@@ -7,11 +7,22 @@
 # This modules provides language constants as resources for convenient calling.
 
 import regex as re
-from expynent import patterns as expy_patterns
-from common_regex import CommonRegex as cr_patterns
-# pip install iso-3166-1
-from iso3166 import Country
-import ftfy
+
+
+class _LazyClassAttribute:
+    """A class attribute computed by its builder on first access and cached on the class afterwards
+    """
+
+    def __init__(self, builder):
+        self._builder = builder
+        self._name = builder.__name__
+
+    def __get__(self, instance, owner):
+        res = self._builder(owner)
+        setattr(owner, self._name, res)
+
+        return res
+
 
 class Codes:
     """Language and culture codes
@@ -195,14 +206,23 @@ class Codes:
                      'Vietnamese': ('vi',)
                      }   
     
-    COUNTRY_CODES = {ftfy.fix_text(Country._member_map_[country].english_short_name): {'alpha2': Country[country].alpha2, 
-                                                                                       'alpha3': Country[country].alpha3, 
-                                                                                       'numeric': Country[country].numeric}                    
-                     for country in Country._member_map_}
+    @_LazyClassAttribute
+    def COUNTRY_CODES(self):
+        # pip install iso-3166-1
+        from iso3166 import Country
+        import ftfy
+
+        return {ftfy.fix_text(Country._member_map_[country].english_short_name): {'alpha2': Country[country].alpha2, 
+                                                                                  'alpha3': Country[country].alpha3, 
+                                                                                  'numeric': Country[country].numeric}                    
+                for country in Country._member_map_}
+
+    _mappings = {}
     
     @classmethod   
     def mappings(self, mappingFrom, mappingTo):
         """For covenient conversions between language codes
+           The mappings are built once per (mappingFrom, mappingTo) and shared, so do not modify them
     
            Args:        
                mappingFrom (str): 'name', 'yappn', 'google', 'microsoft', or 'iso-639-1'
@@ -211,6 +231,11 @@ class Codes:
            Returns:
                (dict): Mappings from one code system to the other   
         """        
+
+        try:
+            return self._mappings[(mappingFrom, mappingTo)]
+        except KeyError:
+            pass
     
         lc = {language: {'name': language, 
                          'yappn': self.LANGUAGE_CODES[language]['yappn'], 
@@ -220,6 +245,7 @@ class Codes:
               for language in self.LANGUAGE_CODES}
         
         res = {lc[lang][mappingFrom]: lc[lang][mappingTo] for lang in lc if lc[lang][mappingFrom]}
+        self._mappings[(mappingFrom, mappingTo)] = res
     
         return res   
     
@@ -293,13 +319,18 @@ class CommonRegex:
                       'spa': CURRENCY_UNITS_Spanish, 
                       'zhs': CURRENCY_UNITS_Chinese_Simplified, 
                       'zht': CURRENCY_UNITS_Chinese_Traditional}
-    CURRENCY_PATTERN = {}
-    for lang in CURRENCY_UNITS:
-        expanded_symbols = [re.escape(s) if s[0].isalpha() else r'(?:[A-Z]{2})?' + re.escape(s) for s in CURRENCY_UNITS[lang]['symbols']]
-        CP_unit = r'(?:(?:(?<![^\W\d_])(' + r'|'.join(CURRENCY_UNITS[lang]['codes'] + tuple(expanded_symbols)) + r')(?![^\W\d_])))'
-        CP_currencyExp = r'(?:(?:' + CP_numberRange + r'(?:\s*' + CP_unit + r'))|(?:' + CP_unit + r'(?:\s*' + CP_numberRange + ')))'
-        CP_currencySelection = r'(?:' + CP_currencyExp + r'(?:(?:\s*/\s*' + CP_currencyExp + r')*))'
-        CURRENCY_PATTERN[lang] = r'(?P<currency>' + CP_currencySelection + ')'
+
+    @_LazyClassAttribute
+    def CURRENCY_PATTERN(self):
+        res = {}
+        for lang in self.CURRENCY_UNITS:
+            expanded_symbols = [re.escape(s) if s[0].isalpha() else r'(?:[A-Z]{2})?' + re.escape(s) for s in self.CURRENCY_UNITS[lang]['symbols']]
+            CP_unit = r'(?:(?:(?<![^\W\d_])(' + r'|'.join(self.CURRENCY_UNITS[lang]['codes'] + tuple(expanded_symbols)) + r')(?![^\W\d_])))'
+            CP_currencyExp = r'(?:(?:' + self.CP_numberRange + r'(?:\s*' + CP_unit + r'))|(?:' + CP_unit + r'(?:\s*' + self.CP_numberRange + ')))'
+            CP_currencySelection = r'(?:' + CP_currencyExp + r'(?:(?:\s*/\s*' + CP_currencyExp + r')*))'
+            res[lang] = r'(?P<currency>' + CP_currencySelection + ')'
+
+        return res
         
     # Language-sensitive
 
@@ -473,14 +504,19 @@ class CommonRegex:
              'spa': UNITS_Spanish, 
              'zhs': UNITS_Chinese_Simplified,
              'zht': UNITS_Chinese_Traditional}
-    QUANTITY_PATTERN = {}
-    for lang in UNITS:
-        QP_unit = r'(?:(?:' + r'|'.join(sum(set(list(UNITS[lang].values()) + list(UNITS['eng'].values())), ())) + r')(?![\w\'"’”/]))'
-        QP_numberUnitExp = r'(?:' + QP_numberRange + r'(?:\s*' + QP_unit + r'))'
-        QP_dimension = r'(?:' + QP_numberUnitExp + '(?:(?:\s*(?:x|by)\s*' + QP_numberUnitExp + r')*))'
-        QP_dimensionRange = r'(?:' + QP_dimension + r'(?:(?:\s*-\s*' + QP_dimension + r')*))'
-        QP_dimensionRangeSelection = r'(' + QP_dimensionRange + r'(?:(?:\s*/\s*' + QP_dimensionRange + r')*))'
-        QUANTITY_PATTERN[lang] = r'(?i)(?P<quantity>' + QP_dimensionRangeSelection + ')' 
+
+    @_LazyClassAttribute
+    def QUANTITY_PATTERN(self):
+        res = {}
+        for lang in self.UNITS:
+            QP_unit = r'(?:(?:' + r'|'.join(sum(set(list(self.UNITS[lang].values()) + list(self.UNITS['eng'].values())), ())) + r')(?![\w\'"’”/]))'
+            QP_numberUnitExp = r'(?:' + self.QP_numberRange + r'(?:\s*' + QP_unit + r'))'
+            QP_dimension = r'(?:' + QP_numberUnitExp + '(?:(?:\s*(?:x|by)\s*' + QP_numberUnitExp + r')*))'
+            QP_dimensionRange = r'(?:' + QP_dimension + r'(?:(?:\s*-\s*' + QP_dimension + r')*))'
+            QP_dimensionRangeSelection = r'(' + QP_dimensionRange + r'(?:(?:\s*/\s*' + QP_dimensionRange + r')*))'
+            res[lang] = r'(?i)(?P<quantity>' + QP_dimensionRangeSelection + ')'
+
+        return res
          
     DP_year_Arabic  = r'(?:\b(?:\d{4})\b)' 
     DP_year_Chinese_Simplified  = r'(?:\b(?:\d{4})年?)'
@@ -539,7 +575,32 @@ class CommonRegex:
                  'spa': DP_month_Spanish, 
                  'zhs': DP_month_Chinese_Simplified,
                  'zht': DP_month_Chinese_Traditional}
-    
+
+    # Month names of DP_months (lowercased, without the abbreviation dot) -> month numbers
+    # Numeric months (including CJK "N月") are not listed
+    DP_month_Chinese_numbers = {'一月': 1, '二月': 2, '三月': 3, '四月': 4, '五月': 5, '六月': 6,
+                                '七月': 7, '八月': 8, '九月': 9, '十月': 10, '十一月': 11, '十二月': 12}
+    DP_month_numbers = {'ara': {'يناير': 1, 'فبراير': 2, 'مارس': 3, 'أبريل': 4, 'مايو': 5, 'يونيو': 6,
+                                'يوليو': 7, 'أغسطس': 8, 'سبتمبر': 9, 'أكتوبر': 10, 'نوفمبر': 11, 'ديسمبر': 12},
+                        'deu': {'januar': 1, 'jan': 1, 'jän': 1, 'februar': 2, 'feb': 2, 'märz': 3, 'april': 4, 'apr': 4,
+                                'mai': 5, 'juni': 6, 'juli': 7, 'august': 8, 'aug': 8, 'september': 9, 'sept': 9,
+                                'oktober': 10, 'okt': 10, 'november': 11, 'nov': 11, 'dezember': 12, 'dez': 12},
+                        'eng': {'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3, 'april': 4, 'apr': 4,
+                                'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7, 'august': 8, 'aug': 8,
+                                'september': 9, 'sep': 9, 'october': 10, 'oct': 10, 'november': 11, 'nov': 11,
+                                'december': 12, 'dec': 12},
+                        'fra': {'janvier': 1, 'janv': 1, 'février': 2, 'févr': 2, 'mars': 3, 'avril': 4, 'mai': 5,
+                                'juin': 6, 'juillet': 7, 'juil': 7, 'août': 8, 'septembre': 9, 'sept': 9,
+                                'octobre': 10, 'oct': 10, 'novembre': 11, 'nov': 11, 'décembre': 12, 'déc': 12},
+                        'jpn': {},
+                        'spa': {'enero': 1, 'eno': 1, 'febrero': 2, 'feb': 2, 'fbro': 2, 'marzo': 3, 'mzo': 3,
+                                'abril': 4, 'ab': 4, 'abr': 4, 'mayo': 5, 'junio': 6, 'jun': 6, 'julio': 7, 'jul': 7,
+                                'agosto': 8, 'agto': 8, 'septiembre': 9, 'sept': 9, 'sbre': 9, 'set': 9,
+                                'octubre': 10, 'oct': 10, 'obre': 10, 'noviembre': 11, 'nov': 11, 'nbre': 11,
+                                'diciembre': 12, 'dic': 12, 'dbre': 12},
+                        'zhs': DP_month_Chinese_numbers,
+                        'zht': DP_month_Chinese_numbers}
+
     DP_day_Arabic = r'(?:\b(?:\d{1,2})\b)'
     DP_day_Chinese_Simplified = r'(?:\d{1,2}((?:日|号)|\b))'
     DP_day_Chinese_Traditional = r'(?:\d{1,2}((?:日|號)|\b))'
@@ -574,66 +635,130 @@ class CommonRegex:
                      'zhs': DP_separator_Chinese_Simplified,
                      'zht': DP_separator_Chinese_Traditional}
     
-    DATE_PATTERN = {}
-    DATE_PATTERN_ymd, DATE_PATTERN_ym, DATE_PATTERN_md = {}, {}, {}
-    for lang in DP_months:
+    @classmethod
+    def _buildDatePatterns(self, lang):
+        """Build the full and the year-month-day date patterns of a language
+
+           Args:
+              lang (str): the 3-letter Yappn language code
+
+           Returns:
+              (tuple): (full date pattern, year-month-day date pattern)
+        """
+
+        DP_years, DP_months, DP_days, DP_separators = self.DP_years, self.DP_months, self.DP_days, self.DP_separators
+
         DP_date_ymd = r'(?:(?:' + DP_years[lang] + DP_separators[lang] + DP_months[lang] + DP_separators[lang] + DP_days[lang] + r')|(?:' + DP_months[lang] + DP_separators[lang] + DP_days[lang] + DP_separators[lang] + DP_years[lang] + r')|(?:' +\
             DP_days[lang] + DP_separators[lang] + DP_months[lang] + DP_separators[lang] + DP_years[lang] + r'))'
-        DP_date_ym = r'(?:(?:' + DP_years[lang] + DP_separators[lang] + DP_months[lang] + r')|(?:' + DP_months[lang] + DP_separators[lang] + DP_years[lang] + r'))'        
-        DP_date_md = r'(?:(?:' + DP_days[lang] + DP_separators[lang] + DP_months[lang] + r')|(?:' + DP_months[lang] + DP_separators[lang] + DP_days[lang] + r'))' 
-        DP_dateExp = r'(?:(?:' + DP_date_ymd + r')|(?:' + DP_date_ym + r')|(?:' + DP_date_md + r'))'  
-        DP_dateRange = r'(?:' + DP_dateExp + r'(?:(?:\s*-\s*' + DP_dateExp + r')*))'          
-        DP_dateRangeSelection = r'(' + DP_dateRange + r'(?:(?:\s*/\s*' + DP_dateRange + r')*))'       
-        DATE_PATTERN[lang] = r'(?i)(?P<date>' + DP_dateRangeSelection + ')'   
-        
+        DP_date_ym = r'(?:(?:' + DP_years[lang] + DP_separators[lang] + DP_months[lang] + r')|(?:' + DP_months[lang] + DP_separators[lang] + DP_years[lang] + r'))'
+        DP_date_md = r'(?:(?:' + DP_days[lang] + DP_separators[lang] + DP_months[lang] + r')|(?:' + DP_months[lang] + DP_separators[lang] + DP_days[lang] + r'))'
+        DP_dateExp = r'(?:(?:' + DP_date_ymd + r')|(?:' + DP_date_ym + r')|(?:' + DP_date_md + r'))'
+        DP_dateRange = r'(?:' + DP_dateExp + r'(?:(?:\s*-\s*' + DP_dateExp + r')*))'
+        DP_dateRangeSelection = r'(' + DP_dateRange + r'(?:(?:\s*/\s*' + DP_dateRange + r')*))'
+        pattern = r'(?i)(?P<date>' + DP_dateRangeSelection + ')'
+
         # Add sub date patterns
-        DP_dateExp_ymd = r'(?:' + DP_date_ymd + r')'  
-        DP_dateRange_ymd = r'(?:' + DP_dateExp_ymd + r'(?:(?:\s*-\s*' + DP_dateExp_ymd + r')*))'          
-        DP_dateRangeSelection_ymd = r'(' + DP_dateRange_ymd + r'(?:(?:\s*/\s*' + DP_dateRange_ymd + r')*))'       
-        DATE_PATTERN_ymd[lang] = r'(?i)(?P<date>' + DP_dateRangeSelection_ymd + ')'        
-        
+        DP_dateExp_ymd = r'(?:' + DP_date_ymd + r')'
+        DP_dateRange_ymd = r'(?:' + DP_dateExp_ymd + r'(?:(?:\s*-\s*' + DP_dateExp_ymd + r')*))'
+        DP_dateRangeSelection_ymd = r'(' + DP_dateRange_ymd + r'(?:(?:\s*/\s*' + DP_dateRange_ymd + r')*))'
+        pattern_ymd = r'(?i)(?P<date>' + DP_dateRangeSelection_ymd + ')'
+
+        return pattern, pattern_ymd
+
+    @_LazyClassAttribute
+    def DATE_PATTERN(self):
+        return {lang: self._buildDatePatterns(lang)[0] for lang in self.DP_months}
+
+    @_LazyClassAttribute
+    def DATE_PATTERN_ymd(self):
+        return {lang: self._buildDatePatterns(lang)[1] for lang in self.DP_months}
+
+    # Compiled patterns cached by (name, lang)
+    _compiled = {}
+
+    @classmethod
+    def compiled(self, name, lang=None):
+        """Get a compiled pattern, which is compiled on first access and cached afterwards
+
+           Args:
+              name (str): the name of the pattern, e.g., 'URL_PATTERN' or 'DATE_PATTERN_ymd'
+              lang (str or None): the 3-letter Yappn language code for language-sensitive patterns
+                                  if None, the pattern is language-insensitive
+
+           Returns:
+              (regex.Pattern): the compiled pattern
+        """
+
+        try:
+            res = self._compiled[(name, lang)]
+        except KeyError:
+            pattern = getattr(self, name) if lang is None else getattr(self, name)[lang]
+            res = self._compiled[(name, lang)] = re.compile(pattern)
+
+        return res
+
                   
-class CommonRegexFrom3P:
-    """Common regular expressions from 3rd-party libraries
-       Including expynent and commonregex
-       The searching behavior is less consistent than CommonRegex
-       No named grouping is used, so use ...group(0) in mosts cases
-       The patterns from cr_patterns are re.compiled, so use xxx.pattern and xxx.flags in re.search(...) 
+def _buildCommonRegexFrom3P():
+    """Build CommonRegexFrom3P, so that expynent and common_regex are only imported when it is used
+
+       Returns:
+          (type): the CommonRegexFrom3P class
     """
-    
-    # Language-insensitive
-    
-    URL_PATTERN = cr_patterns.link.pattern, cr_patterns.link.flags
-    DIGIT_PATTERN = expy_patterns.FLOAT_NUMBER
-    TIME_PATTERN = cr_patterns.time.pattern, cr_patterns.time.flags
-    PHONENUMBER_NOEXT_PATTERN = cr_patterns.phone.pattern, cr_patterns.phone.flags
-    PHONENUMBER_EXT_PATTERN = cr_patterns.phones_with_exts.pattern, cr_patterns.phones_with_exts.flags
-    EMAIL_PATTERN = cr_patterns.email.pattern, cr_patterns.email.flags
-    
-    BITCOIN_ADDRESS_PATTERN = expy_patterns.BITCOIN_ADDRESS
-    CREDIT_CARD_PATTERN = expy_patterns.CREDIT_CARD
-    ETHEREUM_ADDRESS_PATTERN = expy_patterns.ETHEREUM_ADDRESS
-    IP_V4_PATTERN = expy_patterns.IP_V4
-    IP_V6_PATTERN = expy_patterns.IP_V6
-    ISBN_PATTERN = expy_patterns.ISBN
-    LATITUDE_PATTERN = expy_patterns.LATITUDE
-    LONGITUDE_PATTERN = expy_patterns.LONGITUDE
-    MAC_ADDRESS_PATTERN = expy_patterns.MAC_ADDRESS    
-    ROMAN_NUMERAL_PATTERN = expy_patterns.ROMAN_NUMERALS
-    UUID_PATTERN = expy_patterns.UUID
-    HEX_COLOR_PATTERN = cr_patterns.hex_color.pattern, cr_patterns.hex_color.flags
-        
-    # Locale-sensitive
-    
-    LICENSE_PLATE_PATTERN = {'fra': expy_patterns.LICENSE_PLATE['FR']}
-    ZIP_CODE_PATTERN = expy_patterns.ZIP_CODE   # keys are "alpha2" in COUNTRY_CODES
-    STREET_ADDRESS_PATTERN = {'eng': (cr_patterns.street_address.pattern, cr_patterns.street_address.flags)}
-    
-    # Language-sensitive
-    
-    DATE_PATTERN = {'eng': (cr_patterns.date.pattern, cr_patterns.date.flags)}
-    
-    
+
+    from expynent import patterns as expy_patterns
+    from common_regex import CommonRegex as cr_patterns
+
+    class CommonRegexFrom3P:
+        """Common regular expressions from 3rd-party libraries
+           Including expynent and commonregex
+           The searching behavior is less consistent than CommonRegex
+           No named grouping is used, so use ...group(0) in mosts cases
+           The patterns from cr_patterns are re.compiled, so use xxx.pattern and xxx.flags in re.search(...) 
+        """
+
+        # Language-insensitive
+
+        URL_PATTERN = cr_patterns.link.pattern, cr_patterns.link.flags
+        DIGIT_PATTERN = expy_patterns.FLOAT_NUMBER
+        TIME_PATTERN = cr_patterns.time.pattern, cr_patterns.time.flags
+        PHONENUMBER_NOEXT_PATTERN = cr_patterns.phone.pattern, cr_patterns.phone.flags
+        PHONENUMBER_EXT_PATTERN = cr_patterns.phones_with_exts.pattern, cr_patterns.phones_with_exts.flags
+        EMAIL_PATTERN = cr_patterns.email.pattern, cr_patterns.email.flags
+
+        BITCOIN_ADDRESS_PATTERN = expy_patterns.BITCOIN_ADDRESS
+        CREDIT_CARD_PATTERN = expy_patterns.CREDIT_CARD
+        ETHEREUM_ADDRESS_PATTERN = expy_patterns.ETHEREUM_ADDRESS
+        IP_V4_PATTERN = expy_patterns.IP_V4
+        IP_V6_PATTERN = expy_patterns.IP_V6
+        ISBN_PATTERN = expy_patterns.ISBN
+        LATITUDE_PATTERN = expy_patterns.LATITUDE
+        LONGITUDE_PATTERN = expy_patterns.LONGITUDE
+        MAC_ADDRESS_PATTERN = expy_patterns.MAC_ADDRESS    
+        ROMAN_NUMERAL_PATTERN = expy_patterns.ROMAN_NUMERALS
+        UUID_PATTERN = expy_patterns.UUID
+        HEX_COLOR_PATTERN = cr_patterns.hex_color.pattern, cr_patterns.hex_color.flags
+
+        # Locale-sensitive
+
+        LICENSE_PLATE_PATTERN = {'fra': expy_patterns.LICENSE_PLATE['FR']}
+        ZIP_CODE_PATTERN = expy_patterns.ZIP_CODE   # keys are "alpha2" in COUNTRY_CODES
+        STREET_ADDRESS_PATTERN = {'eng': (cr_patterns.street_address.pattern, cr_patterns.street_address.flags)}
+
+        # Language-sensitive
+
+        DATE_PATTERN = {'eng': (cr_patterns.date.pattern, cr_patterns.date.flags)}
+
+    return CommonRegexFrom3P
+
+
+def __getattr__(name):
+    if name == 'CommonRegexFrom3P':
+        globals()[name] = _buildCommonRegexFrom3P()
+        return globals()[name]
+
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
 class Writing:
     """Symbols, characters, punctuations, and other constants
     """
@@ -810,5 +935,34 @@ class Writing:
                                'zhs': ['CJK'],
                                'zht': ['CJK']
                                }
-    
-    
\ No newline at end of file
+
+
+def benchmark(number=10000):
+    """Report the import time of this module and the per-call overhead of the cached lookups
+
+       Args:
+          number (int): number of calls timed per lookup
+    """
+
+    import os
+    import subprocess
+    import sys
+    import timeit
+
+    # Imported standalone in a fresh interpreter, so that the package __init__ is not counted
+    code = 'import time; t = time.perf_counter(); import language_resources; print(time.perf_counter() - t)'
+    elapsed = float(subprocess.check_output([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__))))
+    print('import: {:.1f} ms'.format(elapsed * 1000))
+
+    timings = {'Codes.mappings': lambda: Codes.mappings('iso-639-1', 'yappn'),
+               'CommonRegex.compiled': lambda: CommonRegex.compiled('CURRENCY_PATTERN', 'eng'),
+               're.compile': lambda: re.compile(CommonRegex.CURRENCY_PATTERN['eng'])}
+
+    for name, func in timings.items():
+        func()
+        per_call = timeit.timeit(func, number=number) / number
+        print('{}: {:.2f} us per call'.format(name, per_call * 1e6))
+
+
+if __name__ == '__main__':
+    benchmark()
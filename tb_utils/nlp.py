@@ -7,9 +7,12 @@
 # This modules provides basic NLP tools for convenient calling.
 
 import html
+import importlib
+import inspect
 import os
 import string
 import sys
+import time
 import unicodedata
 from pathlib import Path
 
@@ -17,26 +20,111 @@ base_dir = os.path.dirname(Path(__file__).parent.parent)
 sys.path.append(base_dir)
 sys.path.append(base_dir)
 
-import textdistance
-from bs4 import BeautifulSoup
-import nltk, jieba, pangu
-from janome.tokenizer import Tokenizer as jpn_tokenizer
-from konlpy.tag import Kkma
-from pyarabic import araby
 import regex as re
-import ftfy
-import langid
-from hanziconv import HanziConv
-from sacremoses import MosesTokenizer, MosesDetokenizer
-import spacy
 
-from .rules import NumberTranslator
 from .language_resources import Codes, Writing, CommonRegex
 
 YAPPN_NAME_MAPPINGS = Codes.mappings('yappn', 'name')
 YAPPN_ISO6391_MAPPINGS = Codes.mappings('yappn', 'iso-639-1')
 
 
+class Backends:
+    """Lazy registry of the third-party NLP backends
+       A backend module is imported the first time it is requested and cached afterwards,
+       so importing this module does not pay for backends a language never uses
+    """
+
+    # Backend name -> module to import
+    MODULES = {'bs4': 'bs4',
+               'ftfy': 'ftfy',
+               'hanziconv': 'hanziconv',
+               'hanziconv_charmap': 'hanziconv.charmap',
+               'janome': 'janome.tokenizer',
+               'jieba': 'jieba',
+               'konlpy': 'konlpy.tag',
+               'langid': 'langid',
+               'nltk': 'nltk',
+               'pangu': 'pangu',
+               'pyarabic': 'pyarabic.araby',
+               'rapidfuzz': 'rapidfuzz.distance',
+               'sacremoses': 'sacremoses',
+               'spacy': 'spacy',
+               'textdistance': 'textdistance'}
+
+    # 3-letter Yappn language code -> backends used by its tokenizers and humanizer
+    LANGUAGE_BACKENDS = {'ara': ('nltk', 'pyarabic', 'bs4', 'ftfy'),
+                         'jpn': ('nltk', 'janome', 'bs4', 'ftfy'),
+                         'kor': ('konlpy',),
+                         'ypt': ('nltk', 'jieba', 'pangu', 'hanziconv', 'bs4', 'ftfy'),
+                         'zhh': ('nltk', 'jieba', 'pangu', 'hanziconv', 'bs4', 'ftfy'),
+                         'zhs': ('nltk', 'jieba', 'pangu', 'hanziconv', 'bs4', 'ftfy'),
+                         'zht': ('nltk', 'jieba', 'pangu', 'hanziconv', 'bs4', 'ftfy')}
+    LATIN_BACKENDS = ('nltk', 'sacremoses', 'bs4', 'ftfy')
+
+    _loaded = {}
+
+    @classmethod
+    def get(self, name):
+        """Get a backend module, importing it on first use
+
+           Args:
+               name (str): the backend name, a key of MODULES
+
+           Returns:
+               (module): the imported backend module
+        """
+
+        try:
+            res = self._loaded[name]
+        except KeyError:
+            if name not in self.MODULES:
+                raise NotImplementedError('Backend %s is not registered' % name)
+            res = self._loaded[name] = importlib.import_module(self.MODULES[name])
+
+        return res
+
+    @classmethod
+    def available(self, name):
+        """Check whether a backend can be imported, e.g., for optional accelerators
+
+           Args:
+               name (str): the backend name, a key of MODULES
+
+           Returns:
+               (bool): whether the backend is importable
+        """
+
+        try:
+            self.get(name)
+        except ImportError:
+            return False
+
+        return True
+
+    @classmethod
+    def preload(self, langs):
+        """Import all the backends needed by the given languages in advance,
+           e.g., as the initializer of pool workers
+
+           Args:
+               langs (list): a list of 3-letter Yappn language codes
+        """
+
+        for lang in langs:
+            for name in self.LANGUAGE_BACKENDS.get(lang, self.LATIN_BACKENDS):
+                self.get(name)
+
+    @classmethod
+    def loaded(self):
+        """Get the names of the backends imported so far
+
+           Returns:
+               (list): a sorted list of backend names
+        """
+
+        return sorted(self._loaded)
+
+
 class SentenceTokenizer_nltk:
     """Sentence tokenzier wrapper for various languages
     """
@@ -51,11 +139,11 @@ class SentenceTokenizer_nltk:
         self.lang = lang
         if lang in ('ces', 'dan', 'nld', 'eng', 'fin', 'fra', 'deu', 'ell', 'ita', 'nor',
                     'pol', 'por', 'spa', 'swe', 'tur'):
-            self.sentenceTokenizer = nltk.data.load('tokenizers/punkt/%s.pickle' % YAPPN_NAME_MAPPINGS[lang].lower())
+            self.sentenceTokenizer = Backends.get('nltk').data.load('tokenizers/punkt/%s.pickle' % YAPPN_NAME_MAPPINGS[lang].lower())
         elif lang in ['jpn', 'ypt', 'zhh', 'zhs', 'zht']:
-            self.sentenceTokenizer = nltk.tokenize.RegexpTokenizer(r'[^。？！]+?[。？！]')
+            self.sentenceTokenizer = Backends.get('nltk').tokenize.RegexpTokenizer(r'[^。？！]+?[。？！]')
         elif lang == 'ara':
-            self.sentenceTokenizer = nltk.tokenize.RegexpTokenizer(
+            self.sentenceTokenizer = Backends.get('nltk').tokenize.RegexpTokenizer(
                 r'[^' + r''.join(['\.', '!', u'؟']) + r']+?[' + r''.join(['\.', '!', u'؟']) + r']')
         else:
             raise NotImplementedError('language %s is not implemented' % lang)
@@ -164,7 +252,7 @@ class SentenceTokenizer:
 
         self.lang = lang
         if lang in ('eng', 'fra', 'spa', 'zhs'):
-            self.sentenceTokenizer = spacy.load(YAPPN_ISO6391_MAPPINGS[lang], disable=['parser'])
+            self.sentenceTokenizer = Backends.get('spacy').load(YAPPN_ISO6391_MAPPINGS[lang], disable=['parser'])
             self.sentenceTokenizer.add_pipe(self.sentenceTokenizer.create_pipe('sentencizer'))
         else:
             self.sentenceTokenizer = SentenceTokenizer_nltk(lang)
@@ -275,15 +363,15 @@ class SubsentenceTokenizer:
 
         continuousSymbolPattern = r'[' + re.escape(string.punctuation) + r']{4,}'
 
-        self.symbolTokenizer = nltk.tokenize.RegexpTokenizer(continuousSymbolPattern)
+        self.symbolTokenizer = Backends.get('nltk').tokenize.RegexpTokenizer(continuousSymbolPattern)
 
         if lang in ('ces', 'dan', 'nld', 'eng', 'fin', 'fra', 'deu', 'ell', 'ita', 'nor',
                     'pol', 'por', 'spa', 'swe', 'tur'):
-            self.sentenceTokenizer = nltk.tokenize.RegexpTokenizer(';', gaps=True)
+            self.sentenceTokenizer = Backends.get('nltk').tokenize.RegexpTokenizer(';', gaps=True)
         elif lang in ['jpn', 'ypt', 'zhh', 'zhs', 'zht']:
-            self.sentenceTokenizer = nltk.tokenize.RegexpTokenizer('；', gaps=True)
+            self.sentenceTokenizer = Backends.get('nltk').tokenize.RegexpTokenizer('；', gaps=True)
         elif lang == 'ara':
-            self.sentenceTokenizer = nltk.tokenize.RegexpTokenizer(u'؛', gaps=True)
+            self.sentenceTokenizer = Backends.get('nltk').tokenize.RegexpTokenizer(u'؛', gaps=True)
         else:
             raise NotImplementedError('language %s is not implemented' % lang)
 
@@ -423,37 +511,78 @@ class WordTokenizer:
     """Word tokenzier wrapper for various languages
     """
 
-    def __init__(self, lang, defaultTokenizer='moses'):
+    # CJK backend instances shared by all the tokenizers of a process in performance mode: name -> instance
+    _sharedBackends = {}
+
+    def __init__(self, lang, defaultTokenizer='moses', performance=False, cacheDir=None):
         """Intialize a WordTokenizer instance.
 
            Args:
                lang (str): the 3-letter Yappn language code
                defaultTokenizer (str): the name of the default tokenizer
                                        e.g., 'moses', 'nltk', 'whitespace'
+               performance (bool): CJK performance mode: janome with the memory-mapped dictionary and surface-only
+                                   streaming output, jieba initialized up front with a cached dictionary, and one
+                                   janome/Kkma instance shared by all the tokenizers of the process
+               cacheDir (str or None): the directory of jieba's dictionary cache in performance mode
+                                       (default: the system temporary directory)
         """
 
         self.lang = lang
         self._default = defaultTokenizer
+        self._performance = performance
+        self._janomeOptions = {}
 
         if lang in ('ces', 'dan', 'nld', 'eng', 'fin', 'fra', 'deu', 'ell', 'ita', 'nor',
                     'pol', 'por', 'spa', 'swe', 'tur'):
             if defaultTokenizer == 'moses':
-                self.wordTokenizer = MosesTokenizer(lang=YAPPN_ISO6391_MAPPINGS[lang])
+                self.wordTokenizer = Backends.get('sacremoses').MosesTokenizer(lang=YAPPN_ISO6391_MAPPINGS[lang])
             elif defaultTokenizer == 'nltk':
-                self.wordTokenizer = nltk.word_tokenize
+                self.wordTokenizer = Backends.get('nltk').word_tokenize
             else:
                 self.wordTokenizer = None
         elif lang == 'jpn':
-            self.wordTokenizer = jpn_tokenizer()
+            if performance:
+                self.wordTokenizer = self._shared('janome', lambda: Backends.get('janome').Tokenizer(mmap=True, wakati=True))
+                # janome < 0.5 only streams when asked to; later versions always stream
+                if 'stream' in inspect.signature(self.wordTokenizer.tokenize).parameters:
+                    self._janomeOptions = {'stream': True}
+            else:
+                self.wordTokenizer = Backends.get('janome').Tokenizer()
         elif lang in ('ypt', 'zhh', 'zhs', 'zht'):
-            self.wordTokenizer = jieba
+            self.wordTokenizer = Backends.get('jieba')
+            if performance:
+                if cacheDir:
+                    self.wordTokenizer.dt.tmp_dir = cacheDir
+                # Build (or load the cached) dictionary now rather than on the first call
+                self.wordTokenizer.initialize()
         elif lang == 'kor':
-            self.wordTokenizer = Kkma()
+            if performance:
+                self.wordTokenizer = self._shared('kkma', lambda: Backends.get('konlpy').Kkma())
+            else:
+                self.wordTokenizer = Backends.get('konlpy').Kkma()
         elif lang == 'ara':
-            self.wordTokenizer = araby
+            self.wordTokenizer = Backends.get('pyarabic')
         else:
             raise NotImplementedError('language %s is not implemented' % lang)
 
+    @classmethod
+    def _shared(self, name, build):
+        """Get a backend instance shared by the process, building it on first use
+
+           Args:
+               name (str): the name of the instance
+               build (function): builds the instance
+
+           Returns:
+               (object): the shared instance
+        """
+
+        if name not in self._sharedBackends:
+            self._sharedBackends[name] = build()
+
+        return self._sharedBackends[name]
+
     def tokenize(self, text, escape=False):
         """Tokenize a text into words.
 
@@ -478,7 +607,7 @@ class WordTokenizer:
             res = self.wordTokenizer.tokenize(text)
             res = [t for t in res if t.strip()]
         elif self.lang == 'jpn':
-            res = self.wordTokenizer.tokenize(text, wakati=True)
+            res = self.wordTokenizer.tokenize(text, wakati=True, **self._janomeOptions)
             res = [t for t in res if t.strip()]
         elif self.lang in ('ypt', 'zhh', 'zhs', 'zht'):
             res = self.wordTokenizer.lcut(text)
@@ -491,6 +620,86 @@ class WordTokenizer:
 
         return res
 
+    def tokenizeMany(self, texts, nJobs=1, chunkSize=500, escape=False):
+        """Tokenize many texts into words, in worker processes if nJobs > 1
+           Chinese uses jieba's parallel mode (POSIX only); other languages use a process pool
+           whose workers each build one tokenizer
+
+           Args:
+               texts (list): the input texts
+               nJobs (int): the number of worker processes; 1 tokenizes in the current process
+               chunkSize (int): the number of texts sent to a worker at a time
+               escape (bool): passed to tokenize
+
+           Returns:
+              (list): a list of tokenized texts, each a list of strings
+        """
+
+        texts = list(texts)
+
+        if nJobs == 1 or len(texts) <= 1:
+            res = [self.tokenize(text, escape=escape) for text in texts]
+        elif self.lang in ('ypt', 'zhh', 'zhs', 'zht') and os.name == 'posix':
+            # jieba's parallel mode cuts line by line, so one text per line, each ending with a '\n' token;
+            # line breaks inside a text are only separators for jieba and their tokens are dropped anyway
+            lineBreaks = r'[\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]'
+            lines = ''.join(re.sub(lineBreaks, ' ', text) + '\n' for text in texts)
+            self.wordTokenizer.enable_parallel(nJobs)
+            try:
+                # enable_parallel only replaces the module-level cut (lcut is bound to the default tokenizer)
+                tokens = list(self.wordTokenizer.cut(lines))
+            finally:
+                self.wordTokenizer.disable_parallel()
+
+            res, words = [], []
+            for token in tokens:
+                if token == '\n':
+                    res.append(words)
+                    words = []
+                elif token.strip():
+                    words.append(token)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            chunks = [(texts[i:i + chunkSize], escape) for i in range(0, len(texts), chunkSize)]
+            with ProcessPoolExecutor(max_workers=nJobs, initializer=_initWorkerWordTokenizer,
+                                     initargs=(self.lang, self._default, self._performance)) as executor:
+                res = [words for chunk in executor.map(_tokenizeChunk, chunks) for words in chunk]
+
+        return res
+
+
+# The WordTokenizer of a tokenizeMany worker process
+_workerWordTokenizer = None
+
+
+def _initWorkerWordTokenizer(lang, defaultTokenizer, performance):
+    """Build the WordTokenizer of a tokenizeMany worker process once, so that dictionaries (and the JVM) load once
+
+       Args:
+          lang (str): the 3-letter Yappn language code
+          defaultTokenizer (str): the name of the default tokenizer
+          performance (bool): the CJK performance mode
+    """
+
+    global _workerWordTokenizer
+    _workerWordTokenizer = WordTokenizer(lang, defaultTokenizer, performance)
+
+
+def _tokenizeChunk(args):
+    """Tokenize a chunk of texts in a tokenizeMany worker process
+
+       Args:
+          args (tuple): (texts, escape)
+
+       Returns:
+          (list): a list of tokenized texts
+    """
+
+    texts, escape = args
+
+    return [_workerWordTokenizer.tokenize(text, escape=escape) for text in texts]
+
 
 class WordDetokenizer:
     """Word detokenzier wrapper for various languages
@@ -510,7 +719,7 @@ class WordDetokenizer:
         if self.lang in ('ces', 'dan', 'nld', 'eng', 'fin', 'fra', 'deu', 'ell', 'ita', 'nor',
                          'pol', 'por', 'spa', 'swe', 'tur'):
             if defaultDetokenizer == 'moses':
-                self.wordDetokenizer = MosesDetokenizer(lang=YAPPN_ISO6391_MAPPINGS[lang])
+                self.wordDetokenizer = Backends.get('sacremoses').MosesDetokenizer(lang=YAPPN_ISO6391_MAPPINGS[lang])
             else:
                 raise NotImplementedError('Detokenizer %s is not implemented' % defaultDetokenizer)
         elif self.lang in ('ara', 'jpn', 'ypt', 'zhh', 'zhs', 'zht'):
@@ -567,7 +776,7 @@ class LanguageDetector:
             self._langs = [YAPPN_ISO6391_MAPPINGS[lang] for lang in languages]
         except:
             self._langs = None
-        langid.set_languages(self._langs)
+        Backends.get('langid').set_languages(self._langs)
 
         self._langCode = langCodeFormat
         self._cp = ChineseProcessor('zhs')
@@ -633,9 +842,8 @@ class LanguageDetector:
 
         res = True
 
-        for pattern in (CommonRegex.FILENAME_PATTERN, CommonRegex.URL_PATTERN,
-                        CommonRegex.SOCIAL_PATTERN, CommonRegex.SCRIPT_PATTERN):
-            if re.search(pattern, text):
+        for name in ('FILENAME_PATTERN', 'URL_PATTERN', 'SOCIAL_PATTERN', 'SCRIPT_PATTERN'):
+            if CommonRegex.compiled(name).search(text):
                 res = False
                 break
 
@@ -653,7 +861,7 @@ class LanguageDetector:
 
         assert isinstance(text, str)
 
-        res = langid.classify(text)[0]
+        res = Backends.get('langid').classify(text)[0]
 
         if res == 'zh':
             if self._cp.isSimplified(text):
@@ -680,7 +888,7 @@ class LanguageDetector:
 
         assert isinstance(text, str) and isinstance(n, int)
 
-        ranked = [lang for (lang, _) in langid.rank(text)]
+        ranked = [lang for (lang, _) in Backends.get('langid').rank(text)]
 
         num = min(n, len(ranked))
 
@@ -693,23 +901,145 @@ class LanguageDetector:
         return res
 
 
+class HumanizerTrace:
+    """Per-language wall time and change counters of the humanizeText stages, e.g., for profiling a corpus
+       One trace can be shared by the humanizers of several languages
+    """
+
+    def __init__(self):
+        """Initialize an empty HumanizerTrace instance
+        """
+
+        self.texts = {}
+        self.stages = {}
+        self.exceptions = {}
+
+    def recordText(self, lang):
+        """Count a text passed to humanizeText
+
+           Args:
+              lang (str): the 3-letter Yappn language code
+        """
+
+        self.texts[lang] = self.texts.get(lang, 0) + 1
+
+    def recordStage(self, lang, stage, seconds, changed):
+        """Record one run of a stage
+
+           Args:
+              lang (str): the 3-letter Yappn language code
+              stage (str): the stage name, e.g., 'ftfy', 'quotes' or 'numbers'
+              seconds (float): the wall time of the run
+              changed (bool): whether the run changed the text
+        """
+
+        counters = self.stages.setdefault(lang, {}).setdefault(stage, {'calls': 0, 'changed': 0, 'seconds': 0.0})
+        counters['calls'] += 1
+        counters['changed'] += int(changed)
+        counters['seconds'] += seconds
+
+    def recordException(self, lang, exception):
+        """Count an exception swallowed by humanizeText (the input text is returned unchanged)
+
+           Args:
+              lang (str): the 3-letter Yappn language code
+              exception (BaseException): the exception
+        """
+
+        counters = self.exceptions.setdefault(lang, {})
+        name = type(exception).__name__
+        counters[name] = counters.get(name, 0) + 1
+
+    def report(self):
+        """Get the aggregated report
+
+           Returns:
+              (dict): lang -> {'texts': number of texts,
+                               'stages': stage -> {'calls', 'changed', 'seconds'},
+                               'exceptions': exception type -> count}
+        """
+
+        res = {lang: {'texts': self.texts[lang],
+                      'stages': self.stages.get(lang, {}),
+                      'exceptions': self.exceptions.get(lang, {})}
+               for lang in self.texts}
+
+        return res
+
+    def toJson(self, path=None):
+        """Export the report as JSON
+
+           Args:
+              path (str or None): if given, the JSON file to write
+
+           Returns:
+              (str): the JSON report
+        """
+
+        import json
+
+        res = json.dumps(self.report(), ensure_ascii=False, indent=2)
+
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(res)
+
+        return res
+
+
 class TextHumanizer:
     """It cleans/standardizes/rectifies text for human reading
     """
 
-    def __init__(self, lang):
+    def __init__(self, lang, trace=None):
         """Initialize a TextHumanizer instance
 
            Args:
               lang (str): the 3-letter Yappn language code
+              trace (HumanizerTrace or None): if given, humanizeText records per-stage timing and changes in it
         """
 
         self.lang = lang
-        self._number_converter = {'eng_fra': NumberTranslator('English', 'French',
-                                                              None, None),
-                                  'fra_eng': NumberTranslator('French', 'English',
-                                                              None, None)
-                                  }
+        self.trace = trace
+        self._numberConverters = None
+
+    def _stage(self, stage, func, text, *args, **kwargs):
+        """Run one humanizeText stage, recording it in the trace if tracing
+
+           Args:
+              stage (str): the stage name
+              func (function): the stage function taking the text first
+              text (str): the text to be processed
+
+           Returns:
+              (str): the processed text
+        """
+
+        if self.trace is None:
+            return func(text, *args, **kwargs)
+
+        start = time.perf_counter()
+        res = func(text, *args, **kwargs)
+        self.trace.recordStage(self.lang, stage, time.perf_counter() - start, res != text)
+
+        return res
+
+    @property
+    def _number_converter(self):
+        """The eng/fra number converters, built on first use
+           so that the rules module (Babel, dateparser) is only loaded when numbers are standardized
+        """
+
+        if self._numberConverters is None:
+            from .rules import NumberTranslator
+
+            self._numberConverters = {'eng_fra': NumberTranslator('English', 'French',
+                                                                  None, None),
+                                      'fra_eng': NumberTranslator('French', 'English',
+                                                                  None, None)
+                                      }
+
+        return self._numberConverters
 
     def cleanHtml(self, text):
         """Clean HTML characters in the input text
@@ -722,7 +1052,7 @@ class TextHumanizer:
 
         assert isinstance(text, str)
 
-        res = html.unescape(BeautifulSoup(text, 'lxml').text)
+        res = html.unescape(Backends.get('bs4').BeautifulSoup(text, 'lxml').text)
 
         # Delete illegitimate &...; characters
 
@@ -923,7 +1253,7 @@ class TextHumanizer:
             res = ''
 
         if addSpaceBetweenChineseAndHalfwidth:
-            res = pangu.spacing_text(res).strip()
+            res = Backends.get('pangu').spacing_text(res).strip()
         else:
             res = res.strip()
 
@@ -1533,110 +1863,118 @@ class TextHumanizer:
         """
 
         assert isinstance(text, str)
+
+        if self.trace is not None:
+            self.trace.recordText(self.lang)
+
         try:
+            ftfy = Backends.get('ftfy')
+
             if cleanHtml:
-                text = self.cleanHtml(text)
+                text = self._stage('cleanHtml', self.cleanHtml, text)
 
             # if standardizePercentages:
             # text = self.standardizePercentages(text)
 
             if standardizeDollarsignSpaces:
-                text = self.standardizeDollarsignSpaces(text)
+                text = self._stage('dollarsignSpaces', self.standardizeDollarsignSpaces, text)
 
             # Per-language humanization
 
             if self.lang == 'ara':
-                res = ftfy.fix_text(text, uncurl_quotes=uncurlQuotes)
+                res = self._stage('ftfy', ftfy.fix_text, text, uncurl_quotes=uncurlQuotes)
 
                 if standardizePercentages:
-                    res = self.standardizePercentages(res)
+                    res = self._stage('percentages', self.standardizePercentages, res)
                 if standardizeWordBracketSpaces:
-                    res = self.standardizeWordBracketSpaces_Latin(res)
+                    res = self._stage('brackets', self.standardizeWordBracketSpaces_Latin, res)
                 if standardizeWordQuoteSpaces:
-                    res = self.standardizeWordQuoteSpaces_Latin(res)
+                    res = self._stage('quotes', self.standardizeWordQuoteSpaces_Latin, res)
                 if standardizeWordPunctuationSpaces:
-                    res = self.standardizeWordPunctuationSpaces_Arabic(res)
+                    res = self._stage('punctuation', self.standardizeWordPunctuationSpaces_Arabic, res)
                 if standardizeWordSpaces:
-                    res = self.standardizeWordSpaces_Latin(res)
+                    res = self._stage('spaces', self.standardizeWordSpaces_Latin, res)
 
             elif self.lang == 'eng':
-                res = ftfy.fix_text(text, uncurl_quotes=uncurlQuotes)
+                res = self._stage('ftfy', ftfy.fix_text, text, uncurl_quotes=uncurlQuotes)
 
                 if standardizeCapitalization:
-                    res = self.standardizeCapitalization_English(res)
+                    res = self._stage('capitalization', self.standardizeCapitalization_English, res)
                 if standardizeContractionSpaces:
-                    res = self.standardizeContractionSpaces_English(res)
+                    res = self._stage('contractions', self.standardizeContractionSpaces_English, res)
                 if standardizeWordBracketSpaces:
-                    res = self.standardizeWordBracketSpaces_Latin(res)
+                    res = self._stage('brackets', self.standardizeWordBracketSpaces_Latin, res)
                 if standardizeWordPunctuationSpaces:
-                    res = self.standardizeWordPunctuationSpaces_Latin(res)
+                    res = self._stage('punctuation', self.standardizeWordPunctuationSpaces_Latin, res)
                 if standardizeWordSpaces:
-                    res = self.standardizeWordSpaces_Latin(res)
+                    res = self._stage('spaces', self.standardizeWordSpaces_Latin, res)
                 if standardizeWordQuoteSpaces:
                     if not uncurlQuotes:
-                        res = self.convertQuotes_English(res)
-                    res = self.standardizeWordQuoteSpaces_Latin(res)
+                        res = self._stage('quotes', self.convertQuotes_English, res)
+                    res = self._stage('quotes', self.standardizeWordQuoteSpaces_Latin, res)
                 if standardizePercentages:
-                    res = self.standardizePercentages_English(res)
+                    res = self._stage('percentages', self.standardizePercentages_English, res)
 
             elif self.lang == 'fra':
-                res = ftfy.fix_text(text, uncurl_quotes=uncurlQuotes)
+                res = self._stage('ftfy', ftfy.fix_text, text, uncurl_quotes=uncurlQuotes)
 
                 if standardizeAlphabet:
-                    res = self.standardizeAlphabet_French(res)
+                    res = self._stage('alphabet', self.standardizeAlphabet_French, res)
                 if standardizeContractionSpaces:
-                    res = self.standardizeContractionSpaces_French(res)
+                    res = self._stage('contractions', self.standardizeContractionSpaces_French, res)
                 if standardizeWordBracketSpaces:
-                    res = self.standardizeWordBracketSpaces_Latin(res)
+                    res = self._stage('brackets', self.standardizeWordBracketSpaces_Latin, res)
                 if standardizeWordPunctuationSpaces:
-                    res = self.standardizeWordPunctuationSpaces_French(res)
+                    res = self._stage('punctuation', self.standardizeWordPunctuationSpaces_French, res)
                 if standardizeWordSpaces:
-                    res = self.standardizeWordSpaces_Latin(res)
+                    res = self._stage('spaces', self.standardizeWordSpaces_Latin, res)
                 if standardizeWordQuoteSpaces:
-                    res = self.standardizeWordQuoteSpaces_Latin(res)
+                    res = self._stage('quotes', self.standardizeWordQuoteSpaces_Latin, res)
                     if not uncurlQuotes:
-                        res = self.convertQuotes_French(res)
+                        res = self._stage('quotes', self.convertQuotes_French, res)
                     else:
-                        res = self.standardizeWordQuoteSpaces_French(res)
+                        res = self._stage('quotes', self.standardizeWordQuoteSpaces_French, res)
                 if standardizeApostrophe:
-                    res = self.convertApostrophe_French(res)
+                    res = self._stage('apostrophes', self.convertApostrophe_French, res)
                 if standardizePercentages:
-                    res = self.standardizePercentages_French(res)
+                    res = self._stage('percentages', self.standardizePercentages_French, res)
                 if standardizeNumbers:
-                    res = self.standardizeNumbers_French(res, source_text)
+                    res = self._stage('numbers', self.standardizeNumbers_French, res, source_text)
 
             elif self.lang == 'jpn':
-                res = ftfy.fix_text(text, fix_character_width=False, uncurl_quotes=uncurlQuotes)
+                res = self._stage('ftfy', ftfy.fix_text, text, fix_character_width=False, uncurl_quotes=uncurlQuotes)
 
                 if standardizePercentages:
-                    res = self.standardizePercentages(res)
+                    res = self._stage('percentages', self.standardizePercentages, res)
                 if standardizeWordBracketSpaces:
-                    res = self.standardizeWordBracketSpaces_Japanese(res)
+                    res = self._stage('brackets', self.standardizeWordBracketSpaces_Japanese, res)
                 if standardizeWordQuoteSpaces:
-                    res = self.standardizeWordQuoteSpaces_Japanese(res)
+                    res = self._stage('quotes', self.standardizeWordQuoteSpaces_Japanese, res)
                 if standardizeWordPunctuationSpaces:
-                    res = self.standardizeWordPunctuationSpaces_Japanese(res)
+                    res = self._stage('punctuation', self.standardizeWordPunctuationSpaces_Japanese, res)
                 if standardizeWordSpaces:
-                    res = self.standardizeWordSpaces_Latin(res)
+                    res = self._stage('spaces', self.standardizeWordSpaces_Latin, res)
 
             elif self.lang in ('ypt', 'zhh', 'zhs', 'zht'):
-                res = ftfy.fix_text(text, fix_character_width=False, uncurl_quotes=uncurlQuotes)
+                res = self._stage('ftfy', ftfy.fix_text, text, fix_character_width=False, uncurl_quotes=uncurlQuotes)
 
                 if standardizePercentages:
-                    res = self.standardizePercentages(res)
+                    res = self._stage('percentages', self.standardizePercentages, res)
                 if standardizeWordBracketSpaces:
-                    res = self.standardizeWordBracketSpaces_Chinese(res)
+                    res = self._stage('brackets', self.standardizeWordBracketSpaces_Chinese, res)
                 if standardizeWordQuoteSpaces:
-                    res = self.standardizeWordQuoteSpaces_Chinese(res)
+                    res = self._stage('quotes', self.standardizeWordQuoteSpaces_Chinese, res)
                 if standardizeWordPunctuationSpaces:
-                    res = self.standardizeWordPunctuationSpaces_Chinese(res)
+                    res = self._stage('punctuation', self.standardizeWordPunctuationSpaces_Chinese, res)
                 if standardizeWordSpaces:
-                    res = self.standardizeWordSpaces_Chinese(res,
-                                                             addSpaceBetweenChineseAndHalfwidth=addSpaceBetweenFullwidthAndHalfwidth)
+                    res = self._stage('spaces', self.standardizeWordSpaces_Chinese, res,
+                                      addSpaceBetweenChineseAndHalfwidth=addSpaceBetweenFullwidthAndHalfwidth)
             else:
                 raise NotImplementedError('Language %s is not supported' % self.lang)
 
         except:
+            if self.trace is not None:
+                self.trace.recordException(self.lang, sys.exc_info()[1])
             return text
 
         return res
@@ -1646,6 +1984,43 @@ class TextMatcher:
     """It matches a target text against a reference text for orthographical agreement
     """
 
+    # Rule patterns, compiled on first use and shared by all matchers
+    PATTERNS = {'tag': r'<[^>]+>',
+                'letter': r'(?V1)[\w--[0-9]]',
+                'first_fra_left_quotation': r'^(?P<left_quotation>«)(?P<post_text>[^\xa0].*)$',
+                'last_fra_right_quotation': r'^(?P<pre_text>.*[^\xa0])(?P<right_quotation>»)$',
+                'bracketed_round': r'(?V1)(?P<bracketed>\([\w--[_]]+?\))',
+                'bracketed_square': r'(?V1)(?P<bracketed>\[[\w--[_]]+?\])',
+                'bracketed_curly': r'(?V1)(?P<bracketed>\{[\w--[_]]+?\})',
+                'ref_referenced': r'.+(?P<referenced>⁽[⁰¹²³⁴⁵⁶⁷⁸⁹]+⁾$)',
+                'tgt_referenced': r'^(?P<text>.+)(?P<referenced>(\([0-9]+\))|(⁽[⁰¹²³⁴⁵⁶⁷⁸⁹]+⁾)$)',
+                'pound_sign': r'(?P<before>^|^[^#]*?\s)(?P<pound_sign>#)(?P<after>\s[^#]+)$',
+                'number_word_fra': r'(?i)(?P<before>^|^.*?\s)(?P<number_word>nᵇʳᵉ)(?P<after>\s.+)$',
+                'number_abbreviation': r'(?i)(?P<before>^|\s)(?P<number_word>no\.|n °|n°)\s*(?P<number>\d+)(?P<after>\W|$)'}
+    _compiledPatterns = {}
+
+    # Rules in the order matchForm applies them
+    RULES = ('matchFirstPunctuation', 'matchLastPunctuation', 'matchPairedBrackets',
+             'matchReferenceNumberFormatting', 'matchNumberSymbol', 'matchFirstCase')
+
+    @classmethod
+    def _pattern(self, name):
+        """Get a compiled rule pattern
+
+           Args:
+              name (str): the name of the pattern, a key of PATTERNS
+
+           Returns:
+              (regex.Pattern): the compiled pattern
+        """
+
+        try:
+            res = self._compiledPatterns[name]
+        except KeyError:
+            res = self._compiledPatterns[name] = re.compile(self.PATTERNS[name])
+
+        return res
+
     def __init__(self, refLang, targetLang):
         """Initialize a TextMatcher instance
 
@@ -1680,10 +2055,17 @@ class TextMatcher:
         self._superscriptMappings = dict(zip('0123456789()', '⁰¹²³⁴⁵⁶⁷⁸⁹⁽⁾'))
         self._superscriptTranslationTable = str.maketrans(self._superscriptMappings)
 
-        self._regex_patterns = {'first_fra_left_quotation': r'^(?P<left_quotation>«)(?P<post_text>[^\xa0].*)$',
-                                'last_fra_right_quotation': r'^(?P<pre_text>.*[^\xa0])(?P<right_quotation>»)$'}
+        self._textHumanizer = None
+
+    @property
+    def _textHumanier(self):
+        """The TextHumanizer of the target language, only built when French quote spaces need standardizing
+        """
 
-        self._textHumanier = TextHumanizer(targetLang)
+        if self._textHumanizer is None:
+            self._textHumanizer = TextHumanizer(self.tgtLang)
+
+        return self._textHumanizer
 
     def matchFirstCase_Latin(self, refText, targetText):
         """Match the case of the first letter of two Latin texts
@@ -1703,10 +2085,8 @@ class TextMatcher:
         if targetText.split()[0] in EXCEPTIONS:
             res = targetText
         else:
-            letterPattern = r'(?V1)[\w--[0-9]]'
-
-            firstLetterInRefText = re.match(letterPattern, refText)
-            firstLetterInTgtText = re.match(letterPattern, targetText)
+            firstLetterInRefText = self._pattern('letter').match(refText)
+            firstLetterInTgtText = self._pattern('letter').match(targetText)
 
             # Has no letter
             if (not firstLetterInRefText) or (not firstLetterInTgtText):
@@ -1762,8 +2142,8 @@ class TextMatcher:
         else:
             res = targetText
 
-        res = re.sub(self._regex_patterns['first_fra_left_quotation'],
-                     lambda m: m.group('left_quotation') + '\xa0' + m.group('post_text'), res)
+        res = self._pattern('first_fra_left_quotation').sub(
+            lambda m: m.group('left_quotation') + '\xa0' + m.group('post_text'), res)
 
         return res
 
@@ -1810,8 +2190,8 @@ class TextMatcher:
         else:
             res = targetText
 
-        res = re.sub(self._regex_patterns['last_fra_right_quotation'],
-                     lambda m: m.group('pre_text') + '\xa0' + m.group('right_quotation'), res)
+        res = self._pattern('last_fra_right_quotation').sub(
+            lambda m: m.group('pre_text') + '\xa0' + m.group('right_quotation'), res)
 
         return res
 
@@ -1826,14 +2206,10 @@ class TextMatcher:
               (str): the matched target text
         """
 
-        patterns = (r'(?V1)(?P<bracketed>\([\w--[_]]+?\))',
-                    r'(?V1)(?P<bracketed>\[[\w--[_]]+?\])',
-                    r'(?V1)(?P<bracketed>\{[\w--[_]]+?\})')
-
         res = targetText
 
-        for p in patterns:
-            refBracketedItems = re.findall(p, refText)
+        for name in ('bracketed_round', 'bracketed_square', 'bracketed_curly'):
+            refBracketedItems = self._pattern(name).findall(refText)
             for refBracketedItem in refBracketedItems:
                 if (re.search(re.escape(refBracketedItem[1:]), res) and (
                         not re.search(re.escape(refBracketedItem), res)) and
@@ -1867,11 +2243,8 @@ class TextMatcher:
         res = targetText
 
         if self.refLang == 'eng' and self.tgtLang == 'fra':
-            ref_pattern = r'.+(?P<referenced>⁽[⁰¹²³⁴⁵⁶⁷⁸⁹]+⁾$)'
-            tgt_pattern = r'^(?P<text>.+)(?P<referenced>(\([0-9]+\))|(⁽[⁰¹²³⁴⁵⁶⁷⁸⁹]+⁾)$)'
-
-            refMatch = re.search(ref_pattern, refText)
-            tgtMatch = re.search(tgt_pattern, res)
+            refMatch = self._pattern('ref_referenced').search(refText)
+            tgtMatch = self._pattern('tgt_referenced').search(res)
 
             if refMatch and tgtMatch:
                 if tgtMatch.group('referenced').translate(self._superscriptTranslationTable) == refMatch.group(
@@ -1903,50 +2276,123 @@ class TextMatcher:
         if self.refLang == 'eng' and self.tgtLang == 'fra':
 
             # '#' -> 'nᵇʳᵉ'
-            ref_pattern = r'(?P<before>^|^[^#]*?\s)(?P<pound_sign>#)(?P<after>\s[^#]+)$'
-            tgt_pattern = r'(?P<before>^|^[^#]*?\s)(?P<pound_sign>#)(?P<after>\s[^#]+)$'
-
-            refMatch = re.search(ref_pattern, refText)
-            tgtMatch = re.search(tgt_pattern, res)
+            refMatch = self._pattern('pound_sign').search(refText)
+            tgtMatch = self._pattern('pound_sign').search(res)
 
             if refMatch and tgtMatch:
                 res = tgtMatch.group('before') + 'nᵇʳᵉ' + tgtMatch.group('after')
 
             # 'no. 1' -> 'n° 1'
-
-            ref_pattern = r'(?i)(?P<before>^|\s)(?P<number_word>no\.|n °|n°)\s*(?P<number>\d+)(?P<after>\W|$)'
-            tgt_pattern = r'(?i)(?P<before>^|\s)(?P<number_word>no\.|n °|n°)\s*(?P<number>\d+)(?P<after>\W|$)'
-
-            refFound = re.findall(ref_pattern, refText, overlapped=True)
-            tgtFound = re.findall(tgt_pattern, res, overlapped=True)
+            refFound = self._pattern('number_abbreviation').findall(refText, overlapped=True)
+            tgtFound = self._pattern('number_abbreviation').findall(res, overlapped=True)
 
             if refFound and tgtFound and len(refFound) == len(tgtFound):
-                res = re.sub(tgt_pattern, lambda m: m.group('before') + 'n° ' + m.group('number') + m.group('after'),
-                             res)
+                res = self._pattern('number_abbreviation').sub(
+                    lambda m: m.group('before') + 'n° ' + m.group('number') + m.group('after'), res)
 
         elif self.refLang == 'fra' and self.tgtLang == 'eng':
 
             # 'nᵇʳᵉ' -> 'number'
-            ref_pattern = r'(?i)(?P<before>^|^.*?\s)(?P<number_word>nᵇʳᵉ)(?P<after>\s.+)$'
-            tgt_pattern = r'(?i)(?P<before>^|^.*?\s)(?P<number_word>nᵇʳᵉ)(?P<after>\s.+)$'
-
-            refMatch = re.search(ref_pattern, refText)
-            tgtMatch = re.search(tgt_pattern, res)
+            refMatch = self._pattern('number_word_fra').search(refText)
+            tgtMatch = self._pattern('number_word_fra').search(res)
 
             if refMatch and tgtMatch:
                 res = tgtMatch.group('before') + 'number' + tgtMatch.group('after')
 
             # 'n° 1' -> 'no. 1'
+            refFound = self._pattern('number_abbreviation').findall(refText, overlapped=True)
+            tgtFound = self._pattern('number_abbreviation').findall(res, overlapped=True)
 
-            ref_pattern = r'(?i)(?P<before>^|\s)(?P<number_word>no\.|n °|n°)\s*(?P<number>\d+)(?P<after>\W|$)'
-            tgt_pattern = r'(?i)(?P<before>^|\s)(?P<number_word>no\.|n °|n°)\s*(?P<number>\d+)(?P<after>\W|$)'
+            if refFound and tgtFound and len(refFound) == len(tgtFound):
+                res = self._pattern('number_abbreviation').sub(
+                    lambda m: m.group('before') + 'no. ' + m.group('number') + m.group('after'), res)
 
-            refFound = re.findall(ref_pattern, refText, overlapped=True)
-            tgtFound = re.findall(tgt_pattern, res, overlapped=True)
+        return res
 
-            if refFound and tgtFound and len(refFound) == len(tgtFound):
-                res = re.sub(tgt_pattern, lambda m: m.group('before') + 'no. ' + m.group('number') + m.group('after'),
-                             res)
+    def _ruleTriggered(self, rule, refText, targetText):
+        """Check cheaply whether a rule can change the target text at all,
+           i.e., whether its trigger characters are present
+
+           Args:
+              rule (str): the name of the rule, one of RULES
+              refText (str): the reference text
+              targetText (str): the target text
+
+           Returns:
+              (bool): whether the rule needs to be applied
+        """
+
+        if rule == 'matchFirstPunctuation':
+            res = (refText[0] in self.ref2tgtPuncMappings_first or targetText[0] in self.tgt2refPuncMappings_first or
+                   targetText[0] == '«')
+        elif rule == 'matchLastPunctuation':
+            res = (refText[-1] in self.ref2tgtPuncMappings_last or targetText[-1] in self.tgt2refPuncMappings_last or
+                   '»' in targetText[-2:])
+        elif rule == 'matchPairedBrackets':
+            res = '(' in refText or '[' in refText or '{' in refText
+        elif rule == 'matchReferenceNumberFormatting':
+            res = (self.refLang, self.tgtLang) == ('eng', 'fra') and '⁾' in refText
+        elif rule == 'matchNumberSymbol':
+            if (self.refLang, self.tgtLang) == ('eng', 'fra'):
+                symbol = '#'
+            elif (self.refLang, self.tgtLang) == ('fra', 'eng'):
+                symbol = 'ᵇʳᵉ'
+            else:
+                return False
+            refLower, tgtLower = refText.lower(), targetText.lower()
+            res = ((symbol in refLower and symbol in tgtLower) or
+                   (any(a in refLower for a in ('no.', 'n°', 'n °')) and any(a in tgtLower for a in ('no.', 'n°', 'n °'))))
+        else:
+            res = True
+
+        return res
+
+    def _matchForm(self, refText, targetText, rules, counts=None):
+        """Apply the given rules in turn, skipping those that cannot change the target text
+
+           Args:
+              refText (str): the reference text
+              targetText (str): the target text to be matched and changed
+              rules (tuple): the names of the rules to apply, in the order of RULES
+              counts (dict or None): if given, rule -> number of texts changed by the rule, updated in place
+
+           Returns:
+              (str): the matched target text
+        """
+
+        res = targetText
+        refText = self._pattern('tag').sub('', refText)
+
+        if not res:
+            res = refText
+        else:
+            try:
+                for rule in rules:
+                    if not self._ruleTriggered(rule, refText, res):
+                        continue
+
+                    if rule == 'matchFirstCase':
+                        if self.refLang in self.latinLang and self.tgtLang in self.latinLang:
+                            matched = self.matchFirstCase_Latin(refText, res)
+                        else:
+                            raise NotImplementedError(
+                                '%s and %s are not both Latin languages and not supported' % (self.refLang, self.tgtLang))
+                    else:
+                        matched = getattr(self, rule)(refText, res)
+
+                    if counts is not None and matched != res:
+                        counts[rule] += 1
+                    res = matched
+
+                if self.tgtLang == 'fra':
+                    matched = self._textHumanier.standardizeWordQuoteSpaces_French(res)
+                    if counts is not None and matched != res:
+                        counts['standardizeWordQuoteSpaces_French'] += 1
+                    res = matched
+            except:
+                print('matchform error')
+                if counts is not None:
+                    counts['error'] += 1
 
         return res
 
@@ -1973,41 +2419,81 @@ class TextMatcher:
               (str): the matched target text
         """
 
-        res = targetText
-        refText = re.sub(r'<[^>]+>', '', refText)
+        enabled = {'matchFirstCase': matchFirstCase,
+                   'matchFirstPunctuation': matchFirstPunctuation,
+                   'matchLastPunctuation': matchLastPunctuation,
+                   'matchPairedBrackets': matchPairedBrackets,
+                   'matchReferenceNumberFormatting': matchReferenceNumberFormatting,
+                   'matchNumberSymbol': matchNumberSymbol}
 
-        if not res:
-            res = refText
+        return self._matchForm(refText, targetText, tuple(rule for rule in self.RULES if enabled[rule]))
+
+    def match_many(self, refTexts, targetTexts, nJobs=1, chunkSize=1000, **options):
+        """Match the orthographical form of many text pairs, e.g., all MT outputs of a TM before delivery
+           The pairs are processed in chunks, in worker processes if nJobs > 1
+
+           Args:
+              refTexts (list): the reference texts
+              targetTexts (list): the target texts to be matched and changed, aligned with refTexts
+              nJobs (int): the number of worker processes; 1 matches in the current process
+              chunkSize (int): the number of pairs sent to a worker at a time
+              options: the rule switches of matchForm, e.g., matchFirstCase=False
+
+           Returns:
+              (tuple): (a list of matched target texts,
+                        a dict of rule -> number of texts changed by the rule, plus "error" for failed pairs)
+        """
+
+        assert len(refTexts) == len(targetTexts)
+
+        rules = tuple(rule for rule in self.RULES if options.get(rule, True))
+        pairs = list(zip(refTexts, targetTexts))
+        chunks = [(self.refLang, self.tgtLang, rules, pairs[i:i + chunkSize]) for i in range(0, len(pairs), chunkSize)]
+
+        if nJobs == 1 or len(chunks) <= 1:
+            results = [_matchFormChunk(chunk, self) for chunk in chunks]
         else:
-            try:
-                if matchFirstPunctuation:
-                    res = self.matchFirstPunctuation(refText, res)
+            from concurrent.futures import ProcessPoolExecutor
 
-                if matchLastPunctuation:
-                    res = self.matchLastPunctuation(refText, res)
+            with ProcessPoolExecutor(max_workers=nJobs) as executor:
+                results = list(executor.map(_matchFormChunk, chunks))
 
-                if matchPairedBrackets:
-                    res = self.matchPairedBrackets(refText, res)
+        res = []
+        counts = dict.fromkeys(rules + ('standardizeWordQuoteSpaces_French', 'error'), 0)
+        for matched, chunkCounts in results:
+            res.extend(matched)
+            for rule, count in chunkCounts.items():
+                counts[rule] += count
 
-                if matchReferenceNumberFormatting:
-                    res = self.matchReferenceNumberFormatting(refText, res)
+        return res, counts
 
-                if matchNumberSymbol:
-                    res = self.matchNumberSymbol(refText, res)
 
-                if matchFirstCase:
-                    if self.refLang in self.latinLang and self.tgtLang in self.latinLang:
-                        res = self.matchFirstCase_Latin(refText, res)
-                    else:
-                        raise NotImplementedError(
-                            '%s and %s are not both Latin languages and not supported' % (self.refLang, self.tgtLang))
+# Per-process TextMatcher instances of the match_many workers: (refLang, targetLang) -> TextMatcher
+_workerTextMatchers = {}
 
-                if self.tgtLang == 'fra':
-                    res = self._textHumanier.standardizeWordQuoteSpaces_French(res)
-            except:
-                print('matchform error')
 
-        return res
+def _matchFormChunk(args, matcher=None):
+    """Match a chunk of text pairs, as a picklable task for pool workers
+
+       Args:
+          args (tuple): (refLang, targetLang, rules, pairs)
+          matcher (TextMatcher or None): the matcher to use; by default one cached per process and language pair
+
+       Returns:
+          (tuple): (a list of matched target texts, a dict of rule -> number of texts changed)
+    """
+
+    refLang, targetLang, rules, pairs = args
+
+    if matcher is None:
+        if (refLang, targetLang) not in _workerTextMatchers:
+            _workerTextMatchers[(refLang, targetLang)] = TextMatcher(refLang, targetLang)
+        matcher = _workerTextMatchers[(refLang, targetLang)]
+
+    counts = dict.fromkeys(rules + ('standardizeWordQuoteSpaces_French', 'error'), 0)
+    res = [matcher._matchForm(refText, targetText, rules, counts) for refText, targetText in pairs]
+
+    return res, counts
 
 
 class TextComparator:
@@ -2033,6 +2519,23 @@ class TextComparator:
         except:
             self._ld = LanguageDetector(langCodeFormat='yappn')
 
+        self._wordTokenizers = {}
+
+    def _getWordTokenizer(self, lang):
+        """Get the cached nltk word tokenizer of a language
+
+           Args:
+              lang (str): the 3-letter Yappn language code
+
+           Returns:
+              (WordTokenizer): the word tokenizer
+        """
+
+        if lang not in self._wordTokenizers:
+            self._wordTokenizers[lang] = WordTokenizer(lang, 'nltk')
+
+        return self._wordTokenizers[lang]
+
     def calculateLengthSimilarity(self, text1, text2, method):
         """Calculate the length similarity according to a given method
 
@@ -2058,8 +2561,8 @@ class TextComparator:
                 self.lang2 = self._ld.detect(text2)
 
             if method == 'word':
-                words1 = WordTokenizer(self.lang1, 'nltk').tokenize(text1)
-                words2 = WordTokenizer(self.lang2, 'nltk').tokenize(text2)
+                words1 = self._getWordTokenizer(self.lang1).tokenize(text1)
+                words2 = self._getWordTokenizer(self.lang2).tokenize(text2)
                 lenWords1, lenWords2 = len(words1), len(words2)
                 res = min(lenWords1, lenWords2) / max(lenWords1, lenWords2)
             elif method == 'char':
@@ -2097,10 +2600,14 @@ class TextComparator:
         if text1 == '' and text2 == '':
             res = 1
         else:
+            from . import edit_distance
+
+            textdistance = Backends.get('textdistance')
+
             if method == 'levenshtein':
-                res = textdistance.levenshtein.normalized_similarity(text1, text2)
+                res = edit_distance.similarity(text1, text2)
             elif method == 'damerau-levenshtein':
-                res = textdistance.damerau_levenshtein.normalized_similarity(text1, text2)
+                res = edit_distance.similarity(text1, text2, transpositions=True)
             elif method == 'jaro':
                 res = textdistance.jaro.normalized_similarity(text1, text2)
             elif method == 'jaro-winkler':
@@ -2118,11 +2625,127 @@ class TextComparator:
 
         return res
 
+    # String similarity method -> rapidfuzz scorer with the same normalization as textdistance
+    FAST_STRING_SIMILARITIES = {'levenshtein': 'Levenshtein',
+                                'damerau-levenshtein': 'OSA',
+                                'jaro': 'Jaro',
+                                'jaro-winkler': 'JaroWinkler'}
+
+    def compare_many(self, texts1, texts2, methods=('char', 'word', 'levenshtein'), threshold=None, nJobs=1):
+        """Compare many text pairs at once, e.g., for filtering a bitext
+           Each side is tokenized once with a cached tokenizer, length similarities are computed as array operations,
+           and string similarities use rapidfuzz when it is installed, the bit-parallel edit_distance module for
+           (Damerau-)Levenshtein otherwise, and textdistance for the rest
+
+           Args:
+              texts1 (list): the first texts
+              texts2 (list): the second texts, aligned with texts1
+              methods (list): length similarity methods ("char", "word") and/or string similarity methods
+                              (see calculateStringSimilarity)
+              threshold (float or None): if given, (Damerau-)Levenshtein scores below it are cut off early as 0.0
+              nJobs (int): the number of worker processes for the edit_distance module
+
+           Returns:
+              (dict): method -> numpy array of similarity scores (0 .. 1), one per pair
+        """
+
+        import numpy as np
+
+        from . import edit_distance
+
+        assert len(texts1) == len(texts2)
+
+        texts1, texts2 = list(texts1), list(texts2)
+        res = {}
+
+        if 'word' in methods:
+            # Same as calculateLengthSimilarity: detect once from the first non-empty text if a language is unknown
+            if not self.lang1:
+                self.lang1 = next((self._ld.detect(t) for t in texts1 if t), None)
+            if not self.lang2:
+                self.lang2 = next((self._ld.detect(t) for t in texts2 if t), None)
+
+        for method in methods:
+            if method in ('char', 'word'):
+                if method == 'char':
+                    lens1 = np.fromiter((len(t) for t in texts1), dtype=np.int64, count=len(texts1))
+                    lens2 = np.fromiter((len(t) for t in texts2), dtype=np.int64, count=len(texts2))
+                else:
+                    tokenize1 = self._getWordTokenizer(self.lang1).tokenize if self.lang1 else None
+                    tokenize2 = self._getWordTokenizer(self.lang2).tokenize if self.lang2 else None
+                    lens1 = np.fromiter((len(tokenize1(t)) if t else 0 for t in texts1), dtype=np.int64, count=len(texts1))
+                    lens2 = np.fromiter((len(tokenize2(t)) if t else 0 for t in texts2), dtype=np.int64, count=len(texts2))
+                shortest, longest = np.minimum(lens1, lens2), np.maximum(lens1, lens2)
+                res[method] = np.divide(shortest, longest, out=np.ones(len(texts1)), where=longest > 0)
+            elif method in self.FAST_STRING_SIMILARITIES and Backends.available('rapidfuzz'):
+                scorer = getattr(Backends.get('rapidfuzz'), self.FAST_STRING_SIMILARITIES[method]).normalized_similarity
+                cutoff = threshold if method in ('levenshtein', 'damerau-levenshtein') else None
+                res[method] = np.fromiter((scorer(t1, t2, score_cutoff=cutoff) for t1, t2 in zip(texts1, texts2)),
+                                          dtype=np.float64, count=len(texts1))
+            elif method in ('levenshtein', 'damerau-levenshtein'):
+                res[method] = edit_distance.batchSimilarity(zip(texts1, texts2), method == 'damerau-levenshtein',
+                                                            threshold, nJobs)
+            else:
+                res[method] = np.fromiter((self.calculateStringSimilarity(t1, t2, method) for t1, t2 in zip(texts1, texts2)),
+                                          dtype=np.float64, count=len(texts1))
+
+        return res
+
 
 class ChineseProcessor:
     """It deals with special aspects of the Chinese text
     """
 
+    # Lookup tables derived from hanziconv's character maps on first use and shared by all instances
+    _tables = None
+
+    # Phrase-level conversions applied before the character tables: 'simplified'/'traditional' -> trie
+    _phraseTries = {'simplified': {}, 'traditional': {}}
+
+    @classmethod
+    def _getTables(self):
+        """Get the Simplified/Traditional lookup tables, building them on first use
+           They give the same results as HanziConv, which maps a character through its first occurrence in the charmaps
+
+           Returns:
+              (dict): 'simplified_only'/'traditional_only' -> frozenset of the characters changed by
+                      toTraditional/toSimplified,
+                      'simplified'/'traditional' -> str.translate table to convert to that format
+        """
+
+        if self._tables is None:
+            charmap = Backends.get('hanziconv_charmap')
+            res = {}
+            for fromMap, toMap, toFormat in ((charmap.traditional_charmap, charmap.simplified_charmap, 'simplified'),
+                                             (charmap.simplified_charmap, charmap.traditional_charmap, 'traditional')):
+                firstMappings = {}
+                for fromChar, toChar in zip(fromMap, toMap):
+                    firstMappings.setdefault(fromChar, toChar)
+                res[toFormat] = str.maketrans({c: m for c, m in firstMappings.items() if c != m})
+            res['traditional_only'] = frozenset(chr(c) for c in res['simplified'])
+            res['simplified_only'] = frozenset(chr(c) for c in res['traditional'])
+            ChineseProcessor._tables = res
+
+        return self._tables
+
+    @classmethod
+    def addPhrases(self, mappings, toFormat):
+        """Register phrase-level conversions, e.g., for words whose characters do not convert one by one
+           The longest registered phrase is converted first; the remaining characters go through the character tables
+
+           Args:
+              mappings (dict): phrase -> converted phrase
+              toFormat (str): 'simplified' or 'traditional'
+        """
+
+        assert toFormat in ('simplified', 'traditional')
+
+        for phrase, converted in mappings.items():
+            node = self._phraseTries[toFormat]
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = converted
+
     def __init__(self, lang):
         """Initialize a ChineseProcessor instance
 
@@ -2187,7 +2810,7 @@ class ChineseProcessor:
         # Normalize white spaces
         text = re.sub('\s', ' ', text)
 
-        if langid.classify(text)[0] == 'zh':
+        if Backends.get('langid').classify(text)[0] == 'zh':
             # Filter quasi-Chinese text
             res = True
             for char in text:
@@ -2231,7 +2854,8 @@ class ChineseProcessor:
 
         assert isinstance(text, str)
 
-        res = HanziConv.toSimplified(text) == text
+        # Stops at the first Traditional-only character
+        res = self._getTables()['traditional_only'].isdisjoint(text)
 
         return res
 
@@ -2248,10 +2872,47 @@ class ChineseProcessor:
 
         assert isinstance(text, str)
 
-        res = HanziConv.toTraditional(text) == text
+        # Stops at the first Simplified-only character
+        res = self._getTables()['simplified_only'].isdisjoint(text)
+
+        return res
+
+    def classify(self, text):
+        """Classify the Chinese format of the input text
+
+           Args:
+              text (str): the input text
+
+           Returns:
+              (str): 'simplified' or 'traditional' if only characters of that format are found,
+                     'mixed' if both are found, 'neutral' if none is found (e.g., characters shared by both formats)
+        """
+
+        assert isinstance(text, str)
+
+        tables = self._getTables()
+        hasSimplified = not tables['simplified_only'].isdisjoint(text)
+        hasTraditional = not tables['traditional_only'].isdisjoint(text)
+
+        if hasSimplified:
+            res = 'mixed' if hasTraditional else 'simplified'
+        else:
+            res = 'traditional' if hasTraditional else 'neutral'
 
         return res
 
+    def classifyMany(self, texts):
+        """Classify the Chinese format of many texts, e.g., for cleaning a zhs/zht bitext
+
+           Args:
+              texts (list): the input texts
+
+           Returns:
+              (list): a list of 'simplified', 'traditional', 'mixed' or 'neutral' (see classify)
+        """
+
+        return [self.classify(text) for text in texts]
+
     def isCorrectFormat(self, text):
         """Decide if the input text is in the correct format as specified by 'lang',
            i.e., 'zhh' and 'zhs' should be simplified; 'zht' and 'ypt' should be traditional
@@ -2286,10 +2947,31 @@ class ChineseProcessor:
 
         assert toFormat in ('simplified', 'traditional')
 
-        if toFormat == 'simplified':
-            res = HanziConv.toSimplified(text)
+        table = self._getTables()[toFormat]
+        trie = self._phraseTries[toFormat]
+
+        if not trie:
+            res = text.translate(table)
         else:
-            res = HanziConv.toTraditional(text)
+            # Greedy longest match of the registered phrases, with the character table in between
+            converted = []
+            i, start = 0, 0
+            while i < len(text):
+                node, matchEnd, matchConverted = trie, None, None
+                j = i
+                while j < len(text) and text[j] in node:
+                    node = node[text[j]]
+                    j += 1
+                    if '' in node:
+                        matchEnd, matchConverted = j, node['']
+                if matchEnd is None:
+                    i += 1
+                else:
+                    converted.append(text[start:i].translate(table))
+                    converted.append(matchConverted)
+                    i = start = matchEnd
+            converted.append(text[start:].translate(table))
+            res = ''.join(converted)
 
         return res
 
@@ -2362,7 +3044,7 @@ class JapaneseProcessor:
         # Normalize white spaces
         text = re.sub('\s', ' ', text)
 
-        if langid.classify(text)[0] == 'ja':
+        if Backends.get('langid').classify(text)[0] == 'ja':
             # Filter quasi-Japanese text
             res = True
             for char in text:
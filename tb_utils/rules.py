@@ -6,9 +6,16 @@
 # --------------------------------------------------
 # This module implements rules for Rule-Based Machine Translation
 
+import warnings
+from collections import OrderedDict, deque
+from datetime import datetime
 from decimal import Decimal
 
 import regex as re
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    import sre_parse, sre_constants
 import dateparser
 from babel.dates import format_date, format_time, format_datetime
 from babel import numbers
@@ -20,6 +27,205 @@ from .language_resources import Codes, CommonRegex
 NAME_YAPPN_MAPPINGS = Codes.mappings('name', 'yappn')
 CULTURE_CODES = Codes.CULTURE_CODES
 
+# Maximum number of memoized convert results shared by the translators
+CONVERT_CACHE_SIZE = 100000
+
+
+class _LruCache:
+    """A bounded least-recently-used cache
+    """
+
+    def __init__(self, maxsize):
+        """Initialize an _LruCache instance
+
+           Args:
+              maxsize (int): the maximum number of entries
+        """
+
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, compute):
+        """Get the cached value of a key, computing and caching it on a miss
+
+           Args:
+              key (tuple): the key
+              compute (function): computes the value without arguments
+
+           Returns:
+              (object): the value
+        """
+
+        try:
+            res = self._data[key]
+            self._data.move_to_end(key)
+        except KeyError:
+            res = self._data[key] = compute()
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+        return res
+
+    def clear(self):
+        """Remove all the entries
+        """
+
+        self._data.clear()
+
+
+# Convert results keyed by (translator, text, locales, options)
+_convertCache = _LruCache(CONVERT_CACHE_SIZE)
+
+# (source locale, target locale) -> the plain decimal fast path, or None where it does not reproduce Babel
+_fastDecimalFormats = {}
+
+
+def _fastDecimalFormat(srcLocale, tgtLocale):
+    """Get the fast path reformatting plain integers/decimals from one locale to another without Babel
+       It is only enabled for a pair of locales after reproducing Babel's parse_decimal/format_decimal on samples
+
+       Args:
+          srcLocale (str): source locale identifier
+          tgtLocale (str): target locale identifier
+
+       Returns:
+          (tuple or None): (compiled source pattern, target group symbol, target decimal symbol),
+                           or None if the fast path is disabled
+    """
+
+    key = (srcLocale, tgtLocale)
+
+    if key not in _fastDecimalFormats:
+        srcGroupSymbol, srcDecimalSymbol = numbers.get_group_symbol(srcLocale), numbers.get_decimal_symbol(srcLocale)
+        fast = (re.compile(r'(?P<integer>0|[1-9]\d{0,2}(?:' + re.escape(srcGroupSymbol) + r'\d{3})+|[1-9]\d*)' +
+                           r'(?:' + re.escape(srcDecimalSymbol) + r'(?P<fraction>\d+))?'),
+                numbers.get_group_symbol(tgtLocale), numbers.get_decimal_symbol(tgtLocale))
+
+        samples = ('0', '7', '12', '999', '1000', '12345', '123456', '1234567', '1000000000',
+                   '1' + srcGroupSymbol + '000', '12' + srcGroupSymbol + '345' + srcGroupSymbol + '678',
+                   '0' + srcDecimalSymbol + '5', '1' + srcDecimalSymbol + '50', '3' + srcDecimalSymbol + '14159',
+                   '1234' + srcDecimalSymbol + '5678', '9' + srcGroupSymbol + '999' + srcDecimalSymbol + '0')
+        try:
+            verified = all(_formatDecimalFast(sample, fast) == format_decimal(str(parse_decimal(sample, locale=srcLocale)),
+                                                                               locale=tgtLocale, decimal_quantization=False)
+                           for sample in samples)
+        except:
+            verified = False
+
+        _fastDecimalFormats[key] = fast if verified else None
+
+    return _fastDecimalFormats[key]
+
+
+def _formatDecimalFast(text, fast):
+    """Reformat a plain integer/decimal with the fast path
+
+       Args:
+          text (str): number text in the source locale
+          fast (tuple): see _fastDecimalFormat
+
+       Returns:
+          (str or None): the number in the target locale, or None if the text is not a plain integer/decimal
+    """
+
+    pattern, tgtGroupSymbol, tgtDecimalSymbol = fast
+    match = pattern.fullmatch(text)
+
+    if not match:
+        return None
+
+    integer = re.sub(r'\D', '', match.group('integer'))
+    head = len(integer) % 3 or 3
+    res = tgtGroupSymbol.join([integer[:head]] + [integer[i:i + 3] for i in range(head, len(integer), 3)])
+
+    # Babel drops trailing zeros of the fraction when decimal_quantization is False
+    fraction = (match.group('fraction') or '').rstrip('0')
+    if fraction:
+        res += tgtDecimalSymbol + fraction
+
+    return res
+
+
+# Tokens of a single date expression matched by CommonRegex.DATE_PATTERN_ymd
+# A number may carry a suffix marking it as a year (年), a month (月) or a day (ordinals, 日, etc.)
+_DATE_TOKEN_PATTERN = re.compile(r'(?P<number>\d+)(?:(?P<year>年)|(?P<month>月)|(?P<day>st|nd|rd|th|er|re|e|\.|日|号|號)(?!\w))?'
+                                 r'|(?P<word>[^\W\d_]+)\.?|(?P<separator>[\s/_,-]+)')
+
+
+def _parseDateFast(text, monthNumbers):
+    """Parse a single year-month-day date expression directly from its components
+       Only unambiguous expressions are parsed: those with a month name (or a marked month) and those in
+       year-month-day order; e.g., '03/04/2020' is left to dateparser since it may be month-first or day-first
+
+       Args:
+          text (str): date text, e.g., 'March 4, 2020', '1er mars 2020' or '2020年3月4日'
+          monthNumbers (dict): lowercased month names -> month numbers of the source language
+
+       Returns:
+          (datetime.datetime or None): the date, or None if the text is not parsed (ambiguous, range, invalid, etc.)
+    """
+
+    text = text.strip()
+    numbers, month, day, position = [], None, None, 0
+
+    for match in _DATE_TOKEN_PATTERN.finditer(text):
+        # Reject anything not fully tokenized
+        if match.start() != position:
+            return None
+        position = match.end()
+
+        if match.group('number'):
+            value = int(match.group('number'))
+            if match.group('month'):
+                if month is not None:
+                    return None
+                month = value
+            elif match.group('day') and len(match.group('number')) <= 2:
+                if day is not None:
+                    return None
+                day = value
+            elif match.group('day') is None:
+                numbers.append(match.group('number'))
+            else:
+                return None
+        elif match.group('word'):
+            word = match.group('word').lower()
+            if word == 'de':
+                continue
+            if word not in monthNumbers or month is not None:
+                return None
+            month = monthNumbers[word]
+        elif match.group('separator') is None:
+            return None
+
+    if position != len(text):
+        return None
+
+    if month is None and day is None:
+        # Only the year-month-day order of plain numbers is unambiguous
+        if len(numbers) != 3 or len(numbers[0]) != 4:
+            return None
+        year, month, day = (int(number) for number in numbers)
+    else:
+        years = [number for number in numbers if len(number) == 4]
+        others = [number for number in numbers if len(number) != 4]
+        if len(years) != 1:
+            return None
+        year = int(years[0])
+        if day is None and month is not None and len(others) == 1:
+            day = int(others[0])
+        elif month is None and day is not None and len(others) == 1 and numbers.index(years[0]) == 0:
+            month = int(others[0])
+        elif others or day is None or month is None:
+            return None
+
+    try:
+        res = datetime(year, month, day)
+    except ValueError:
+        res = None
+
+    return res
+
 
 class DatetimeTranslator:
     """Rule-based date/time translation using dateparser and Babel
@@ -51,8 +257,59 @@ class DatetimeTranslator:
         self._scope = scope
         self._fullmatch = fullmatch
 
+        self._monthNumbers = CommonRegex.DP_month_numbers.get(self.srcLang, {})
+        self._pattern = None
+
+    def _compiledPattern(self):
+        """Get the compiled date pattern of the source language, which is compiled on first use
+
+           Returns:
+              (regex.Pattern): the compiled pattern
+        """
+
+        if self._pattern is None:
+            if self._fullmatch:
+                pattern = CommonRegex.DATE_PATTERN_ymd[self.srcLang]
+                pattern = r'(?i)(?P<date>' + r'^' + pattern[len(r'(?i)(?P<date>'):len(pattern) - 1] + r'$)'
+                self._pattern = re.compile(pattern)
+            else:
+                self._pattern = CommonRegex.compiled('DATE_PATTERN_ymd', self.srcLang)
+
+        return self._pattern
+
+    def parse(self, text):
+        """Parse a date/time text
+           Unambiguous year-month-day expressions are parsed directly with the month names of the source language;
+           other expressions (e.g., '03/04/2020' or date ranges) fall back to dateparser
+
+           Args:
+              text (str): date/time text
+           Returns:
+              (datetime.datetime or None): the parsed date/time, or None if it cannot be parsed
+        """
+
+        res = _parseDateFast(text, self._monthNumbers)
+
+        if res is None:
+            res = dateparser.parse(text)
+
+        return res
+
     def convert(self, text):
         """Convert date/time according to the target locale
+           Results are memoized by (text, languages, format and scope)
+
+           Args:
+              text (str): date/time text
+           Returns:
+              (str): converted date/time
+        """
+
+        return _convertCache.get(('datetime', text, self.srcLang, self.tgtLocale, self._dtFormat, self._scope),
+                                 lambda: self._convert(text))
+
+    def _convert(self, text):
+        """Convert date/time according to the target locale, without memoization
 
            Args:
               text (str): date/time text
@@ -60,7 +317,7 @@ class DatetimeTranslator:
               (str): converted date/time
         """
 
-        dt = dateparser.parse(text)
+        dt = self.parse(text)
 
         if dt:
             if self._scope == 'date':
@@ -84,10 +341,7 @@ class DatetimeTranslator:
                      if None, no datetime translation rule is matched
         """
 
-        pattern = CommonRegex.DATE_PATTERN_ymd[self.srcLang]
-        if self._fullmatch:
-            pattern = r'(?i)(?P<date>' + r'^' + pattern[len(r'(?i)(?P<date>'):len(pattern) - 1] + r'$)'
-        pr = re.compile(pattern)
+        pr = self._compiledPattern()
 
         res = None
 
@@ -129,8 +383,36 @@ class NumberTranslator:
         self.srcGroupSymbol = numbers.get_group_symbol(self.srcLocale)
         self.tgtGroupSymbol = numbers.get_group_symbol(self.tgtLocale)
 
+        self._numberOnlyPattern = re.compile(r'^\s*(\d+)\s*$')
+
+        if self.srcLang == 'eng':
+            pattern = r'(?P<number>[\d]+(?:[,]\d\d\d)*[\.]?\d*)'
+        elif self.srcLang == 'fra':
+            pattern = r'(?P<number>[\d]+(?:[\s]\d\d\d)*[,]?\d*)'
+        else:
+            pattern = None
+
+        if pattern and self._fullmatch:
+            pattern = r'(?P<number>' + r'^' + pattern[len(r'(?P<number>'):len(pattern) - 1] + r'$)'
+        self._pattern = re.compile(pattern) if pattern else None
+
+        self._fast = _fastDecimalFormat(self.srcLocale, self.tgtLocale)
+
     def convert(self, text, check_group_symbol=False):
         """Convert number according to the target locale
+           Results are memoized by (text, locales, check_group_symbol)
+
+           Args:
+              text (str): number text
+           Returns:
+              (str): converted number
+        """
+
+        return _convertCache.get(('number', text, self.srcLocale, self.tgtLocale, check_group_symbol),
+                                 lambda: self._convert(text, check_group_symbol))
+
+    def _convert(self, text, check_group_symbol=False):
+        """Convert number according to the target locale, without memoization
 
            Args:
               text (str): number text
@@ -139,10 +421,13 @@ class NumberTranslator:
         """
 
         try:
-            numberText = str(parse_decimal(text, locale=self.srcLocale))
+            res = _formatDecimalFast(text, self._fast) if self._fast else None
+
+            if res is None:
+                numberText = str(parse_decimal(text, locale=self.srcLocale))
+                res = format_decimal(numberText, locale=self.tgtLocale, decimal_quantization=False) if numberText else None
 
-            if numberText:
-                res = format_decimal(numberText, locale=self.tgtLocale, decimal_quantization=False)
+            if res is not None:
 
                 # if (self.srcGroupSymbol in text) and (self.tgtGroupSymbol in res):
                 # if (self.srcDecimalSymbol in text) and (self.tgtDecimalSymbol not in res):
@@ -177,19 +462,11 @@ class NumberTranslator:
                      if None, no number translation rule is matched
         """
 
-        number_only_pattern = r'^\s*(\d+)\s*$'
-        num_pr = re.compile(number_only_pattern)
-
-        if self.srcLang == 'eng':
-            pattern = r'(?P<number>[\d]+(?:[,]\d\d\d)*[\.]?\d*)'
-        elif self.srcLang == 'fra':
-            pattern = r'(?P<number>[\d]+(?:[\s]\d\d\d)*[,]?\d*)'
-        else:
+        if self._pattern is None:
             raise NotImplementedError('Language %s is not supported' % self.srcLang)
 
-        if self._fullmatch:
-            pattern = r'(?P<number>' + r'^' + pattern[len(r'(?P<number>'):len(pattern) - 1] + r'$)'
-        pr = re.compile(pattern)
+        num_pr = self._numberOnlyPattern
+        pr = self._pattern
 
         res = None
 
@@ -231,6 +508,19 @@ class PercentTranslator:
         self.srcDecimalSymbol = numbers.get_decimal_symbol(self.srcLocale)
         self.tgtDecimalSymbol = numbers.get_decimal_symbol(self.tgtLocale)
 
+        self._percentPattern = re.compile(r'^(?P<number>[,\.\xa0\d]*\d)(?P<symbol>\s*%)$')
+
+        if self.srcLang == 'eng':
+            pattern = r'(?P<percent>(?P<number>[,\.\d]*\d)(?P<symbol>\s*%))'
+        elif self.srcLang == 'fra':
+            pattern = r'(?P<percent>(?P<number>[,\xa0\d]*\d)(?P<symbol>\s*%))'
+        else:
+            pattern = None
+
+        if pattern and self._fullmatch:
+            pattern = r'(?P<percent>' + r'^' + pattern[len(r'(?P<percent>'):len(pattern) - 1] + r'$)'
+        self._pattern = re.compile(pattern) if pattern else None
+
     def _floatPrecision(self, percentText, decimalSymbol):
         """Return the float precision of the percent text
            E.g. 15% -> 2; 13.0% -> 3
@@ -256,6 +546,18 @@ class PercentTranslator:
 
     def convert(self, text):
         """Convert percent according to the target locale
+           Results are memoized by (text, locales)
+
+           Args:
+              text (str): percent text
+           Returns:
+              (str): converted percent
+        """
+
+        return _convertCache.get(('percent', text, self.srcLocale, self.tgtLocale), lambda: self._convert(text))
+
+    def _convert(self, text):
+        """Convert percent according to the target locale, without memoization
 
            Args:
               text (str): percent text
@@ -263,7 +565,6 @@ class PercentTranslator:
               (str): converted percent
         """
 
-        percentPattern = r'^(?P<number>[,\.\xa0\d]*\d)(?P<symbol>\s*%)$'
         numberText = str(parse_decimal(text.strip('%'), locale=self.srcLocale))
         srcFloatPrecision = self._floatPrecision(text, self.srcDecimalSymbol)
 
@@ -278,7 +579,7 @@ class PercentTranslator:
                 res = format_percent(percentText, locale=self.tgtLocale, decimal_quantization=False)
 
                 if self.srcDecimalSymbol in text:
-                    match = re.search(percentPattern, res)
+                    match = self._percentPattern.search(res)
                     if self.tgtDecimalSymbol not in res:
                         res = match.group('number') + self.tgtDecimalSymbol + numberText[
                                                                               numberText.index('.') + 1:] + match.group(
@@ -307,17 +608,10 @@ class PercentTranslator:
                      if None, no percent translation rule is matched
         """
 
-        if self.srcLang == 'eng':
-            pattern = r'(?P<percent>(?P<number>[,\.\d]*\d)(?P<symbol>\s*%))'
-        elif self.srcLang == 'fra':
-            pattern = r'(?P<percent>(?P<number>[,\xa0\d]*\d)(?P<symbol>\s*%))'
-        else:
+        if self._pattern is None:
             raise NotImplementedError('Language %s is not supported' % self.srcLang)
 
-        if self._fullmatch:
-            pattern = r'(?P<percent>' + r'^' + pattern[len(r'(?P<percent>'):len(pattern) - 1] + r'$)'
-
-        pr = re.compile(pattern)
+        pr = self._pattern
 
         res = None
 
@@ -364,8 +658,36 @@ class CurrencyTranslator:
 
         self.srcDecimalSymbol = numbers.get_decimal_symbol(self.srcLocale)
 
+        currency_code_pattern = '(' + self.curCode + '|' + self.curCode[:-1] + ')'
+
+        if self.srcLang == 'eng':
+            # pattern = r'(?P<currency>((?P<currency_code>[A-Z]*(\xa0)?)\$)(?P<blank>\s*)(?P<currency_integer>\d+(,\d{3})*)(?P<currency_decimal>\.\d+)?)'
+            pattern = r'(?P<currency>((?P<currency_code>' + currency_code_pattern + r'*(\xa0)?)\$)(?P<blank>\s*)(?P<currency_integer>\d+(,\d{3})*)(?P<currency_decimal>\.\d+)?)'
+        elif self.srcLang == 'fra':
+            # pattern = r'(?P<currency>(?P<currency_integer>\d+(\xa0\d{3})*)(?P<currency_decimal>,\d+)?(?P<blank>\s*)(\$(?P<currency_code>(\xa0)?[A-Z]*)))'
+            pattern = r'(?P<currency>(?P<currency_integer>\d+(\xa0\d{3})*)(?P<currency_decimal>,\d+)?(?P<blank>\s*)(\$(?P<currency_code>(\xa0)?' + currency_code_pattern + r'*)))'
+        else:
+            pattern = None
+
+        if pattern and self._fullmatch:
+            pattern = r'(?P<currency>' + r'^' + pattern[len(r'(?P<currency>'):len(pattern) - 1] + r'$)'
+        self._pattern = re.compile(pattern) if pattern else None
+
     def convert(self, text):
         """Convert currency according to the target locale
+           Results are memoized by (text, currency, locales)
+
+           Args:
+              text (str): currency text
+           Returns:
+              (str): converted currency
+        """
+
+        return _convertCache.get(('currency', text, self._curFormat, self.curCode, self.srcLocale, self.tgtLocale,
+                                  self.tgtLang), lambda: self._convert(text))
+
+    def _convert(self, text):
+        """Convert currency according to the target locale, without memoization
 
            Args:
               text (str): currency text
@@ -409,21 +731,10 @@ class CurrencyTranslator:
                      if None, no currency translation rule is matched
         """
 
-        currency_code_pattern = '(' + self.curCode + '|' + self.curCode[:-1] + ')'
-
-        if self.srcLang == 'eng':
-            # pattern = r'(?P<currency>((?P<currency_code>[A-Z]*(\xa0)?)\$)(?P<blank>\s*)(?P<currency_integer>\d+(,\d{3})*)(?P<currency_decimal>\.\d+)?)'
-            pattern = r'(?P<currency>((?P<currency_code>' + currency_code_pattern + r'*(\xa0)?)\$)(?P<blank>\s*)(?P<currency_integer>\d+(,\d{3})*)(?P<currency_decimal>\.\d+)?)'
-        elif self.srcLang == 'fra':
-            # pattern = r'(?P<currency>(?P<currency_integer>\d+(\xa0\d{3})*)(?P<currency_decimal>,\d+)?(?P<blank>\s*)(\$(?P<currency_code>(\xa0)?[A-Z]*)))'
-            pattern = r'(?P<currency>(?P<currency_integer>\d+(\xa0\d{3})*)(?P<currency_decimal>,\d+)?(?P<blank>\s*)(\$(?P<currency_code>(\xa0)?' + currency_code_pattern + r'*)))'
-        else:
+        if self._pattern is None:
             raise NotImplementedError('Language %s is not supported' % self.srcLang)
 
-        if self._fullmatch:
-            pattern = r'(?P<currency>' + r'^' + pattern[len(r'(?P<currency>'):len(pattern) - 1] + r'$)'
-
-        pr = re.compile(pattern)
+        pr = self._pattern
 
         res = None
 
@@ -436,6 +747,141 @@ class CurrencyTranslator:
         return res
 
 
+_NON_QUANTIFIER_BRACE_PATTERN = re.compile(r'(?<!\\)(?:\\\\)*\{(?!\d*(?:,\d*)?\})')
+
+
+def _requiredLiterals(items):
+    """Collect the literal strings that must occur in any match of a parsed pattern
+
+       Args:
+          items (list): (opcode, argument) items of a pattern parsed by sre_parse
+
+       Returns:
+          (list): the required literal strings
+    """
+
+    res = []
+    run = []
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+
+        if run:
+            res.append(''.join(run))
+            run = []
+
+        if op is sre_constants.SUBPATTERN:
+            addFlags, p = av[1], av[3]
+            if not addFlags & sre_constants.SRE_FLAG_IGNORECASE:
+                res.extend(_requiredLiterals(p))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                    getattr(sre_constants, 'POSSESSIVE_REPEAT', None)):
+            minRepeat, p = av[0], av[2]
+            if minRepeat >= 1:
+                res.extend(_requiredLiterals(p))
+
+    if run:
+        res.append(''.join(run))
+
+    return res
+
+
+def _requiredLiteral(pattern):
+    """Get the longest literal string that must occur in any match of a pattern, as a prefilter
+
+       Args:
+          pattern (str): the regex pattern
+
+       Returns:
+          (str or None): the literal, or None if the pattern has no usable literal
+                         (e.g., no literal, case-insensitive or syntax specific to the regex module)
+    """
+
+    # Braces other than quantifiers, e.g., fuzzy constraints of the regex module, are not literals
+    if _NON_QUANTIFIER_BRACE_PATTERN.search(pattern):
+        return None
+
+    # sre_parse only warns about syntax it reads differently from the regex module (e.g., the POSIX class in
+    # [[:alpha:]] is read as a set followed by a literal ']'), so any warning means there is no reliable literal
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+
+    if parsed.state.flags & (sre_constants.SRE_FLAG_IGNORECASE | sre_constants.SRE_FLAG_LOCALE):
+        return None
+
+    literals = _requiredLiterals(parsed.data)
+
+    return max(literals, key=len) if literals else None
+
+
+class _AhoCorasick:
+    """Aho-Corasick automaton finding all occurrences of many keywords in one pass over a text
+    """
+
+    def __init__(self, keywords):
+        """Initialize an _AhoCorasick instance
+
+           Args:
+              keywords (list): non-empty keyword strings
+        """
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [set()]
+
+        for i, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append(set())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._outputs[state].add(i)
+
+        # Breadth-first construction of the failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nextState in self._goto[state].items():
+                queue.append(nextState)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nextState] = self._goto[fail].get(char, 0)
+                self._outputs[nextState] |= self._outputs[self._fail[nextState]]
+
+    def search(self, text):
+        """Find the keywords occurring in a text
+
+           Args:
+              text (str): the text
+
+           Returns:
+              (set): the indices of the keywords found
+        """
+
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        res = set()
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                res |= outputs[state]
+
+        return res
+
+
 class TemplateTranslator:
     """Template-based translation using regex
     """
@@ -453,6 +899,51 @@ class TemplateTranslator:
         self.tgtLang = NAME_YAPPN_MAPPINGS[targetLang]
         self._mappings = {srcRegex: tgtRegex for (srcLang, tgtLang, srcRegex, tgtRegex)
                           in templates if srcLang == self.srcLang and tgtLang == self.tgtLang}
+        self._matcher = None
+
+    def compile(self):
+        """Compile the templates into one matcher: every source regex is compiled once, and an Aho-Corasick
+           automaton over the literal each regex requires shortlists the templates that can match a text
+
+           Returns:
+              (TemplateTranslator): the translator itself
+        """
+
+        regexes = []
+        literals = {}
+        unfiltered = []
+
+        for priority, srcRegex in enumerate(self._mappings):
+            regexes.append((re.compile(srcRegex), self._mappings[srcRegex]))
+            literal = _requiredLiteral(srcRegex)
+            if literal:
+                literals.setdefault(literal, []).append(priority)
+            else:
+                unfiltered.append(priority)
+
+        keywords = list(literals)
+        self._matcher = (regexes, _AhoCorasick(keywords), [literals[keyword] for keyword in keywords], unfiltered)
+
+        return self
+
+    def _candidates(self, text):
+        """Get the templates that can match a text, in priority order
+
+           Args:
+              text (str): input text
+           Returns:
+              (list): the (compiled source regex, target regex) candidates
+        """
+
+        if self._matcher is None:
+            self.compile()
+
+        regexes, automaton, priorities, unfiltered = self._matcher
+        candidates = list(unfiltered)
+        for keyword in automaton.search(text):
+            candidates.extend(priorities[keyword])
+
+        return [regexes[priority] for priority in sorted(candidates)]
 
     def translate(self, text):
         """Translate a text according to the rules
@@ -466,10 +957,9 @@ class TemplateTranslator:
 
         res = None
 
-        for srcRegex in self._mappings:
-            sr = re.compile(srcRegex)
+        for sr, tgtRegex in self._candidates(text):
             if sr.search(text):
-                res = sr.sub(self._mappings[srcRegex], text)
+                res = sr.sub(tgtRegex, text)
                 break
 
         return res
@@ -494,19 +984,17 @@ class Assembler:
                     translators])
 
         self._translators = translators
+        self._chain = None
 
-    def assemble(self, text):
-        """Assemble translations
+    def compile(self):
+        """Build the translator chain once, so that the Babel locale lookups and mappings of the translators
+           are not repeated for every text
 
-           Args:
-              text (str): input text
            Returns:
-              (str): the translated and assembled text
-                     if None, no rule-based translation is applied
+              (Assembler): the assembler itself
         """
 
-        srcText = text
-        tgtText = None
+        chain = []
 
         for translator in self._translators:
             if translator['name'] == 'template':
@@ -531,6 +1019,29 @@ class Assembler:
             else:
                 raise NotImplementedError('Translator %s is not implemented' % translator['name'])
 
+            chain.append(trans)
+
+        self._chain = chain
+
+        return self
+
+    def assemble(self, text):
+        """Assemble translations
+
+           Args:
+              text (str): input text
+           Returns:
+              (str): the translated and assembled text
+                     if None, no rule-based translation is applied
+        """
+
+        if self._chain is None:
+            self.compile()
+
+        srcText = text
+        tgtText = None
+
+        for trans in self._chain:
             srcText = trans.translate(srcText)
 
             if srcText is not None:
@@ -539,3 +1050,23 @@ class Assembler:
                 break
 
         return tgtText
+
+    def assemble_many(self, texts):
+        """Assemble translations of many texts, e.g., for rule-based pre-translation of a TM
+           The translator chain is built once and identical texts are only translated once
+
+           Args:
+              texts (list): input texts
+           Returns:
+              (list): the translated and assembled texts (None where no rule-based translation is applied)
+        """
+
+        translated = {}
+        res = []
+
+        for text in texts:
+            if text not in translated:
+                translated[text] = self.assemble(text)
+            res.append(translated[text])
+
+        return res
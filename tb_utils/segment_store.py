@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+# utils: segment store
+#
+# --------------------------------------------------
+# This module implements a compact columnar store of TM segments.
+# A store is a directory holding, for the source and the target column, the UTF-8 texts concatenated into one blob
+# (<column>.bin) and the int64 byte offsets of the texts in the blob (<column>.offsets.npy), the int32 id of the file
+# each segment comes from (file_ids.npy) and a manifest (meta.json) with the file names and user metadata.
+# Stores are written in one streaming pass and read through memory maps, so opening a store is instant and
+# a segment is only decoded when it is accessed.
+
+import os, json, mmap, shutil
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+
+COLUMNS = ('source', 'target')
+
+
+class SegmentStoreWriter(object):
+    """Write a segment store in one streaming pass, use as a context manager.
+       The store is written into a temporary directory and moved to its path when closed, so that readers never
+       see a partial store."""
+
+    def __init__(self, path, meta=None):
+
+        path = os.fspath(path)
+        self.path = path
+        self.meta = dict(meta or {})
+        self.files = []
+
+        self._tmpPath = path + '.tmp%d' % os.getpid()
+        if os.path.exists(self._tmpPath):
+            shutil.rmtree(self._tmpPath)
+        os.makedirs(self._tmpPath)
+
+        self._blobs = {column: open(os.path.join(self._tmpPath, column + '.bin'), 'wb', buffering=1 << 20)
+                       for column in COLUMNS}
+        self._offsets = {column: array('q', [0]) for column in COLUMNS}
+        self._fileIds = array('i')
+
+    def add_file(self, name):
+        """Register a source file and return its id."""
+
+        self.files.append(name)
+
+        return len(self.files) - 1
+
+    def write(self, src, tgt, fileId=-1):
+        """Append a (source_text, target_text) segment, with the id of its source file (-1 if unknown)."""
+
+        for column, text in zip(COLUMNS, (src, tgt)):
+            data = text.encode('utf8')
+            self._blobs[column].write(data)
+            self._offsets[column].append(self._offsets[column][-1] + len(data))
+
+        self._fileIds.append(fileId)
+
+    def write_pairs(self, pairs, fileId=-1):
+        """Append (source_text, target_text) segments of an iterable."""
+
+        for src, tgt in pairs:
+            self.write(src, tgt, fileId)
+
+    def __len__(self):
+
+        return len(self._fileIds)
+
+    def close(self):
+        """Finish the store and move it to its path."""
+
+        for column in COLUMNS:
+            self._blobs[column].close()
+            np.save(os.path.join(self._tmpPath, column + '.offsets.npy'), np.frombuffer(self._offsets[column], np.int64))
+        np.save(os.path.join(self._tmpPath, 'file_ids.npy'), np.frombuffer(self._fileIds, np.int32))
+
+        with open(os.path.join(self._tmpPath, 'meta.json'), 'w', encoding='utf8') as f:
+            json.dump({'count': len(self), 'files': self.files, 'meta': self.meta}, f, ensure_ascii=False)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.rename(self._tmpPath, self.path)
+
+    def abort(self):
+        """Discard the store being written."""
+
+        for column in COLUMNS:
+            self._blobs[column].close()
+        shutil.rmtree(self._tmpPath, ignore_errors=True)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SegmentColumn(Sequence):
+    """A read-only sequence of the texts of a store column, decoded on access."""
+
+    def __init__(self, store, column):
+
+        self._store = store
+        self._column = column
+
+    def __len__(self):
+
+        return len(self._store)
+
+    def __getitem__(self, i):
+
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self._store.text(self._column, j) for j in range(start, stop, step)]
+            return self._store.texts(self._column, start, max(start, stop))
+
+        return self._store.text(self._column, i)
+
+    def __iter__(self):
+
+        for start in range(0, len(self), 65536):
+            yield from self._store.texts(self._column, start, min(start + 65536, len(self)))
+
+
+class SegmentStore(object):
+    """Read a segment store through memory maps."""
+
+    def __init__(self, path):
+
+        self.path = path
+
+        with open(os.path.join(path, 'meta.json'), encoding='utf8') as f:
+            manifest = json.load(f)
+
+        self.files = manifest['files']
+        self.meta = manifest['meta']
+        self.fileIds = np.load(os.path.join(path, 'file_ids.npy'), mmap_mode='r')
+
+        self._offsets = {}
+        self._blobs = {}
+        for column in COLUMNS:
+            self._offsets[column] = np.load(os.path.join(path, column + '.offsets.npy'), mmap_mode='r')
+            with open(os.path.join(path, column + '.bin'), 'rb') as f:
+                # Empty files cannot be memory-mapped
+                self._blobs[column] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._offsets[column][-1] else b''
+
+    @staticmethod
+    def is_store(path):
+        """Check whether a path holds a complete segment store."""
+
+        return os.path.isfile(os.path.join(path, 'meta.json'))
+
+    def __len__(self):
+
+        return len(self.fileIds)
+
+    def _index(self, i):
+        """Normalize a (possibly negative) segment index, raising IndexError if it is out of range."""
+
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('segment index out of range')
+
+        return i
+
+    def text(self, column, i):
+        """Get the text of a segment in a column ('source' or 'target')."""
+
+        i = self._index(i)
+        offsets = self._offsets[column]
+
+        return self._blobs[column][offsets[i]:offsets[i + 1]].decode('utf8')
+
+    def texts(self, column, start=0, end=None):
+        """Get the texts of a column ('source' or 'target') from segment start to segment end (excluded) as a list."""
+
+        blob = self._blobs[column]
+        offsets = self._offsets[column][start:(len(self) if end is None else end) + 1].tolist()
+
+        return [blob[i:j].decode('utf8') for i, j in zip(offsets[:-1], offsets[1:])]
+
+    def column(self, column):
+        """Get a column ('source' or 'target') as a read-only sequence decoded on access."""
+
+        return SegmentColumn(self, column)
+
+    def __getitem__(self, i):
+
+        i = self._index(i)
+
+        return self.text('source', i), self.text('target', i)
+
+    def file(self, i):
+        """Get the source file of a segment, None if unknown."""
+
+        fileId = int(self.fileIds[self._index(i)])
+
+        return self.files[fileId] if fileId >= 0 else None
+
+    def iter_pairs(self, batchSize=65536):
+        """Generate the (source_text, target_text) segments, decoding batchSize segments at a time."""
+
+        for start in range(0, len(self), batchSize):
+            end = min(start + batchSize, len(self))
+            yield from zip(self.texts('source', start, end), self.texts('target', start, end))
+
+    def close(self):
+
+        for blob in self._blobs.values():
+            if isinstance(blob, mmap.mmap):
+                blob.close()
+        self._blobs = {}
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+
+        self.close()
@@ -0,0 +1,68 @@
+import unittest, sys, os, random
+from pathlib import Path
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from tb_utils.edit_distance import distance, similarity, isSimilar, rescore, batchSimilarity
+
+
+def dp_distance(seq1, seq2, transpositions=False):
+    """Reference dynamic programming (optimal string alignment if transpositions)"""
+
+    d = [[i + j if i * j == 0 else 0 for j in range(len(seq2) + 1)] for i in range(len(seq1) + 1)]
+    for i in range(1, len(seq1) + 1):
+        for j in range(1, len(seq2) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (seq1[i - 1] != seq2[j - 1]))
+            if transpositions and i > 1 and j > 1 and seq1[i - 1] == seq2[j - 2] and seq1[i - 2] == seq2[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+
+    return d[-1][-1]
+
+
+class TestEditDistance(unittest.TestCase):
+
+    def setUp(self):
+
+        rng = random.Random(0)
+        self.pairs = [(''.join(rng.choice('abc') for _ in range(rng.randint(0, 80))),
+                       ''.join(rng.choice('abc') for _ in range(rng.randint(0, 80)))) for _ in range(300)]
+
+    def test_distance(self):
+
+        self.assertEqual(distance('kitten', 'sitting'), 3)
+        self.assertEqual(distance('ab', 'ba'), 2)
+        self.assertEqual(distance('ab', 'ba', transpositions=True), 1)
+        self.assertEqual(distance('CA', 'ABC', transpositions=True), 3)
+        self.assertEqual(distance('', 'abc'), 3)
+
+        for seq1, seq2 in self.pairs:
+            self.assertEqual(distance(seq1, seq2), dp_distance(seq1, seq2))
+            self.assertEqual(distance(seq1, seq2, True), dp_distance(seq1, seq2, True))
+
+    def test_words(self):
+
+        words1 = 'the quick brown fox jumps over the lazy dog'.split()
+        words2 = 'the quick red fox jumped over a lazy dog'.split()
+
+        self.assertEqual(distance(words1, words2), 3)
+        self.assertAlmostEqual(similarity(words1, words2), 2 / 3)
+
+    def test_threshold(self):
+
+        for seq1, seq2 in self.pairs:
+            score = similarity(seq1, seq2)
+            for threshold in (0.3, 0.5, 0.75):
+                self.assertEqual(isSimilar(seq1, seq2, threshold), score >= threshold)
+                self.assertAlmostEqual(similarity(seq1, seq2, threshold=threshold), score if score >= threshold else 0.0)
+
+    def test_batch(self):
+
+        expected = [similarity(seq1, seq2) for seq1, seq2 in self.pairs]
+
+        self.assertEqual(list(batchSimilarity(self.pairs)), expected)
+        self.assertEqual(list(batchSimilarity(self.pairs, nJobs=2, chunkSize=100)), expected)
+        self.assertEqual(list(rescore('abcab', [seq2 for _, seq2 in self.pairs])),
+                         [similarity('abcab', seq2) for _, seq2 in self.pairs])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest, sys, os, tempfile, codecs
+from pathlib import Path
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from tb_utils.file_io import LineIndexedFile, CSVReader, ExcelReader
+
+
+class TestLineIndexedFile(unittest.TestCase):
+
+    def test_lines(self):
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'corpus.txt')
+            with open(path, 'wb') as f:
+                f.write('première ligne\nsecond\r\n\nlast'.encode('utf8'))
+            lines = ['première ligne\n', 'second\r\n', '\n', 'last']
+
+            with LineIndexedFile(path, chunkSize=4) as corpus:
+                self.assertEqual(list(corpus), lines)
+                self.assertTrue(os.path.isfile(corpus.indexPath))
+
+            # The cached offsets are reused
+            with LineIndexedFile(path, stripText=True) as corpus:
+                self.assertEqual(len(corpus), 4)
+                self.assertEqual((corpus[0], corpus[-1]), ('première ligne', 'last'))
+                self.assertEqual(corpus.getMany([3, 1, 1]), ['last', 'second', 'second'])
+                with self.assertRaises(IndexError):
+                    corpus.getMany([4])
+
+    def test_unicode_lines(self):
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'corpus.txt')
+            with open(path, 'wb') as f:
+                f.write('a\u2028b\nc\x85d\re\r\nf\x0cé'.encode('utf8'))
+
+            with codecs.open(path, 'r', encoding='utf8') as f:
+                lines = f.readlines()
+            self.assertEqual(len(lines), 7)
+
+            for chunkSize in (1, 2, 1 << 20):
+                with LineIndexedFile(path, chunkSize=chunkSize, unicodeLines=True) as corpus:
+                    self.assertEqual(list(corpus), lines)
+                os.remove(corpus.indexPath)
+
+            # Lines split on '\n' only have their own cache
+            with LineIndexedFile(path) as corpus:
+                self.assertEqual(len(corpus), 3)
+
+
+class TestExcelReader(unittest.TestCase):
+
+    def test_read(self):
+
+        import openpyxl
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'glossary.xlsx')
+            workbook = openpyxl.Workbook()
+            workbook.active.title = 'Terms'
+            for row in (['source', 'target', 'count'], ['cat', 'chat', 3], ['dog', None, 2.0]):
+                workbook.active.append(row)
+            workbook.create_sheet('Notes').append(['note'])
+            workbook.save(path)
+
+            reader = ExcelReader(path)
+            self.assertEqual(reader.worksheets, ['Terms', 'Notes'])
+            self.assertEqual(reader.readAllRows(), [['source', 'target', 'count'], ['cat', 'chat', 3], ['dog', '', 2]])
+            self.assertEqual(reader.readAllColsAsString(), [['source', 'cat', 'dog'], ['target', 'chat', ''],
+                                                            ['count', '3', '2']])
+            self.assertEqual(ExcelReader(path, worksheetName='Notes').readAllCols(), [['note']])
+            with self.assertRaises(ValueError):
+                ExcelReader(path, worksheetName='Missing')
+
+            reader = ExcelReader(os.path.join(BASE_DIR, 'tb_utils', 'test', 'data', 'sample.xls'))
+            self.assertEqual(reader.readAllRowsAsString()[:3], [['source', 'target'], ['Hello world', 'Bonjour le monde'],
+                                                                ['2021', ' Merci ']])
+            self.assertEqual(reader.readAllCols()[0], ['source', 'Hello world', 2021.0, '', 'Good night'])
+            self.assertEqual(reader.readCellAsString(2, 0), '2021')
+
+
+class TestCSVReader(unittest.TestCase):
+
+    def test_read(self):
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'export.csv')
+            with open(path, 'w', newline='', encoding='utf8') as f:
+                f.write('source,target\r\none,"un\r\nde\rux"\r\ntwo,deux\r\nthree,trois')
+
+            header, body = CSVReader(path).read()
+            self.assertEqual(header, ['source', 'target'])
+            self.assertEqual(body, [['one', 'un\ndeux'], ['two', 'deux'], ['three', 'trois']])
+            self.assertEqual(os.listdir(tmpDir), ['export.csv'])
+
+            header, body = CSVReader(path).read(chunkSize=2)
+            self.assertEqual(list(body), [[['one', 'un\ndeux'], ['two', 'deux']], [['three', 'trois']]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest, sys, os
+from pathlib import Path
+from unittest import mock
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from tb_utils.nlp import WordTokenizer, Backends
+
+
+class TestWordTokenizer(unittest.TestCase):
+
+    @unittest.skipUnless(os.name == 'posix', "jieba's parallel mode is POSIX only")
+    def test_tokenize_many_chinese_parallel(self):
+
+        jieba = Backends.get('jieba')
+        tokenizer = WordTokenizer('zhs')
+        texts = ['我来到北京清华大学', '他来到了网易杭研大厦\n小明硕士毕业', '', '今天天气很好']
+
+        expected = tokenizer.tokenizeMany(texts)
+        with mock.patch.object(jieba, '_pcut', wraps=jieba._pcut) as pcut:
+            res = tokenizer.tokenizeMany(texts, nJobs=2)
+
+        pcut.assert_called_once()
+        self.assertEqual(res, expected)
+        self.assertEqual(len(res), len(texts))
+        # The module-level cut is restored
+        self.assertIsNot(jieba.cut, jieba._pcut)
+
+
+if __name__ == '__main__':
+    unittest.main()
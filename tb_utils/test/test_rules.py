@@ -0,0 +1,29 @@
+import unittest, sys, os
+from pathlib import Path
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from tb_utils.rules import TemplateTranslator, _requiredLiteral
+
+
+class TestTemplateTranslator(unittest.TestCase):
+
+    def test_required_literal(self):
+
+        self.assertEqual(_requiredLiteral(r'^Total: (\d+) items$'), 'Total: ')
+        self.assertIsNone(_requiredLiteral(r'(?i)^total$'))
+        # POSIX classes of the regex module are misread by sre_parse
+        self.assertIsNone(_requiredLiteral(r'^([[:alpha:]]+)$'))
+
+    def test_translate(self):
+
+        templates = [('eng', 'fra', r'^Total: (\d+) items$', r'Total : \1 articles'),
+                     ('eng', 'fra', r'^([[:alpha:]]+)$', r'<\1>')]
+        translator = TemplateTranslator(templates, 'English', 'French')
+
+        self.assertEqual(translator.translate('Total: 3 items'), 'Total : 3 articles')
+        self.assertEqual(translator.translate('Hello'), '<Hello>')
+        self.assertIsNone(translator.translate('Hello world'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest, sys, os
+from pathlib import Path
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from tb_utils.text_arena import TextArena, arena_map
+
+
+def _upper_or_fail(text):
+
+    if text == 'fail':
+        raise ValueError(text)
+
+    return text.upper()
+
+
+class TestTextArena(unittest.TestCase):
+
+    def test_arena(self):
+
+        texts = ['Hello', '', 'première ligne', '数据 😀', 'x' * 100]
+
+        with TextArena.from_texts(texts) as arena:
+            self.assertEqual(arena.texts(), texts)
+            self.assertEqual(arena.texts(1, 4), texts[1:4])
+            self.assertEqual((arena[2], arena[-1]), (texts[2], texts[-1]))
+
+            # Workers attach by name
+            with TextArena(arena.name) as attached:
+                self.assertEqual(attached.texts(3), texts[3:])
+
+            with TextArena.concat([arena, arena]) as doubled:
+                self.assertEqual(doubled.texts(), texts + texts)
+
+    def test_arena_map(self):
+
+        texts = ['Segment {} é'.format(i) for i in range(50)]
+
+        self.assertEqual(arena_map(str.upper, texts, nJobs=2, chunkSize=7), [text.upper() for text in texts])
+
+        with arena_map(str.upper, texts, nJobs=2, chunkSize=7, asArena=True) as upper:
+            self.assertEqual(arena_map(str.lower, upper, nJobs=2, chunkSize=7), [text.lower() for text in texts])
+
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), 'shared memory blocks are not listed')
+    def test_arena_map_error(self):
+
+        texts = ['fail'] + ['Segment {}'.format(i) for i in range(50)]
+        before = set(os.listdir('/dev/shm'))
+
+        with self.assertRaises(ValueError):
+            arena_map(_upper_or_fail, texts, nJobs=2, chunkSize=5)
+
+        # The arenas of the chunks done before the failure are freed
+        self.assertEqual(set(os.listdir('/dev/shm')) - before, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
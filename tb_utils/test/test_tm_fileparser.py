@@ -0,0 +1,228 @@
+import unittest, sys, os, tempfile, gzip
+from pathlib import Path
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from tb_utils.tm_fileparser import TmFileParser, TmxWriter, writeToTmxFile
+
+
+TMX = '''<?xml version="1.0" encoding="UTF-8"?>
+<tmx version="1.4">
+<header srclang="en-US" datatype="plaintext" segtype="sentence" adminlang="en" o-tmf="TMX" creationtool="test" creationtoolversion="1"/>
+<body>
+<tu><tuv xml:lang="en-US"><seg>file_en.txt</seg></tuv><tuv xml:lang="fr-CA"><seg>file_fr.txt</seg></tuv></tu>
+<tu><tuv xml:lang="en-US"><seg> Hello <ph x="1">{1}</ph>world </seg></tuv><tuv xml:lang="fr-CA"><seg>Bonjour le monde</seg></tuv></tu>
+<tu><tuv xml:lang="en-US"><seg>Source only</seg></tuv></tu>
+<tu><prop type="note">p</prop><tuv xml:lang="en-US"><seg>Fish &amp; chips</seg></tuv><tuv xml:lang="fr-CA"><seg>Poisson &amp; frites</seg></tuv></tu>
+</body>
+</tmx>
+'''
+
+MXLIFF = '''<?xml version="1.0" encoding="UTF-8"?>
+<xliff xmlns="urn:oasis:names:tc:xliff:document:1.2" version="1.2">
+<file><body>
+<group><trans-unit id="1"><source>Hello
+  world</source><target>Bonjour le monde</target></trans-unit></group>
+<group><trans-unit id="2"><source>Fish &amp; chips</source><target>Poisson &amp; frites</target></trans-unit></group>
+</body></file>
+</xliff>
+'''
+
+
+class TestTmFileParser(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.tmx = os.path.join(self.tmpDir.name, 'sample.tmx')
+        with open(self.tmx, 'w', encoding='utf8') as f:
+            f.write(TMX)
+
+    def tearDown(self):
+
+        self.tmpDir.cleanup()
+
+    def test_iter_tmx(self):
+
+        pairs = list(TmFileParser('tmx').iter_tmx(self.tmx, tmxHasAlignedFilenames=True))
+        self.assertEqual(pairs, [('Hello {1}world', 'Bonjour le monde'), ('Fish & chips', 'Poisson & frites')])
+
+        parser = TmFileParser('tmx')
+        parser.parse(self.tmx)
+        self.assertEqual(parser.srcTexts, ['file_en.txt', 'Hello {1}world', 'Fish & chips'])
+        self.assertEqual(parser.tgtTexts, ['file_fr.txt', 'Bonjour le monde', 'Poisson & frites'])
+
+        with self.assertRaises(AssertionError):
+            TmFileParser('tmx').iter_tmx(self.tmx[:-4] + '.txt')
+
+    def test_iter_pairs(self):
+
+        mxliff = os.path.join(self.tmpDir.name, 'sample.mxliff')
+        with open(mxliff, 'w', encoding='utf8') as f:
+            f.write(MXLIFF)
+
+        pairs = TmFileParser('mxliff').iter_pairs(mxliff)
+        self.assertEqual(next(pairs), ('Hello world', 'Bonjour le monde'))
+        self.assertEqual(list(pairs), [('Fish & chips', 'Poisson & frites')])
+
+        src, tgt = os.path.join(self.tmpDir.name, 'src.txt'), os.path.join(self.tmpDir.name, 'tgt.txt')
+        with open(src, 'w') as f:
+            f.write('one\ntwo\n')
+        with open(tgt, 'w') as f:
+            f.write('un\ndeux\ntrois\n')
+
+        pairs = TmFileParser('2txt').iter_pairs([src, tgt])
+        self.assertEqual([next(pairs), next(pairs)], [('one\n', 'un\n'), ('two\n', 'deux\n')])
+        with self.assertRaises(AssertionError):
+            next(pairs)
+
+    def test_parse_cache(self):
+
+        parser = TmFileParser('tmx')
+        parser.parse(self.tmx)
+        self.assertTrue(os.path.isdir(parser.cache_path(self.tmx)))
+
+        for lazy in (False, True):
+            cached = TmFileParser('tmx')
+            cached.parse(self.tmx, lazy=lazy)
+            self.assertEqual((list(cached.srcTexts), list(cached.tgtTexts)), (parser.srcTexts, parser.tgtTexts))
+
+        # Texts loaded lazily become lists when more files are parsed
+        cached.parse(Path(self.tmx))
+        self.assertEqual(cached.srcTexts, parser.srcTexts * 2)
+
+        # Other options do not match the cache key
+        parser = TmFileParser('tmx')
+        parser.parse(self.tmx, tmxHasAlignedFilenames=True)
+        self.assertEqual(parser.srcTexts, ['Hello {1}world', 'Fish & chips'])
+
+        with open(self.tmx, 'w', encoding='utf8') as f:
+            f.write(TMX.replace('Fish', 'Cod'))
+        parser = TmFileParser('tmx')
+        parser.parse(self.tmx, tmxHasAlignedFilenames=True)
+        self.assertEqual(parser.srcTexts, ['Hello {1}world', 'Cod & chips'])
+
+    def test_parse_cache_2txt(self):
+
+        files = {}
+        for name, lines in (('a', ('one\n', 'two\n', 'three\n')), ('b', ('four\n',))):
+            files[name] = [os.path.join(self.tmpDir.name, name + ext) for ext in ('.en', '.fr')]
+            for path in files[name]:
+                with open(path, 'w') as f:
+                    f.writelines(lines)
+
+        # One parser appends the texts of each input, which are cached on their own
+        parser = TmFileParser('2txt')
+        parser.parse(files['a'])
+        parser.parse(files['b'])
+        self.assertEqual(parser.srcTexts, ['one\n', 'two\n', 'three\n', 'four\n'])
+
+        for lazy in (False, True):
+            cached = TmFileParser('2txt')
+            cached.parse(files['b'], lazy=lazy)
+            self.assertEqual(list(cached.tgtTexts), ['four\n'])
+
+        cached.parse(files['a'])
+        self.assertEqual(cached.srcTexts, ['four\n', 'one\n', 'two\n', 'three\n'])
+
+    def test_parse_excel(self):
+
+        import openpyxl
+
+        xlsx = os.path.join(self.tmpDir.name, 'sample.xlsx')
+        workbook = openpyxl.Workbook()
+        # Empty header cells are unnamed columns, as in pandas
+        for row in ([None, None], ['Hello world', 'Bonjour le monde'], [2021, ' Merci '], [], ['Good night', None], []):
+            workbook.active.append(row)
+        workbook.save(xlsx)
+
+        parser = TmFileParser('excel')
+        parser.parse(xlsx, useCache=False)
+        self.assertEqual(list(zip(parser.srcTexts, parser.tgtTexts)),
+                         [('Hello world', 'Bonjour le monde'), ('2021', 'Merci'), ('', ''), ('Good night', '')])
+
+        parser = TmFileParser('excel')
+        parser.parse(os.path.join(BASE_DIR, 'tb_utils', 'test', 'data', 'sample.xls'), useCache=False)
+        self.assertEqual(list(zip(parser.srcTexts, parser.tgtTexts)),
+                         [('Hello world', 'Bonjour le monde'), ('2021', 'Merci'), ('', ''), ('Good night', 'Bonne nuit')])
+
+        # Every parser appends, and a failed parse adds nothing
+        parser.parse_excel(xlsx)
+        self.assertEqual(len(parser.srcTexts), 8)
+
+        workbook.active.append(['a', 'b', 'c'])
+        workbook.save(xlsx)
+        for parse in (parser.parse_excel, lambda path: parser.parse(path, useCache=False)):
+            with self.assertRaisesRegex(Exception, 'first two columns'):
+                parse(xlsx)
+            self.assertEqual((len(parser.srcTexts), len(parser.tgtTexts)), (8, 8))
+
+        workbook.create_sheet('Other')
+        workbook.save(xlsx)
+        with self.assertRaisesRegex(Exception, 'Only one sheet'):
+            TmFileParser('excel').parse(xlsx, useCache=False)
+
+    def test_iter_elements_memory(self):
+
+        units = ''.join('<group><trans-unit id="{0}"><source>s{0}</source><target>t{0}</target></trans-unit></group>'
+                        .format(i) for i in range(1000))
+        mxliff = os.path.join(self.tmpDir.name, 'groups.mxliff')
+        with open(mxliff, 'w', encoding='utf8') as f:
+            f.write(MXLIFF.replace('<file><body>', '<file><header/><body>' + units))
+
+        # The processed groups are removed from the tree (lxml may have parsed a few following ones ahead)
+        count = 0
+        for unit in TmFileParser._iter_elements(mxliff, '{*}trans-unit'):
+            # At most the emptied group of the previous unit is left before this one
+            group = unit.getparent()
+            self.assertLessEqual(len(list(group.itersiblings(preceding=True))), 1)
+            if count:
+                self.assertIsNone(group.getparent().getprevious())
+            count += 1
+        self.assertEqual(count, 1002)
+        self.assertEqual(len(list(TmFileParser('mxliff').iter_pairs(mxliff))), 1002)
+
+    def test_tmx_writer(self):
+
+        pairs = list(TmFileParser('tmx').iter_pairs(self.tmx))
+        pairs.append(('a < b & "c"\x01', 'x\ny'))
+
+        output = os.path.join(self.tmpDir.name, 'output.tmx')
+        with TmxWriter(output, 'en-US', 'fr-CA') as writer:
+            writer.write_pairs(pairs[:-1])
+            writer.write_pair(*pairs[-1], note='a&b')
+        self.assertEqual(list(TmFileParser('tmx').iter_pairs(output)), pairs[:-1] + [('a < b & "c"', 'x\ny')])
+
+        with TmxWriter(output + '.gz', 'en-US', 'fr-CA') as writer:
+            writer.write_pairs(pairs[:-1])
+            writer.write_pair(*pairs[-1], note='a&b')
+        with open(output, 'rb') as f, gzip.open(output + '.gz') as g:
+            self.assertEqual(f.read(), g.read())
+
+        # Path objects are accepted, and a writer that fails to start leaves no file
+        self.assertTrue(writeToTmxFile(Path(output + '.2.gz'), pairs[:-1], 'en-US', 'fr-CA'))
+        with gzip.open(output + '.2.gz') as g:
+            self.assertEqual(g.read().count(b'<tu>'), len(pairs) - 1)
+
+        with self.assertRaises(LookupError):
+            TmxWriter(Path(output + '.3'), 'en-US', 'fr-CA', encoding='unknown')
+        self.assertFalse(os.path.exists(output + '.3'))
+
+    def test_iter_pairs_parallel(self):
+
+        mxliff = os.path.join(self.tmpDir.name, 'sample.mxliff')
+        with open(mxliff, 'w', encoding='utf8') as f:
+            f.write(MXLIFF)
+
+        for fileType, file in (('tmx', self.tmx), ('mxliff', mxliff)):
+            expected = list(TmFileParser(fileType).iter_pairs(file, tmxHasAlignedFilenames=True))
+            for nJobs in (1, 2):
+                pairs = TmFileParser(fileType).iter_pairs_parallel(file, nJobs=nJobs, chunkSize=50,
+                                                                   tmxHasAlignedFilenames=True)
+                self.assertEqual(list(pairs), expected)
+                pairs = TmFileParser(fileType).iter_pairs_parallel(file, nJobs=nJobs, chunkSize=50, ordered=False,
+                                                                   tmxHasAlignedFilenames=True)
+                self.assertEqual([pair for _, pair in sorted(pairs)], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest, sys, os, tempfile
+from pathlib import Path
+BASE_DIR = Path(os.path.abspath(__file__)).parent.parent.parent.__str__()
+sys.path.insert(0, BASE_DIR)
+from tb_utils.tm_ingest import ingest_directory, detect_file_type
+from tb_utils.segment_store import SegmentStore
+from tb_utils.tm_fileparser import TmFileParser
+
+
+TMX = '''<?xml version="1.0" encoding="UTF-8"?>
+<tmx version="1.4"><header srclang="en-US"/><body>
+<tu><tuv xml:lang="en-US"><seg>Hello  world</seg></tuv><tuv xml:lang="fr-CA"><seg>Bonjour le monde</seg></tuv></tu>
+<tu><tuv xml:lang="en-US"><seg>Hello world</seg></tuv><tuv xml:lang="fr-CA"><seg>Bonjour le monde</seg></tuv></tu>
+<tu><tuv xml:lang="en-US"><seg>Thank you</seg></tuv><tuv xml:lang="fr-CA"><seg>Merci</seg></tuv></tu>
+</body></tmx>
+'''
+
+MXLIFF = '''<?xml version="1.0" encoding="UTF-8"?>
+<xliff xmlns="urn:oasis:names:tc:xliff:document:1.2" version="1.2"><file><body>
+<trans-unit id="1"><source>Thank you</source><target>Merci</target></trans-unit>
+<trans-unit id="2"><source>Good night</source><target>Bonne nuit</target></trans-unit>
+</body></file></xliff>
+'''
+
+
+class TestTmIngest(unittest.TestCase):
+
+    def test_ingest_directory(self):
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            inputDir = os.path.join(tmpDir, 'delivery')
+            os.makedirs(os.path.join(inputDir, 'sub'))
+            for name, content in (('a.tmx', TMX), ('sub/b.mxliff', MXLIFF), ('sub/c.xml', TMX), ('notes.txt', 'notes')):
+                with open(os.path.join(inputDir, name), 'w', encoding='utf8') as f:
+                    f.write(content)
+
+            self.assertEqual(detect_file_type(os.path.join(inputDir, 'sub/c.xml')), 'tmx')
+            # Parse caches next to the files are not ingested
+            TmFileParser('tmx').parse(os.path.join(inputDir, 'a.tmx'))
+
+            store = Path(tmpDir, 'store')
+            for nJobs in (1, 2):
+                stats = ingest_directory(inputDir, store, nJobs=nJobs, verbose=False)
+                self.assertEqual((stats['pairs'], stats['stored'], stats['duplicates']), (8, 3, 5))
+                self.assertEqual(stats['skipped'], ['notes.txt'])
+
+                with SegmentStore(store) as segments:
+                    self.assertEqual(list(segments.iter_pairs()), [('Hello world', 'Bonjour le monde'),
+                                                                   ('Thank you', 'Merci'),
+                                                                   ('Good night', 'Bonne nuit')])
+                    self.assertEqual([segments.file(i) for i in range(len(segments))],
+                                     ['a.tmx', 'a.tmx', os.path.join('sub', 'b.mxliff')])
+                    self.assertEqual((segments[-1], segments.file(-1)), (('Good night', 'Bonne nuit'),
+                                                                          os.path.join('sub', 'b.mxliff')))
+                    self.assertEqual(segments.column('target')[-3], 'Bonjour le monde')
+                    with self.assertRaises(IndexError):
+                        segments[3]
+                    with self.assertRaises(IndexError):
+                        segments.text('source', -4)
+
+
+if __name__ == '__main__':
+    unittest.main()
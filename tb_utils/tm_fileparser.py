@@ -1,12 +1,20 @@
-import os, codecs, sys
-import pandas as pd, regex as re
+import os, codecs, sys, itertools, io, mmap, hashlib, gzip
+import regex as re
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from bs4 import BeautifulSoup
 from lxml import etree
+from .segment_store import SegmentStore, SegmentStoreWriter, SegmentColumn
 # from .terms_io import loads_terms_from_pickle
 base_dir = os.path.dirname(Path(__file__).parent.parent)
 sys.path.append(base_dir)
 
+# Parsed TM files are cached next to them in segment stores named <file><TM_CACHE_SUFFIX>
+TM_CACHE_SUFFIX = '.tmcache'
+TM_CACHE_VERSION = 1
+
+# Characters not allowed in XML 1.0 documents
+_XML_INVALID_CHARS = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+
 
 def txt_io(file, action='r', write_lines=None):
 
@@ -23,61 +31,116 @@ def txt_io(file, action='r', write_lines=None):
         print(f"Action {action} not supported")
 
 
+def _xml_escape(text, quote=False):
+    """Escape a text for XML content, or for a double-quoted attribute value if quote, dropping invalid characters."""
+
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+    if quote:
+        text = text.replace('"', '&quot;').replace('\n', '&#10;').replace('\t', '&#9;')
+    if not text.isprintable():
+        text = _XML_INVALID_CHARS.sub('', text)
+
+    return text
+
+
+class TmxWriter(object):
+    """Write a TMX file pair by pair with constant memory, use as a context manager.
+       Translation units are escaped and written through a buffered file handle as they come, gzip-compressed if
+       compress (by default if the path ends with '.gz'). If an error occurs in the context, the partial file is removed.
+
+       Example:
+          with TmxWriter('out.tmx', 'en-US', 'fr-CA') as writer:
+              writer.write_pairs(TmFileParser('mxliff').iter_pairs('in.mxliff'))
+    """
+
+    def __init__(self, outputPath, srcLang, tgtLang, segType='seg', encoding='utf8', compress=None):
+
+        outputPath = os.fspath(outputPath)
+        self.outputPath = outputPath
+        self.srcLang = srcLang
+        self.tgtLang = tgtLang
+        self.count = 0
+
+        if compress is None:
+            compress = outputPath.endswith('.gz')
+        raw = gzip.open(outputPath, 'wb', compresslevel=6) if compress else open(outputPath, 'wb')
+        try:
+            # Characters the encoding cannot represent are written as character references
+            self._f = io.TextIOWrapper(io.BufferedWriter(raw, 1 << 20) if compress else raw, encoding=encoding,
+                                       errors='xmlcharrefreplace', newline='\n')
+
+            self._f.write('<?xml version="1.0" encoding="{}"?>\n<tmx version="1.4b">\n'.format(
+                codecs.lookup(encoding).name))
+            self._f.write(' <header adminlang="en" creationtool="YappnTmxGenerator" creationtoolversion="1.0.0.1905" '
+                          'datatype="plaintext" o-tmf="TMX" segtype="{}" srclang="{}"/>\n <body>\n'.format(
+                              _xml_escape(segType, quote=True), _xml_escape(srcLang, quote=True)))
+        except BaseException:
+            raw.close()
+            os.remove(outputPath)
+            raise
+
+        self._srcTuv = '   <tuv xml:lang="{}"><seg>'.format(_xml_escape(srcLang, quote=True))
+        self._tgtTuv = '</seg></tuv>\n   <tuv xml:lang="{}"><seg>'.format(_xml_escape(tgtLang, quote=True))
+
+    def write_pair(self, src, tgt, **props):
+        """Write a translation unit, with <prop type="name">value</prop> elements for keyword arguments."""
+
+        propTags = ''.join('   <prop type="{}">{}</prop>\n'.format(_xml_escape(name, quote=True), _xml_escape(str(value)))
+                           for name, value in props.items())
+
+        self._f.write('  <tu>\n' + propTags + self._srcTuv + _xml_escape(src) + self._tgtTuv + _xml_escape(tgt) +
+                      '</seg></tuv>\n  </tu>\n')
+        self.count += 1
+
+    def write_pairs(self, pairs):
+        """Write translation units from an iterable of (source_text, target_text) pairs, e.g., TmFileParser.iter_pairs."""
+
+        for src, tgt in pairs:
+            self.write_pair(src, tgt)
+
+    def close(self):
+        """Finish the TMX file."""
+
+        if not self._f.closed:
+            self._f.write(' </body>\n</tmx>\n')
+            self._f.close()
+
+    def abort(self):
+        """Discard the TMX file being written."""
+
+        self._f.close()
+        os.remove(self.outputPath)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+
+
 def writeToTmxFile(outputPath, pairs, srcLang, tgtLang, segType='seg', encoding='utf8'):
-    """Write to TMX (XML) file
+    """Write to TMX (XML) file, streaming the pairs through TmxWriter
 
        Args:
-          outputPath (str): The path of the TMX file
-          pairs (list): a list of (source_text, target_text) tuples
+          outputPath (str): The path of the TMX file, gzip-compressed if it ends with '.gz'
+          pairs (iterable): (source_text, target_text) tuples
           segType (str): segment type, e.g., 'phrase'
           srcLang (str): source language code
           tgtLang (str): target language code
           encoding (str): the encoding method
+
+       Returns:
+          (bool): whether the file is written
     """
 
     try:
-        soup = BeautifulSoup(features='xml')
-        soup.append(soup.new_tag('tmx', version='1.4b'))
-
-        # Write header
-        header = soup.new_tag('header')
-        header['creationtool'] = 'YappnTmxGenerator'
-        header['creationtoolversion'] = '1.0.0.1905'
-        header['o-tmf'] = 'TMX'
-        header['adminlang'] = 'en'
-        header['datatype'] = 'plaintext'
-        header['segtype'] = segType
-        header['srclang'] = srcLang
-        tmx_tuTag = 'tu'
-        tmx_tuPieceTag = 'tuv'
-        tmx_textTag = 'seg'
-        soup.tmx.append(header)
-
-        # Write body
-        soup.tmx.append(soup.new_tag('body'))
-
-        for (src, tgt) in pairs:
-            tu = soup.new_tag(tmx_tuTag)
-
-            tuvSrc = soup.new_tag(tmx_tuPieceTag)
-            tuvSrc['xml:lang'] = srcLang
-            seg = soup.new_tag(tmx_textTag)
-            seg.string = src
-            tuvSrc.append(seg)
-
-            tuvTgt = soup.new_tag(tmx_tuPieceTag)
-            tuvTgt['xml:lang'] = tgtLang
-            seg = soup.new_tag(tmx_textTag)
-            seg.string = tgt
-            tuvTgt.append(seg)
-
-            tu.append(tuvSrc)
-            tu.append(tuvTgt)
-
-            soup.tmx.body.append(tu)
-
-        with open(outputPath, 'wb') as f:
-            f.write(soup.prettify().encode(encoding))
+        with TmxWriter(outputPath, srcLang, tgtLang, segType=segType, encoding=encoding) as writer:
+            writer.write_pairs(pairs)
 
         return True
 
@@ -86,6 +149,182 @@ def writeToTmxFile(outputPath, pairs, srcLang, tgtLang, segType='seg', encoding=
         return False
 
 
+def _unit_ranges(file_dir, unitTag, chunkSize):
+    """Cut the units of a TMX/XLIFF file into byte ranges aligned to unit start tags
+
+       Args:
+          file_dir (str): the path of the file
+          unitTag (str): the unit tag, e.g., 'tu' or 'trans-unit'
+          chunkSize (int): the approximate number of bytes of a range
+
+       Returns:
+          (tuple): (the bytes before the first unit, [(start, end), ...] byte ranges)
+    """
+
+    startPattern = re.compile(rb'<' + unitTag.encode() + rb'[\s>/]')
+    endTag = b'</' + unitTag.encode() + b'>'
+
+    with open(file_dir, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        match = startPattern.search(mm)
+        if not match:
+            return mm[:], []
+
+        first = match.start()
+        end = max(mm.rfind(endTag) + len(endTag), first)
+        boundaries = [first]
+
+        while boundaries[-1] + chunkSize < end:
+            match = startPattern.search(mm, boundaries[-1] + chunkSize, end)
+            if not match:
+                break
+            boundaries.append(match.start())
+        boundaries.append(end)
+
+        return mm[:first], list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _synthetic_root(header):
+    """Build a minimal root wrapping a byte range of units, with the encoding and the namespace declarations found
+       before the first unit, so that a range parses as a standalone XML document
+
+       Args:
+          header (bytes): the bytes before the first unit
+
+       Returns:
+          (tuple or None): (wrapper start, wrapper end) bytes, or None if the encoding is not ASCII-compatible
+    """
+
+    match = re.search(rb'^\s*<\?xml[^>]*encoding=["\']([^"\']+)', header)
+    encoding = match.group(1).decode('ascii') if match else 'utf-8'
+
+    if header.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) or \
+            codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32')):
+        return None
+
+    parser = etree.XMLPullParser(events=("start-ns",))
+    parser.feed(header)
+    namespaces = dict(namespace for _, namespace in parser.read_events())
+
+    declarations = ''.join(' xmlns="%s"' % uri if not prefix else ' xmlns:%s="%s"' % (prefix, uri)
+                           for prefix, uri in namespaces.items())
+    start = ('<?xml version="1.0" encoding="%s"?><root%s>' % (encoding, declarations)).encode(encoding)
+
+    return start, '</root>'.encode(encoding)
+
+
+def _parse_unit_range(args):
+    """Parse the pairs of a byte range of units, as a picklable task for pool workers
+       Only the unit elements are parsed, the tags around them (e.g., XLIFF groups) are dropped
+
+       Args:
+          args (tuple): (file_dir, start, end, fileType, unitTag, wrapper, options)
+
+       Returns:
+          (list): the (source_text, target_text) pairs of the range
+    """
+
+    file_dir, start, end, fileType, unitTag, wrapper, options = args
+
+    with open(file_dir, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    startPattern = re.compile(rb'<' + unitTag.encode() + rb'[\s>/]')
+    endTag = b'</' + unitTag.encode() + b'>'
+    units = []
+    position = 0
+
+    for match in startPattern.finditer(data):
+        if match.start() < position:
+            continue
+
+        tagEnd = data.find(b'>', match.start())
+        if data[tagEnd - 1:tagEnd] == b'/':
+            position = tagEnd + 1
+        else:
+            position = data.find(endTag, tagEnd)
+            position = len(data) if position == -1 else position + len(endTag)
+        units.append(data[match.start():position])
+
+    document = wrapper[0] + b'\n'.join(units) + wrapper[1]
+
+    parser = TmFileParser(fileType)
+    if fileType == "tmx":
+        pairs = parser._iter_tmx(document, textTag=options["textTag"])
+    elif fileType == "mxliff":
+        pairs = parser._iter_mxliff(document)
+    else:
+        pairs = parser._iter_sdlxliff(document, sdlTgtTagName=options["sdlTgtTagName"])
+
+    return list(pairs)
+
+
+def _map_ranges(tasks, nJobs, ordered):
+    """Run _parse_unit_range on tasks, keeping at most 2 * nJobs ranges in flight
+
+       Args:
+          tasks (list): the task arguments
+          nJobs (int): the number of worker processes; 1 parses in the current process
+          ordered (bool): whether to yield the results in the order of tasks or as soon as they complete
+
+       Returns:
+          (generator): (task index, pairs) tuples
+    """
+
+    if nJobs == 1:
+        for i, task in enumerate(tasks):
+            yield i, _parse_unit_range(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=nJobs) as executor:
+        futures = {}
+
+        def collect():
+            if ordered:
+                done = [min(futures, key=futures.get)]
+            else:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield futures.pop(future), future.result()
+
+        for i, task in enumerate(tasks):
+            futures[executor.submit(_parse_unit_range, task)] = i
+            if len(futures) >= 2 * nJobs:
+                yield from collect()
+
+        while futures:
+            yield from collect()
+
+
+def _file_fingerprint(file_dir, blockSize=1 << 16, blocks=16):
+    """Identify a file by path, size, modification time and a content hash.
+       The content hash covers the whole file up to blocks * blockSize bytes, and evenly spaced blocks otherwise,
+       so that it stays cheap for multi-GB files.
+
+       Args:
+          file_dir (str): the path of the file
+          blockSize (int): the number of bytes of a hashed block
+          blocks (int): the number of hashed blocks
+
+       Returns:
+          (dict): the fingerprint
+    """
+
+    stat = os.stat(file_dir)
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(file_dir, 'rb') as f:
+        if stat.st_size <= blocks * blockSize:
+            digest.update(f.read())
+        else:
+            for i in range(blocks):
+                f.seek((stat.st_size - blockSize) * i // (blocks - 1))
+                digest.update(f.read(blockSize))
+
+    return {'path': os.path.abspath(file_dir), 'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+            'hash': digest.hexdigest()}
+
+
 class TmFileParser(object):
     """This class is dedicated to parse TM from different types of TM files."""
 
@@ -109,8 +348,21 @@ class TmFileParser(object):
         self.srcTexts = []
         self.tgtTexts = []
 
-    def parse_excel(self, file_dir):
-        """Parse TM from excel file, only first columns are inspected and header included"""
+    @staticmethod
+    def _cell_text(value):
+        """Convert an Excel cell value to text as pandas.read_excel(dtype=str, na_filter=False) does."""
+
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def iter_excel(self, file_dir):
+        """Stream pairs from excel file with a read-only row iterator, only first columns are inspected and header
+           included. The sheet count is checked from the workbook metadata without loading any cell.
+           The sheet count and the header are checked before the first pair; a row beyond the first two columns
+           raises when reached, and a sheet narrower than two columns raises after its last row."""
 
         base, filename = os.path.split(file_dir)
         prefix, ext = os.path.splitext(filename)
@@ -118,37 +370,85 @@ class TmFileParser(object):
         if ext not in (".xlsx", ".xls"):
             raise Exception("please select a XLSX or XLS (Excel) file.")
 
-        try:
+        return self._iter_excel(file_dir, ext)
 
-            excel_file = pd.ExcelFile(file_dir)
-            if len(excel_file.sheet_names) != 1:
-                raise AssertionError("Only one sheet is allowed in Excel file.")
-            del excel_file
+    def _iter_excel(self, file_dir, ext):
+        """Generate (source_text, target_text) pairs from excel file, see iter_excel."""
+
+        if ext == ".xls":
+            import xlrd
+            workbook = xlrd.open_workbook(file_dir, on_demand=True)
+            sheetNames = workbook.sheet_names()
 
-            df = pd.read_excel(file_dir, dtype=str, na_filter=False)
+            def value(cell):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    return xlrd.xldate.xldate_as_datetime(cell.value, workbook.datemode)
+                if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                    return bool(cell.value)
+                return cell.value
 
-            columns = list(df.columns)
+            rows = lambda: ([value(cell) for cell in row] for row in workbook.sheet_by_index(0).get_rows())
+        else:
+            import openpyxl
+            workbook = openpyxl.load_workbook(file_dir, read_only=True, data_only=True)
+            sheetNames = workbook.sheetnames
+            rows = lambda: workbook.worksheets[0].iter_rows(values_only=True)
+
+        try:
+            if len(sheetNames) != 1:
+                raise AssertionError("Only one sheet is allowed in Excel file.")
 
-            if len(columns) != 2:
+            rows = rows()
+            # As in pandas, the columns are those of the header or of any row, empty header cells being unnamed
+            header = [self._cell_text(value) for value in next(rows, ())]
+            while header and not header[-1]:
+                header.pop()
+            columns = len(header)
+            if columns > 2:
                 raise AssertionError("Source and target should be on the first two columns.")
-            # if columns[0].lower() != "source":
-            #     raise AssertionError("First column name is not 'source'.")
-            # if columns[1].lower() != "target":
-            #     raise AssertionError("Second column name is not 'target'.")
-
-            try:
-                self.srcTexts = [str(s).strip() for s in df[columns[0]]]
-            except IndexError:
-                raise IndexError("Source text column is missing.")
-            try:
-                self.tgtTexts = [str(s).strip() for s in df[columns[1]]]
-            except IndexError:
-                raise IndexError("Target text column is missing.")
-
-            # if "" in self.srcTexts:
-            #     raise AssertionError("Empty cell(s) exist in source column.")
-            # if "" in self.tgtTexts:
-            #     raise AssertionError("Empty cell(s) exist in target column.")
+
+            # Trailing empty rows are dropped as in pandas, empty rows in between are kept
+            emptyRows = 0
+            for row in rows:
+                texts = [self._cell_text(value).strip() for value in row]
+                if any(texts[2:]):
+                    raise AssertionError("Source and target should be on the first two columns.")
+                texts += [""] * (2 - len(texts))
+
+                if texts[1]:
+                    columns = 2
+                if texts[0] or texts[1]:
+                    for _ in range(emptyRows):
+                        yield "", ""
+                    emptyRows = 0
+                    yield texts[0], texts[1]
+                else:
+                    emptyRows += 1
+
+            if columns != 2:
+                raise AssertionError("Source and target should be on the first two columns.")
+
+        finally:
+            if ext == ".xls":
+                workbook.release_resources()
+            else:
+                workbook.close()
+
+    def parse_excel(self, file_dir):
+        """Parse TM from excel file, only first columns are inspected and header included.
+           The pairs are appended once the whole sheet is checked, so that a failed parse adds nothing."""
+
+        pairs = self.iter_excel(file_dir)
+
+        try:
+
+            srcTexts, tgtTexts = [], []
+            for src, tgt in pairs:
+                srcTexts.append(src)
+                tgtTexts.append(tgt)
+
+            self.srcTexts += srcTexts
+            self.tgtTexts += tgtTexts
 
         except Exception as ex:
             if type(ex).__name__ in ("AssertionError", "IndexError", "ImportError"):
@@ -156,9 +456,51 @@ class TmFileParser(object):
             print(ex.__str__())
             raise Exception("Unidentified error occurred during parsing.")
 
-    def parse_tmx(self, file_dir, textTag="seg", pairTag="tu", tmxHasAlignedFilenames=False):
-        """parse TM from TMX file.
-           Note: this function will only extract valid TM (source and target text both exist)."""
+    @staticmethod
+    def _xml_source(file_dir):
+        """Get a source for lxml from a file path, or from the content of a document given as bytes."""
+
+        return io.BytesIO(file_dir) if isinstance(file_dir, bytes) else file_dir
+
+    @staticmethod
+    def _open_xml(file_dir):
+        """Open XML file (or the content of a document given as bytes) as a binary file object."""
+
+        source = TmFileParser._xml_source(file_dir)
+
+        return source if isinstance(source, io.BytesIO) else open(source, 'rb')
+
+    @staticmethod
+    def _iter_elements(file_dir, tag, recover=False):
+        """Generate the elements of a tag from XML file with lxml iterparse and constant memory.
+           Each element is cleared after it is consumed, together with the siblings parsed before it and before each
+           of its ancestors (e.g., the <group> of each XLIFF trans-unit)."""
+
+        with TmFileParser._open_xml(file_dir) as f:
+            context = etree.iterparse(f, events=("end",), tag=tag, strip_cdata=False, recover=recover, huge_tree=True)
+
+            for _, elem in context:
+                yield elem
+
+                elem.clear(keep_tail=True)
+                node = elem
+                while node is not None:
+                    while node.getprevious() is not None:
+                        del node.getparent()[0]
+                    node = node.getparent()
+
+    @staticmethod
+    def _root_namespace(file_dir):
+        """Get the default namespace of the root of XML file as '{namespace}', reading only the root start tag."""
+
+        with TmFileParser._open_xml(file_dir) as f:
+            for _, root in etree.iterparse(f, events=("start",), strip_cdata=False, huge_tree=True):
+                return '{' + root.nsmap[None] + '}'
+
+    def iter_tmx(self, file_dir, textTag="seg", pairTag="tu", tmxHasAlignedFilenames=False):
+        """Stream TM pairs from TMX file with constant memory.
+           Each pair tag is parsed by lxml iterparse and cleared once its pair is yielded.
+           Note: this function will only yield valid TM (source and target text both exist)."""
 
         base, filename = os.path.split(file_dir)
         prefix, ext = os.path.splitext(filename)
@@ -166,40 +508,46 @@ class TmFileParser(object):
         if ext != ".tmx":
             raise AssertionError("Please select a TMX file.")
 
-        try:
-
-            try:
-                with open(file_dir, 'rb') as f:
-                    raw = f.read()
+        return self._iter_tmx(file_dir, textTag=textTag, pairTag=pairTag, tmxHasAlignedFilenames=tmxHasAlignedFilenames)
 
-                soup = BeautifulSoup(raw, 'lxml')
+    def _iter_tmx(self, file_dir, textTag="seg", pairTag="tu", tmxHasAlignedFilenames=False):
+        """Generate (source_text, target_text) pairs from TMX file, see iter_tmx."""
 
-            except:
-                raise ImportError("TMX cannot be opened.")
+        skipFirst = tmxHasAlignedFilenames
 
-            for i, tu in enumerate(soup.findAll(pairTag)):
+        try:
+            # '{*}' matches the tags with or without namespace
+            for tu in self._iter_elements(file_dir, "{*}" + pairTag, recover=True):
 
-                pair = tu.findAll(textTag)
+                pair = list(tu.iter("{*}" + textTag))
                 if len(pair) == 2:
-                    #self.srcTexts.append(re.sub(r'\s+', ' ', pair[0].text))
-                    #self.tgtTexts.append(re.sub(r'\s+', ' ', pair[1].text))
-                    self.srcTexts.append(pair[0].text.strip())
-                    self.tgtTexts.append(pair[1].text.strip())
+                    if skipFirst:
+                        skipFirst = False
+                    else:
+                        yield "".join(pair[0].itertext()).strip(), "".join(pair[1].itertext()).strip()
 
-                # else:
-                #     raise AssertionError("#%d tu tag doesn't contain both source and target text" % i)
+        except (OSError, etree.XMLSyntaxError):
+            raise ImportError("TMX cannot be opened.")
 
-            if tmxHasAlignedFilenames:
-                self.srcTexts = self.srcTexts[1:]
-                self.tgtTexts = self.tgtTexts[1:]
+    def parse_tmx(self, file_dir, textTag="seg", pairTag="tu", tmxHasAlignedFilenames=False):
+        """parse TM from TMX file.
+           Note: this function will only extract valid TM (source and target text both exist)."""
+
+        pairs = self.iter_tmx(file_dir, textTag=textTag, pairTag=pairTag, tmxHasAlignedFilenames=tmxHasAlignedFilenames)
+
+        try:
+
+            for src, tgt in pairs:
+                self.srcTexts.append(src)
+                self.tgtTexts.append(tgt)
 
         except Exception as ex:
             if type(ex).__name__ in ("AssertionError", "ImportError"):
                 raise Exception(ex.__str__())
             raise Exception("Unidentified error occurred during parsing.")
 
-    def parse_mxliff(self, file_dir):
-        """extract pairs from Memsource bilingual mxliff file based on trans-origin type."""
+    def iter_mxliff(self, file_dir):
+        """Stream pairs from Memsource bilingual mxliff file with constant memory."""
 
         base, filename = os.path.split(file_dir)
         prefix, ext = os.path.splitext(filename)
@@ -207,42 +555,51 @@ class TmFileParser(object):
         if ext != ".mxliff":
             raise AssertionError("Please select a MXLIFF file.")
 
-        try:
+        return self._iter_mxliff(file_dir)
 
-            try:
-                parser = etree.XMLParser(strip_cdata=False)
-                doc = etree.parse(file_dir, parser)
-            except:
-                raise ImportError("MXLIFF cannot be opened.")
+    def _iter_mxliff(self, file_dir):
+        """Generate (source_text, target_text) pairs from mxliff file, see iter_mxliff."""
 
-            xmlNamespace = '{' + doc.getroot().nsmap[None] + '}'
-            transNodes = doc.findall('.//' + xmlNamespace + "trans-unit")
+        try:
+            xmlNamespace = self._root_namespace(file_dir)
+            transNodes = self._iter_elements(file_dir, xmlNamespace + "trans-unit")
 
             for i, trans_unit in enumerate(transNodes):
 
-                if trans_unit is not None:
+                src_node = trans_unit.find('.//' + xmlNamespace + "source")  # layer 3
+                tgt_node = trans_unit.find('.//' + xmlNamespace + "target")
 
-                    src_node = trans_unit.find('.//' + xmlNamespace + "source")  # layer 3
-                    tgt_node = trans_unit.find('.//' + xmlNamespace + "target")
+                if (src_node is not None) and (tgt_node is not None):
+                    if (src_node.text is not None) and (tgt_node.text is not None):
+                        yield re.sub(r'\s+', ' ', src_node.text).strip(), re.sub(r'\s+', ' ', tgt_node.text).strip()
 
-                    if (src_node is not None) and (tgt_node is not None):
-                        if (src_node.text is not None) and (tgt_node.text is not None):
-                            self.srcTexts.append(re.sub(r'\s+', ' ', src_node.text).strip())
-                            self.tgtTexts.append(re.sub(r'\s+', ' ', tgt_node.text).strip())
+                    else:
+                        raise AssertionError("Source or target text is empty in #%d trans-unit tag." % i)
 
-                        else:
-                            raise AssertionError("Source or target text is empty in #%d trans-unit tag." % i)
+                else:
+                    raise AssertionError("#%d trans-unit doesn't contain both source and target text." % i)
 
-                    else:
-                        raise AssertionError("#%d trans-unit doesn't contain both source and target text." % i)
+        except (OSError, etree.XMLSyntaxError):
+            raise ImportError("MXLIFF cannot be opened.")
+
+    def parse_mxliff(self, file_dir):
+        """extract pairs from Memsource bilingual mxliff file based on trans-origin type."""
+
+        pairs = self.iter_mxliff(file_dir)
+
+        try:
+
+            for src, tgt in pairs:
+                self.srcTexts.append(src)
+                self.tgtTexts.append(tgt)
 
         except Exception as ex:
             if type(ex).__name__ in ("AssertionError", "ImportError"):
                 raise Exception(ex.__str__())
             raise Exception("Unidentified error occurred during parsing.")
 
-    def parse_sdlxliff(self, file_dir, sdlTgtTagName="mrk"):
-        """Parse TM from SDLXliff file"""
+    def iter_sdlxliff(self, file_dir, sdlTgtTagName="mrk"):
+        """Stream pairs from SDLXliff file with constant memory."""
 
         base, filename = os.path.split(file_dir)
         prefix, ext = os.path.splitext(filename)
@@ -250,46 +607,74 @@ class TmFileParser(object):
         if ext != ".sdlxliff":
             raise AssertionError("Please select a SDLXliff file.")
 
+        return self._iter_sdlxliff(file_dir, sdlTgtTagName=sdlTgtTagName)
+
+    def _iter_sdlxliff(self, file_dir, sdlTgtTagName="mrk"):
+        """Generate (source_text, target_text) pairs from SDLXliff file, see iter_sdlxliff."""
+
         try:
+            xmlNamespace = self._root_namespace(file_dir)
+            transNodes = self._iter_elements(file_dir, xmlNamespace + "trans-unit")
 
-            try:
-                parser = etree.XMLParser(strip_cdata=False)
-                doc = etree.parse(file_dir, parser)
+            for i, trans_unit in enumerate(transNodes):
 
-            except:
-                raise ImportError("SDLXLIFF cannot be opened.")
+                try:
+                    src_node = trans_unit.find('.//' + xmlNamespace + "source")  # layer 3
+                except:
+                    raise IndexError("#%d trans-unit tag doesn't contain source tag." % i)
+                try:
+                    tgt_node = trans_unit.find('.//' + xmlNamespace + "target").find('.//' + xmlNamespace + sdlTgtTagName)
+                except:
+                    raise IndexError("#%d trans-unit tag doesn't contain target tag." % i)
 
-            xmlNamespace = '{' + doc.getroot().nsmap[None] + '}'
-            transNodes = doc.findall('.//' + xmlNamespace + "trans-unit")
+                if (src_node is not None) and (tgt_node is not None):
+                    if (src_node.text is not None) and (tgt_node.text is not None):
+                        yield re.sub(r'\s+', ' ', src_node.text).strip(), re.sub(r'\s+', ' ', tgt_node.text).strip()
 
-            for i, trans_unit in enumerate(transNodes):
+                    else:
+                        raise AssertionError("Source or target text is empty in #%d trans-unit tag." % i)
 
-                if trans_unit is not None:
-                    try:
-                        src_node = trans_unit.find('.//' + xmlNamespace + "source")  # layer 3
-                    except:
-                        raise IndexError("#%d trans-unit tag doesn't contain source tag." % i)
-                    try:
-                        tgt_node = trans_unit.find('.//' + xmlNamespace + "target").find('.//' + xmlNamespace + sdlTgtTagName)
-                    except:
-                        raise IndexError("#%d trans-unit tag doesn't contain target tag." % i)
+                else:
+                    raise AssertionError("#%d trans-unit doesn't contain both source and target text." % i)
 
-                    if (src_node is not None) and (tgt_node is not None):
-                        if (src_node.text is not None) and (tgt_node.text is not None):
-                            self.srcTexts.append(re.sub(r'\s+', ' ', src_node.text).strip())
-                            self.tgtTexts.append(re.sub(r'\s+', ' ', tgt_node.text).strip())
+        except (OSError, etree.XMLSyntaxError):
+            raise ImportError("SDLXLIFF cannot be opened.")
 
-                        else:
-                            raise AssertionError("Source or target text is empty in #%d trans-unit tag." % i)
+    def parse_sdlxliff(self, file_dir, sdlTgtTagName="mrk"):
+        """Parse TM from SDLXliff file"""
 
-                    else:
-                        raise AssertionError("#%d trans-unit doesn't contain both source and target text." % i)
+        pairs = self.iter_sdlxliff(file_dir, sdlTgtTagName=sdlTgtTagName)
+
+        try:
+
+            for src, tgt in pairs:
+                self.srcTexts.append(src)
+                self.tgtTexts.append(tgt)
 
         except Exception as ex:
             if type(ex).__name__ in ("AssertionError", "ImportError", "IndexError"):
                 raise Exception(ex.__str__())
             raise Exception("Unidentified error occurred during parsing.")
 
+    def iter_2txt(self, file_dir):
+        """Stream pairs from 2txt files, reading the source and target lines in lockstep."""
+
+        if len(file_dir) != 2:
+            raise Exception("please select 2txt files.")
+
+        return self._iter_2txt(file_dir)
+
+    def _iter_2txt(self, file_dir):
+        """Generate (source_line, target_line) pairs from 2txt files, see iter_2txt."""
+
+        src_file, tgt_file = file_dir[0], file_dir[1]
+
+        with codecs.open(src_file, 'r') as fSrc, codecs.open(tgt_file, 'r') as fTgt:
+            for src, tgt in itertools.zip_longest(fSrc, fTgt):
+                if src is None or tgt is None:
+                    raise AssertionError("Lengths of source and target TM not equal.")
+                yield src, tgt
+
     def parse_2txt(self, file_dir):
         """Parse TM from 2txt file"""
 
@@ -300,10 +685,13 @@ class TmFileParser(object):
 
         try:
             with codecs.open(src_file, 'r') as f:
-                self.srcTexts = f.readlines()
+                srcTexts = f.readlines()
 
             with codecs.open(tgt_file, 'r') as f:
-                self.tgtTexts = f.readlines()
+                tgtTexts = f.readlines()
+
+            self.srcTexts += srcTexts
+            self.tgtTexts += tgtTexts
 
         except Exception as ex:
             if type(ex).__name__ in ("AssertionError", "IndexError", "ImportError"):
@@ -321,88 +709,268 @@ class TmFileParser(object):
 
         data = loads_terms_from_pickle(file_dir)
         try:
-            self.srcTexts = data['source'].tolist()
-            self.tgtTexts = data['target'].tolist()
+            srcTexts, tgtTexts = data['source'].tolist(), data['target'].tolist()
+            self.srcTexts += srcTexts
+            self.tgtTexts += tgtTexts
         except Exception as ex:
             raise Exception(ex.__str__())
 
-    def parse_xml(self, file_dir, xml_seg='seg', src_tag="src", tgt_tag="tgt"):
-        
+    def iter_xml(self, file_dir, xml_seg='seg', src_tag="src", tgt_tag="tgt"):
+        """Stream pairs from bilingual XML file with constant memory."""
+
         base, filename = os.path.split(file_dir)
         prefix, ext = os.path.splitext(filename)
 
         if ext != ".xml":
             raise AssertionError("Please select a XML file.")
 
-        try:
+        return self._iter_xml(file_dir, xml_seg=xml_seg, src_tag=src_tag, tgt_tag=tgt_tag)
 
-            try:
-                parser = etree.XMLParser(strip_cdata=False)
-                doc = etree.parse(file_dir, parser)
-            except:
-                raise ImportError("MXLIFF cannot be opened.")
+    def _iter_xml(self, file_dir, xml_seg='seg', src_tag="src", tgt_tag="tgt"):
+        """Generate (source_text, target_text) pairs from bilingual XML file, see iter_xml."""
 
+        try:
             # xmlNamespace = '{' + doc.getroot().nsmap[None] + '}'
             xmlNamespace = "{}"
-            bi_segs = doc.findall('.//' + xmlNamespace + xml_seg)
+            bi_segs = self._iter_elements(file_dir, xmlNamespace + xml_seg)
 
             for i, seg in enumerate(bi_segs):
 
-                if seg is not None:
+                src_node = seg.find('.//' + xmlNamespace + src_tag)  # layer 3
+                tgt_node = seg.find('.//' + xmlNamespace + tgt_tag)
 
-                    src_node = seg.find('.//' + xmlNamespace + src_tag)  # layer 3
-                    tgt_node = seg.find('.//' + xmlNamespace + tgt_tag)
+                if (src_node is not None) and (tgt_node is not None):
+                    if (src_node.text is not None) and (tgt_node.text is not None):
+                        yield re.sub(r'\s+', ' ', src_node.text).strip(), re.sub(r'\s+', ' ', tgt_node.text).strip()
 
-                    if (src_node is not None) and (tgt_node is not None):
-                        if (src_node.text is not None) and (tgt_node.text is not None):
-                            self.srcTexts.append(re.sub(r'\s+', ' ', src_node.text).strip())
-                            self.tgtTexts.append(re.sub(r'\s+', ' ', tgt_node.text).strip())
+                else:
+                    raise AssertionError("#%d trans-unit doesn't contain both source and target text." % i)
 
-                    else:
-                        raise AssertionError("#%d trans-unit doesn't contain both source and target text." % i)
+        except (OSError, etree.XMLSyntaxError):
+            raise ImportError("MXLIFF cannot be opened.")
+
+    def parse_xml(self, file_dir, xml_seg='seg', src_tag="src", tgt_tag="tgt"):
+
+        pairs = self.iter_xml(file_dir, xml_seg=xml_seg, src_tag=src_tag, tgt_tag=tgt_tag)
+
+        try:
+
+            for src, tgt in pairs:
+                self.srcTexts.append(src)
+                self.tgtTexts.append(tgt)
 
         except Exception as ex:
             if type(ex).__name__ in ("AssertionError", "ImportError"):
                 raise Exception(ex.__str__())
             raise Exception("Unidentified error occurred during parsing.")
-    
-    
-    def parse(self, file_dir, textTag="seg", tmxHasAlignedFilenames=False, sdlTgtTagName="mrk"):
-        """parse TM files and source text and target text are in self.srcTexts and self.tgtTexts."""
+
+    def iter_pairs(self, file_dir, textTag="seg", tmxHasAlignedFilenames=False, sdlTgtTagName="mrk"):
+        """Stream (source_text, target_text) pairs of TM files with bounded memory, so that downstream processing
+           can start on the first pairs while the file is still being read.
+           Pickle files cannot be streamed and are parsed into self.srcTexts and self.tgtTexts first."""
 
         if self.fileType == "excel":
-            self.parse_excel(file_dir)
+            return self.iter_excel(file_dir)
 
         if self.fileType == "tmx":
-            self.parse_tmx(file_dir, textTag=textTag, tmxHasAlignedFilenames=tmxHasAlignedFilenames)
+            return self.iter_tmx(file_dir, textTag=textTag, tmxHasAlignedFilenames=tmxHasAlignedFilenames)
 
         if self.fileType == "mxliff":
-            self.parse_mxliff(file_dir)
+            return self.iter_mxliff(file_dir)
 
         if self.fileType == "sdlxliff":
-            self.parse_sdlxliff(file_dir, sdlTgtTagName=sdlTgtTagName)
+            return self.iter_sdlxliff(file_dir, sdlTgtTagName=sdlTgtTagName)
 
         if self.fileType == "2txt":
-            self.parse_2txt(file_dir)
+            return self.iter_2txt(file_dir)
 
         if self.fileType == "pickle":
             self.parse_pickle(file_dir)
-            
+            return zip(self.srcTexts, self.tgtTexts)
+
         if self.fileType == "xml":
-            self.parse_xml(file_dir)
+            return self.iter_xml(file_dir)
+
+    def iter_pairs_parallel(self, file_dir, nJobs=None, chunkSize=1 << 26, ordered=True, textTag="seg",
+                            tmxHasAlignedFilenames=False, sdlTgtTagName="mrk"):
+        """Stream pairs of a very large TMX, MXLIFF or SDLXLIFF file parsed by a process pool.
+           The file is cut into byte ranges aligned to unit start tags, and each range is parsed in a worker wrapped
+           in a synthetic root carrying the namespaces declared before the first unit and the encoding.
+           Unit numbers in error messages are relative to a range. Start tags of units are located by a byte scan,
+           so they must not occur inside comments or CDATA.
+           Other formats, and files in UTF-16/32, are streamed by iter_pairs in the current process.
+
+           Args:
+              nJobs (int or None): the number of worker processes, the number of CPUs if None
+              chunkSize (int): the approximate number of bytes parsed by a worker at a time
+              ordered (bool): if True, yield (source_text, target_text) pairs in the file order
+                              if False, yield ((range_index, pair_index), (source_text, target_text)) as soon as
+                              ranges are parsed, where (range_index, pair_index) sorts in the file order
+        """
+
+        pairs = self.iter_pairs(file_dir, textTag=textTag, tmxHasAlignedFilenames=tmxHasAlignedFilenames,
+                                sdlTgtTagName=sdlTgtTagName)
+
+        if self.fileType in ("tmx", "mxliff", "sdlxliff"):
+            unitTag = "tu" if self.fileType == "tmx" else "trans-unit"
+            header, ranges = _unit_ranges(file_dir, unitTag, chunkSize)
+            wrapper = _synthetic_root(header)
+
+            if wrapper is not None:
+                options = {"textTag": textTag, "sdlTgtTagName": sdlTgtTagName}
+                tasks = [(file_dir, start, end, self.fileType, unitTag, wrapper, options) for start, end in ranges]
+                skipFirst = self.fileType == "tmx" and tmxHasAlignedFilenames
+                return self._iter_pairs_parallel(tasks, nJobs or os.cpu_count(), ordered, skipFirst)
+
+        return pairs if ordered else (((0, i), pair) for i, pair in enumerate(pairs))
+
+    def _iter_pairs_parallel(self, tasks, nJobs, ordered, skipFirst):
+        """Generate the pairs of the byte ranges parsed by a process pool, see iter_pairs_parallel."""
+
+        for i, pairs in _map_ranges(tasks, nJobs, ordered):
+            # The first pair of the file (aligned file names) is in the first range
+            start = 1 if skipFirst and i == 0 else 0
 
-        # print(self.srcTexts[:5])
-        # print(self.tgtTexts[:5])
+            if ordered:
+                yield from pairs[start:]
+            else:
+                for j in range(start, len(pairs)):
+                    yield (i, j), pairs[j]
 
-        # verify if lengths are equal on both sides
-        if len(self.srcTexts) != len(self.tgtTexts):
-            print("length of src text: {} \nlength of tgt text: {}".format(len(self.srcTexts), len(self.tgtTexts)))
-            raise Exception("Lengths of source and target TM not equal.")
+    def cache_path(self, file_dir):
+        """Get the path of the columnar cache of TM files, next to the (first) file."""
+
+        return os.fspath(file_dir[0] if self.fileType == "2txt" else file_dir) + TM_CACHE_SUFFIX
+
+    def _cache_key(self, file_dir, options):
+        """Get the key identifying the parse of TM files: files, parse options and cache version."""
+
+        files = file_dir if self.fileType == "2txt" else [file_dir]
+
+        return {'version': TM_CACHE_VERSION, 'fileType': self.fileType, 'options': options,
+                'files': [_file_fingerprint(file) for file in files]}
+
+    def _load_cache(self, cachePath, key, lazy=False):
+        """Load the texts of the cache if its key matches.
+           Texts are read-only sequences decoded on access if lazy and no texts were parsed before by this parser.
+
+           Returns:
+              (tuple or None): the source texts and the target texts, None if the cache is missing or stale
+        """
+
+        if not SegmentStore.is_store(cachePath):
+            return None
+
+        try:
+            store = SegmentStore(cachePath)
+        except Exception:
+            return None
+
+        if store.meta.get('key') != key:
+            store.close()
+            return None
+
+        if lazy and not self.srcTexts:
+            return store.column('source'), store.column('target')
+
+        with store:
+            return store.texts('source'), store.texts('target')
+
+    def _write_cache(self, cachePath, key, srcTexts, tgtTexts):
+        """Write texts to the cache, skipped if the directory is not writable."""
+
+        try:
+            with SegmentStoreWriter(cachePath, meta={'key': key}) as writer:
+                writer.write_pairs(zip(srcTexts, tgtTexts))
+        except OSError:
+            pass
+
+    def _add_texts(self, srcTexts, tgtTexts):
+        """Append the texts of a parsed (or cached) file to self.srcTexts and self.tgtTexts."""
+
+        if self.srcTexts or self.tgtTexts:
+            self.srcTexts += srcTexts
+            self.tgtTexts += tgtTexts
+        else:
+            self.srcTexts, self.tgtTexts = srcTexts, tgtTexts
+
+    def parse(self, file_dir, textTag="seg", tmxHasAlignedFilenames=False, sdlTgtTagName="mrk", useCache=True,
+              reparse=False, lazy=False):
+        """parse TM files and source text and target text are in self.srcTexts and self.tgtTexts.
+           The texts of the files are appended to the texts parsed before by this parser, whether they are parsed or
+           loaded from the cache; the lists are unchanged if parsing fails.
+           The parsed texts are cached next to the file (see cache_path) in a columnar segment store keyed by the
+           file path, size, modification time, content hash and parse options, and later parses load the cache.
+
+           Args:
+              useCache (bool): whether to load and write the cache (pickle files are never cached)
+              reparse (bool): whether to parse the file again and rewrite the cache even if the cache is valid
+              lazy (bool): whether texts loaded from the cache are read-only sequences decoded on access
+                           (memory-mapped, loads in milliseconds) instead of lists
+        """
+
+        # Texts loaded lazily are read-only, later parses append to them as lists
+        if isinstance(self.srcTexts, SegmentColumn):
+            self.srcTexts, self.tgtTexts = list(self.srcTexts), list(self.tgtTexts)
+
+        cachePath = None
+        if useCache and self.fileType != "pickle":
+            cachePath = self.cache_path(file_dir)
+            key = self._cache_key(file_dir, {'textTag': textTag, 'tmxHasAlignedFilenames': tmxHasAlignedFilenames,
+                                             'sdlTgtTagName': sdlTgtTagName})
+
+            cached = None if reparse else self._load_cache(cachePath, key, lazy=lazy)
+            if cached is not None:
+                self._add_texts(*cached)
+                print("\n\tThe number of TM pairs loaded from cache: {}".format(len(self.srcTexts)))
+                return
+
+        # The file is parsed into new lists, which are cached as they are and then appended
+        srcTexts, tgtTexts = self.srcTexts, self.tgtTexts
+        self.srcTexts, self.tgtTexts = [], []
+
+        try:
+            if self.fileType == "excel":
+                self.parse_excel(file_dir)
+
+            if self.fileType == "tmx":
+                self.parse_tmx(file_dir, textTag=textTag, tmxHasAlignedFilenames=tmxHasAlignedFilenames)
+
+            if self.fileType == "mxliff":
+                self.parse_mxliff(file_dir)
+
+            if self.fileType == "sdlxliff":
+                self.parse_sdlxliff(file_dir, sdlTgtTagName=sdlTgtTagName)
+
+            if self.fileType == "2txt":
+                self.parse_2txt(file_dir)
+
+            if self.fileType == "pickle":
+                self.parse_pickle(file_dir)
+
+            if self.fileType == "xml":
+                self.parse_xml(file_dir)
+
+            # print(self.srcTexts[:5])
+            # print(self.tgtTexts[:5])
+
+            # verify if lengths are equal on both sides
+            if len(self.srcTexts) != len(self.tgtTexts):
+                print("length of src text: {} \nlength of tgt text: {}".format(len(self.srcTexts), len(self.tgtTexts)))
+                raise Exception("Lengths of source and target TM not equal.")
+
+        finally:
+            parsed = self.srcTexts, self.tgtTexts
+            self.srcTexts, self.tgtTexts = srcTexts, tgtTexts
 
         # final_pairs = [p for p in zip(self.srcTexts, self.tgtTexts) if p[0] and p[1]]
         # self.srcTexts = [p[0] for p in final_pairs]
         # self.tgtTexts = [p[1] for p in final_pairs]
 
+        if cachePath:
+            self._write_cache(cachePath, key, *parsed)
+
+        self._add_texts(*parsed)
         print("\n\tThe number of TM pairs parsed: {}".format(len(self.srcTexts)))
 
 
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+# utils: TM ingestion
+#
+# --------------------------------------------------
+# This module ingests folders of client TM files (tmx, mxliff, sdlxliff, xlsx, ...) into one segment store.
+# Files are parsed in a process pool, segments are whitespace-normalized and deduplicated by hashing on the fly,
+# and the source file of each segment is recorded.
+# Usage: python -m tb_utils.tm_ingest <input_dir> <output_store> [nJobs]
+
+import os, sys, time, hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import regex as re
+
+from .tm_fileparser import TmFileParser, TM_CACHE_SUFFIX
+from .segment_store import SegmentStoreWriter
+
+EXTENSION_FILE_TYPES = {'.tmx': 'tmx', '.mxliff': 'mxliff', '.sdlxliff': 'sdlxliff', '.xlsx': 'excel', '.xls': 'excel'}
+
+
+def detect_file_type(file):
+    """Detect the TM file type from the extension, or from the content for other extensions
+
+       Args:
+          file (str): the path of the file
+
+       Returns:
+          (str or None): the TmFileParser file type, or None if the file is not a TM file
+    """
+
+    ext = os.path.splitext(file)[1].lower()
+
+    if ext in EXTENSION_FILE_TYPES:
+        return EXTENSION_FILE_TYPES[ext]
+
+    with open(file, 'rb') as f:
+        head = f.read(4096)
+
+    if head.startswith(b'PK\x03\x04') or head.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'excel' if ext in ('', '.xlsm') else None
+    if re.search(rb'<tmx[\s>]', head):
+        return 'tmx'
+    if re.search(rb'<xliff[\s>]', head):
+        return 'sdlxliff' if b'sdl.com' in head else 'mxliff'
+
+    return None
+
+
+def _iter_file_pairs(file, fileType):
+    """Stream the pairs of a TM file whose type may have been detected from its content."""
+
+    parser = TmFileParser(fileType)
+
+    if fileType == 'tmx':
+        return parser._iter_tmx(file)
+    if fileType == 'mxliff':
+        return parser._iter_mxliff(file)
+    if fileType == 'sdlxliff':
+        return parser._iter_sdlxliff(file)
+
+    with open(file, 'rb') as f:
+        ext = '.xls' if f.read(4) == b'\xd0\xcf\x11\xe0' else '.xlsx'
+
+    return parser._iter_excel(file, ext)
+
+
+def normalize_text(text):
+    """Normalize the whitespace of a segment."""
+
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def pair_hash(src, tgt):
+    """Hash a normalized (source_text, target_text) pair into 16 bytes."""
+
+    return hashlib.blake2b((src + '\x00' + tgt).encode('utf8'), digest_size=16).digest()
+
+
+def _ingest_file(args):
+    """Parse, normalize and hash the pairs of a file, as a picklable task for pool workers
+
+       Args:
+          args (tuple): (file, fileType)
+
+       Returns:
+          (tuple): (pairs, hashes, number of bytes, error message or None)
+    """
+
+    file, fileType = args
+
+    try:
+        pairs = [(normalize_text(src), normalize_text(tgt)) for src, tgt in _iter_file_pairs(file, fileType)]
+    except Exception as ex:
+        return [], [], os.path.getsize(file), '%s: %s' % (type(ex).__name__, ex)
+
+    return pairs, [pair_hash(src, tgt) for src, tgt in pairs], os.path.getsize(file), None
+
+
+def _bounded_map(executor, func, tasks, maxInFlight):
+    """Like executor.map, but with at most maxInFlight tasks submitted ahead of the results consumed, so that the
+       parsed pairs of many files do not pile up in memory."""
+
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(executor.submit(func, task))
+            if len(pending) >= maxInFlight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def ingest_directory(input_dir, output_path, nJobs=None, verbose=True):
+    """Ingest all TM files of a directory (recursively) into one deduplicated segment store
+
+       Args:
+          input_dir (str): the directory of TM files
+          output_path (str): the path of the segment store, see segment_store.SegmentStore
+          nJobs (int or None): the number of worker processes, the number of CPUs if None; 1 parses in this process
+          verbose (bool): whether to print the report
+
+       Returns:
+          (dict): statistics: files, failed files (file -> error), skipped files, pairs read, pairs stored,
+                  duplicates, bytes read, seconds, pairs per second and MB per second
+    """
+
+    start = time.time()
+    nJobs = int(nJobs) if nJobs else os.cpu_count()
+
+    tasks, skipped = [], []
+    for root, dirs, files in os.walk(input_dir):
+        # Parse caches of TmFileParser are not TM files
+        dirs[:] = sorted(name for name in dirs if not name.endswith(TM_CACHE_SUFFIX))
+        for name in sorted(files):
+            file = os.path.join(root, name)
+            fileType = detect_file_type(file)
+            if fileType:
+                tasks.append((file, fileType))
+            else:
+                skipped.append(os.path.relpath(file, input_dir))
+
+    stats = {'files': len(tasks), 'failed': {}, 'skipped': skipped, 'pairs': 0, 'stored': 0, 'duplicates': 0,
+             'bytes': 0}
+    seen = set()
+
+    with SegmentStoreWriter(output_path, meta={'input_dir': os.path.abspath(input_dir)}) as writer:
+
+        if nJobs == 1:
+            results = map(_ingest_file, tasks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=nJobs)
+            results = _bounded_map(executor, _ingest_file, tasks, 2 * nJobs)
+
+        try:
+            for (file, fileType), (pairs, hashes, size, error) in zip(tasks, results):
+                name = os.path.relpath(file, input_dir)
+                stats['bytes'] += size
+
+                if error:
+                    stats['failed'][name] = error
+                    continue
+
+                fileId = writer.add_file(name)
+                for (src, tgt), pairHash in zip(pairs, hashes):
+                    if pairHash not in seen:
+                        seen.add(pairHash)
+                        writer.write(src, tgt, fileId)
+                stats['pairs'] += len(pairs)
+
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        stats['stored'] = len(writer)
+
+    stats['duplicates'] = stats['pairs'] - stats['stored']
+    stats['seconds'] = time.time() - start
+    stats['pairs_per_second'] = stats['pairs'] / max(stats['seconds'], 1e-9)
+    stats['mb_per_second'] = stats['bytes'] / 1e6 / max(stats['seconds'], 1e-9)
+
+    if verbose:
+        print("\n\tFiles ingested: {} ({} failed, {} skipped)".format(stats['files'] - len(stats['failed']),
+                                                                     len(stats['failed']), len(skipped)))
+        for name, error in stats['failed'].items():
+            print("\t\t{}: {}".format(name, error))
+        print("\tTM pairs read: {}, stored: {}, duplicates dropped: {} ({:.1%})".format(
+            stats['pairs'], stats['stored'], stats['duplicates'], stats['duplicates'] / max(stats['pairs'], 1)))
+        print("\tThroughput: {:.0f} pairs/s, {:.1f} MB/s in {:.1f}s".format(
+            stats['pairs_per_second'], stats['mb_per_second'], stats['seconds']))
+
+    return stats
+
+
+if __name__ == '__main__':
+
+    args = sys.argv[1:]
+    ingest_directory(*args)